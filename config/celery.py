@@ -18,6 +18,26 @@ app.conf.beat_schedule = {
         "task": "courses.tasks.notify_users_about_upcoming_courses",
         "schedule": 3600.0,
     },
+    "expire-subscriptions-every-5-minutes": {
+        "task": "posts.tasks.expire_subscriptions",
+        "schedule": 300.0,
+    },
+    "delete-unreferenced-files-every-hour": {
+        "task": "posts.tasks.delete_unreferenced_files",
+        "schedule": 3600.0,
+    },
+    "flush-post-views-every-minute": {
+        "task": "posts.tasks.flush_post_views",
+        "schedule": 60.0,
+    },
+    "process-pending-stripe-events-every-minute": {
+        "task": "payments.tasks.process_pending_stripe_events",
+        "schedule": 60.0,
+    },
+    "recompute-revenue-rollups-every-night": {
+        "task": "payments.tasks.recompute_revenue_rollups",
+        "schedule": crontab(hour=1, minute=0),
+    },
     "deactivate-inactive-users-every-day": {
         "task": "users.tasks.deactivate_inactive_users",
         "schedule": crontab(hour=0, minute=0),
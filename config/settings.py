@@ -33,6 +33,19 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 
 STRIPE_TEST_SECRET_KEY = os.getenv("STRIPE_TEST_SECRET_KEY")
 STRIPE_TEST_PUBLIC_KEY = os.getenv("STRIPE_TEST_PUBLIC_KEY")
+STRIPE_ENDPOINT_SECRET = os.getenv("STRIPE_ENDPOINT_SECRET")
+# Параметры шлюза Stripe (payments.gateway.StripeGateway)
+STRIPE_API_BASE = os.getenv("STRIPE_API_BASE") or None
+STRIPE_CONNECT_TIMEOUT = float(os.getenv("STRIPE_CONNECT_TIMEOUT", 3))
+STRIPE_READ_TIMEOUT = float(os.getenv("STRIPE_READ_TIMEOUT", 10))
+STRIPE_MAX_RETRIES = int(os.getenv("STRIPE_MAX_RETRIES", 2))
+STRIPE_POOL_SIZE = int(os.getenv("STRIPE_POOL_SIZE", 10))
+STRIPE_BREAKER_THRESHOLD = int(os.getenv("STRIPE_BREAKER_THRESHOLD", 5))
+STRIPE_BREAKER_RESET_TIMEOUT = int(os.getenv("STRIPE_BREAKER_RESET_TIMEOUT", 30))
+# Срок, на который оплата подписки продлевает доступ
+SUBSCRIPTION_PERIOD_DAYS = int(os.getenv("SUBSCRIPTION_PERIOD_DAYS", 30))
+# Время жизни сессии Stripe Checkout в секундах (Stripe допускает не меньше 30 минут)
+CHECKOUT_SESSION_TTL = int(os.getenv("CHECKOUT_SESSION_TTL", 30 * 60))
 
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True if os.getenv("DEBUG") == "True" else False
@@ -143,6 +156,19 @@ STATICFILES_DIRS = [BASE_DIR / "static"]
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR / "media")
 
+# Изображения постов и аватары хранятся по хэшу содержимого (см. posts.storage)
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    "content_addressed": {"BACKEND": "posts.storage.ContentAddressedStorage"},
+}
+
+# Изображения платных постов отдает nginx по X-Accel-Redirect после проверки доступа в Django
+# (False - файл отдает сам Django, для разработки без nginx)
+PROTECTED_MEDIA_X_ACCEL = os.getenv("PROTECTED_MEDIA_X_ACCEL", str(not DEBUG)) == "True"
+PROTECTED_MEDIA_INTERNAL_URL = "/protected-media/"
+PROTECTED_MEDIA_MAX_AGE = 60 * 60
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -160,6 +186,18 @@ DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
 AUTH_USER_MODEL = "users.CustomUser"
 
+AUTHENTICATION_BACKENDS = ["users.backends.RoleBackend"]
+
+# Время хранения групп и разрешений пользователя в общем кэше, в секундах (0 - только в пределах запроса)
+ROLES_CACHE_TIMEOUT = int(os.getenv("ROLES_CACHE_TIMEOUT", 30))
+
+# Ширины (в пикселях) и форматы уменьшенных копий изображений постов
+POST_IMAGE_VARIANT_WIDTHS = json.loads(os.getenv("POST_IMAGE_VARIANT_WIDTHS", "[320, 640, 1280]"))
+POST_IMAGE_VARIANT_FORMATS = json.loads(os.getenv("POST_IMAGE_VARIANT_FORMATS", '["webp", "jpeg"]'))
+
+# Как часто просмотры постов из буфера процесса записываются в базу, если кэш не Redis, в секундах
+POST_VIEWS_FLUSH_INTERVAL = int(os.getenv("POST_VIEWS_FLUSH_INTERVAL", 60))
+
 LOGIN_URL = "/users/login/"
 
 BASE_REDIS = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
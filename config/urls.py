@@ -15,6 +15,8 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
+import os
+
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
@@ -24,6 +26,7 @@ from drf_yasg.views import get_schema_view
 from rest_framework import permissions
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
+from posts.storage import ContentAddressedStorage
 from posts.views import SubscriptionView
 
 schema_view = get_schema_view(
@@ -52,4 +55,9 @@ urlpatterns = [
 ]
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # Как и nginx, публично отдается только каталог cas/: файлы платных постов
+    # из private/ доступны только через представления posts.media с проверкой прав.
+    urlpatterns += static(
+        f"{settings.MEDIA_URL}{ContentAddressedStorage.prefix}/",
+        document_root=os.path.join(settings.MEDIA_ROOT, ContentAddressedStorage.prefix),
+    )
@@ -0,0 +1,31 @@
+from django.contrib import admin
+
+from .models import RevenueDaily
+
+
+@admin.register(RevenueDaily)
+class RevenueDailyAdmin(admin.ModelAdmin):
+    """
+    Административная панель для просмотра сводок выручки по дням.
+
+    Сводки заполняются автоматически (см. RevenueService), поэтому доступны
+    только для чтения.
+
+    Атрибуты:
+        list_display (tuple): Поля, отображаемые в таблице сводок.
+        list_filter (tuple): Поля для фильтрации.
+        date_hierarchy (str): Поле для навигации по датам.
+    """
+
+    list_display = ("day", "post_id", "author_id", "payment_method", "payments_count", "amount")
+    list_filter = ("payment_method",)
+    date_hierarchy = "day"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,306 @@
+import random
+import time
+import uuid
+
+import requests
+import stripe
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from requests.adapters import HTTPAdapter
+
+
+class StripeUnavailable(Exception):
+    """
+    Исключение для недоступного Stripe: сбой соединения, таймаут, ошибка сервера
+    после всех повторов или открытый автомат защиты (CircuitBreaker).
+
+    Сообщение исключения можно показывать пользователю.
+    """
+
+    default_message = "Платежный сервис временно недоступен. Попробуйте позже."
+
+    def __init__(self, message=None):
+        super().__init__(message or self.default_message)
+
+
+class CircuitBreaker:
+    """
+    Автомат защиты от обращений к недоступному сервису.
+
+    Состояние хранится в общем кэше, поэтому сбои, замеченные одним веб-процессом,
+    останавливают обращения во всех процессах. После failure_threshold сбоев подряд
+    (в пределах window секунд) автомат размыкается на reset_timeout секунд: вызовы
+    завершаются сразу, без сетевых запросов. По истечении этого времени следующий
+    вызов снова идет в сервис; успешный вызов сбрасывает счетчик сбоев, а новый
+    сбой при накопленном счетчике снова размыкает автомат.
+
+    Атрибуты:
+        name (str): Имя автомата в ключах кэша.
+        failure_threshold (int): Количество сбоев, после которого автомат размыкается.
+        reset_timeout (int): Время, на которое автомат размыкается, в секундах.
+        window (int): Время хранения счетчика сбоев, в секундах.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30, window=60):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.window = window
+
+    @property
+    def _failures_key(self):
+        return f"circuit:{self.name}:failures"
+
+    @property
+    def _open_key(self):
+        return f"circuit:{self.name}:open"
+
+    def is_open(self):
+        """
+        Проверяет, разомкнут ли автомат.
+
+        Returns:
+            bool: True, если вызовы сейчас нужно отклонять.
+        """
+        return cache.get(self._open_key) is not None
+
+    def record_success(self):
+        """
+        Сбрасывает счетчик сбоев после успешного вызова.
+        """
+        cache.delete(self._failures_key)
+
+    def record_failure(self):
+        """
+        Учитывает сбой и размыкает автомат при достижении порога.
+        """
+        if cache.add(self._failures_key, 1, self.window):
+            failures = 1
+        else:
+            try:
+                failures = cache.incr(self._failures_key)
+            except ValueError:
+                cache.add(self._failures_key, 1, self.window)
+                failures = 1
+        if failures >= self.failure_threshold:
+            cache.set(self._open_key, 1, self.reset_timeout)
+
+
+class StripeGateway:
+    """
+    Единая точка обращений приложения к API Stripe.
+
+    Запросы выполняются через собственный StripeClient, а не через глобальные
+    настройки модуля stripe:
+
+    - HTTP-сессия requests с пулом соединений переиспользует TLS-соединения
+      с api.stripe.com между запросами;
+    - каждый запрос ограничен таймаутами на соединение и на чтение ответа;
+    - сбои соединения, ошибки 5xx и 429 повторяются не более max_retries раз
+      с экспоненциальной задержкой со случайным разбросом (full jitter); повторы
+      POST-запросов выполняются с тем же Idempotency-Key, поэтому не создают
+      в Stripe дубликатов;
+    - после исчерпания повторов сбой учитывается автоматом защиты, и пока он
+      разомкнут, вызовы сразу завершаются исключением StripeUnavailable.
+
+    Ошибки запроса (например, неверные параметры) пробрасываются как исключения
+    stripe и сбоями сервиса не считаются.
+
+    Транспорт можно заменить параметром http_client (любой stripe.HTTPClient),
+    например на FakeStripeServer.transport() из payments.testing в тестах и бенчмарках.
+
+    Атрибуты:
+        RETRYABLE_ERRORS (tuple): Исключения stripe, после которых запрос повторяется.
+        client (StripeClient): Клиент Stripe.
+        breaker (CircuitBreaker): Автомат защиты.
+    """
+
+    RETRYABLE_ERRORS = (stripe.APIConnectionError, stripe.APIError, stripe.RateLimitError)
+
+    def __init__(
+        self,
+        api_key,
+        api_base=None,
+        connect_timeout=3.0,
+        read_timeout=10.0,
+        max_retries=2,
+        retry_delay=0.2,
+        max_retry_delay=2.0,
+        pool_size=10,
+        http_client=None,
+        breaker=None,
+    ):
+        if http_client is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            http_client = stripe.RequestsClient(timeout=(connect_timeout, read_timeout), session=session)
+        self.client = stripe.StripeClient(
+            api_key or "",
+            base_addresses={"api": api_base} if api_base else {},
+            max_network_retries=0,
+            http_client=http_client,
+        )
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.breaker = breaker or CircuitBreaker("stripe")
+
+    @classmethod
+    def from_settings(cls):
+        """
+        Создает шлюз по настройкам STRIPE_*.
+
+        Returns:
+            StripeGateway: Шлюз.
+        """
+        return cls(
+            api_key=settings.STRIPE_TEST_SECRET_KEY,
+            api_base=settings.STRIPE_API_BASE,
+            connect_timeout=settings.STRIPE_CONNECT_TIMEOUT,
+            read_timeout=settings.STRIPE_READ_TIMEOUT,
+            max_retries=settings.STRIPE_MAX_RETRIES,
+            pool_size=settings.STRIPE_POOL_SIZE,
+            breaker=CircuitBreaker(
+                "stripe",
+                failure_threshold=settings.STRIPE_BREAKER_THRESHOLD,
+                reset_timeout=settings.STRIPE_BREAKER_RESET_TIMEOUT,
+            ),
+        )
+
+    def _backoff(self, attempt):
+        """
+        Возвращает задержку перед повтором: случайное значение до экспоненциальной границы.
+        """
+        return random.uniform(0, min(self.max_retry_delay, self.retry_delay * 2**attempt))
+
+    def call(self, operation, idempotent=True):
+        """
+        Выполняет обращение к Stripe с повторами и автоматом защиты.
+
+        Args:
+            operation (callable): Функция, принимающая словарь опций запроса Stripe
+                (RequestOptions) и выполняющая запрос через self.client.
+            idempotent (bool): Передавать ли один Idempotency-Key во все попытки
+                (нужно для POST-запросов, создающих объекты).
+
+        Returns:
+            Any: Результат operation.
+
+        Raises:
+            StripeUnavailable: Если автомат защиты разомкнут или Stripe недоступен после всех повторов.
+            stripe.StripeError: При ошибке запроса, не связанной с доступностью Stripe.
+        """
+        if self.breaker.is_open():
+            raise StripeUnavailable()
+
+        options = {"idempotency_key": str(uuid.uuid4())} if idempotent else {}
+        for attempt in range(self.max_retries + 1):
+            try:
+                result = operation(options)
+            except self.RETRYABLE_ERRORS as error:
+                if attempt == self.max_retries:
+                    self.breaker.record_failure()
+                    raise StripeUnavailable() from error
+                time.sleep(self._backoff(attempt))
+            else:
+                self.breaker.record_success()
+                return result
+
+    def create_product(self, **params):
+        """
+        Создает продукт.
+
+        Returns:
+            Product: Продукт Stripe.
+        """
+        return self.call(lambda options: self.client.products.create(params=params, options=options))
+
+    def create_price(self, **params):
+        """
+        Создает цену.
+
+        Returns:
+            Price: Цена Stripe.
+        """
+        return self.call(lambda options: self.client.prices.create(params=params, options=options))
+
+    def list_prices(self, **params):
+        """
+        Возвращает все цены, читая список постранично.
+
+        Повтор при сбое выполняется для всего списка.
+
+        Returns:
+            list[Price]: Цены Stripe.
+        """
+        return self.call(
+            lambda options: list(self.client.prices.list(params=params, options=options).auto_paging_iter()),
+            idempotent=False,
+        )
+
+    def create_checkout_session(self, **params):
+        """
+        Создает сессию Stripe Checkout.
+
+        Returns:
+            Session: Сессия Checkout.
+        """
+        return self.call(lambda options: self.client.checkout.sessions.create(params=params, options=options))
+
+    def retrieve_checkout_session(self, session_id):
+        """
+        Возвращает сессию Stripe Checkout.
+
+        Args:
+            session_id (str): Идентификатор сессии.
+
+        Returns:
+            Session: Сессия Checkout.
+        """
+        return self.call(lambda options: self.client.checkout.sessions.retrieve(session_id, options=options), False)
+
+
+_gateway = None
+
+
+def get_gateway():
+    """
+    Возвращает шлюз Stripe процесса, создавая его по настройкам при первом обращении.
+
+    Один экземпляр на процесс нужен для переиспользования пула соединений.
+
+    Returns:
+        StripeGateway: Шлюз.
+    """
+    global _gateway
+    if _gateway is None:
+        _gateway = StripeGateway.from_settings()
+    return _gateway
+
+
+def set_gateway(gateway):
+    """
+    Заменяет шлюз процесса (для тестов и бенчмарков).
+
+    Args:
+        gateway (StripeGateway | None): Новый шлюз; None - создать заново по настройкам.
+
+    Returns:
+        StripeGateway | None: Предыдущий шлюз.
+    """
+    global _gateway
+    previous, _gateway = _gateway, gateway
+    return previous
+
+
+@receiver(setting_changed)
+def reset_gateway(setting, **kwargs):
+    """
+    Пересоздает шлюз при изменении настроек Stripe (override_settings в тестах).
+    """
+    if setting.startswith("STRIPE_"):
+        set_gateway(None)
@@ -0,0 +1,90 @@
+import statistics
+import time
+
+import requests
+import stripe
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from payments.gateway import CircuitBreaker, StripeGateway
+from payments.testing import FakeStripeServer
+
+
+class Command(BaseCommand):
+    """
+    Бенчмарк шлюза Stripe на локальном FakeStripeServer.
+
+    Измеряет время создания сессии Checkout через шлюз: по HTTP с пулом соединений,
+    по HTTP с новым соединением на каждый запрос (как без общей сессии) и через
+    транспорт без сети. Также показывает, как быстро отказывает шлюз, когда Stripe
+    отвечает с задержкой больше таймаута, и когда разомкнут автомат защиты.
+
+    Атрибуты:
+        help (str): Описание команды, которое будет отображаться в справке.
+    """
+
+    help = "Измеряет время обращений к Stripe через шлюз на локальном сервере Stripe"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200, help="Количество запросов в замере")
+        parser.add_argument("--latency", type=float, default=2.0, help="Задержка медленного Stripe, в секундах")
+
+    def handle(self, *args, **options):
+        """
+        Выполняет замеры и выводит медианное время запроса каждого варианта.
+
+        Args:
+            *args: Позиционные аргументы, переданные в команду.
+            **options: Именованные аргументы, переданные в команду.
+
+        Returns:
+            None: Метод выводит таблицу результатов.
+        """
+        with FakeStripeServer() as server:
+            cases = [
+                ("HTTP, пул соединений", StripeGateway("sk_test_fake", api_base=server.url)),
+                (
+                    "HTTP, без пула",
+                    StripeGateway("sk_test_fake", api_base=server.url, http_client=_UnpooledRequestsClient()),
+                ),
+                ("без сети", server.gateway()),
+            ]
+            for name, gateway in cases:
+                self._measure(name, gateway, options["requests"])
+
+            server.latency = options["latency"]
+            breaker = CircuitBreaker("benchmark-stripe", failure_threshold=1)
+            cache.delete_many([breaker._failures_key, breaker._open_key])
+            gateway = StripeGateway(
+                "sk_test_fake", api_base=server.url, read_timeout=0.5, max_retries=1, retry_delay=0.1, breaker=breaker
+            )
+            self._measure("медленный Stripe", gateway, 1)
+            self._measure("автомат разомкнут", gateway, options["requests"])
+
+    def _measure(self, name, gateway, count):
+        gateway.breaker.record_success()
+        timings = []
+        errors = 0
+        for _ in range(count):
+            started = time.perf_counter()
+            try:
+                gateway.create_checkout_session(mode="payment", line_items=[{"price": "price_basic", "quantity": 1}])
+            except Exception:
+                errors += 1
+            timings.append((time.perf_counter() - started) * 1000)
+        self.stdout.write(
+            f"{name:<22} {count:>5} запросов, медиана {statistics.median(timings):8.2f} мс, ошибок {errors}"
+        )
+
+
+class _UnpooledRequestsClient(stripe.RequestsClient):
+    """
+    Транспорт, открывающий новое соединение на каждый запрос.
+    """
+
+    def request(self, method, url, headers, post_data=None):
+        session = self._thread_local.session = requests.Session()
+        try:
+            return super().request(method, url, headers, post_data)
+        finally:
+            session.close()
@@ -0,0 +1,65 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from payments.models import Payment
+from payments.services import RevenueService
+
+
+class Command(BaseCommand):
+    """
+    Команда для пересчета сводок выручки (RevenueDaily) по платежам.
+
+    Используется для первичного заполнения сводок и после исправления данных.
+    По умолчанию пересчитываются все дни с первой успешной оплаты по вчерашний:
+    сводка текущего дня пополняется при обработке оплат.
+
+    Атрибуты:
+        help (str): Описание команды, которое будет отображаться в справке.
+    """
+
+    help = "Пересчитывает сводки выручки по дням"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", help="Первый день (YYYY-MM-DD), по умолчанию - день первой оплаты")
+        parser.add_argument("--end", help="Последний день (YYYY-MM-DD), по умолчанию - вчера")
+
+    def handle(self, *args, **options):
+        """
+        Пересчитывает сводки за период и выводит итог.
+
+        Args:
+            *args: Позиционные аргументы, переданные в команду.
+            **options: Именованные аргументы, переданные в команду.
+
+        Returns:
+            None
+
+        Raises:
+            CommandError: Если дата указана в неверном формате.
+        """
+        start = self._date(options["start"])
+        end = self._date(options["end"]) or timezone.localdate() - datetime.timedelta(days=1)
+        if start is None:
+            first_paid = Payment.objects.filter(status="succeeded").aggregate(first=Min("paid_at"))["first"]
+            if first_paid is None:
+                self.stdout.write("Успешных оплат нет")
+                return
+            start = timezone.localdate(first_paid)
+        rows = RevenueService.recompute(start, end)
+        self.stdout.write(self.style.SUCCESS(f"Пересчитаны сводки с {start} по {end}: {rows} строк"))
+
+    @staticmethod
+    def _date(value):
+        if value is None:
+            return None
+        try:
+            date = parse_date(value)
+        except ValueError:
+            date = None
+        if date is None:
+            raise CommandError(f"Неверная дата: {value}")
+        return date
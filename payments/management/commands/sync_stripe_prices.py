@@ -0,0 +1,40 @@
+import stripe
+from django.core.management.base import BaseCommand, CommandError
+
+from payments.gateway import StripeUnavailable
+from payments.services import sync_price_catalog
+
+
+class Command(BaseCommand):
+    """
+    Команда для загрузки каталога цен из Stripe в локальную базу.
+
+    Активные цены (с продуктами) записываются в модель StripePrice, отсутствующие
+    в Stripe помечаются неактивными, после чего каталог в памяти всех процессов
+    перечитывается. Код тарифа берется из lookup_key цены или metadata["plan"].
+
+    Атрибуты:
+        help (str): Описание команды, которое будет отображаться в справке.
+    """
+
+    help = "Синхронизирует локальный каталог цен с Stripe"
+
+    def handle(self, *args, **options):
+        """
+        Загружает цены из Stripe и выводит итог.
+
+        Args:
+            *args: Позиционные аргументы, переданные в команду.
+            **options: Именованные аргументы, переданные в команду.
+
+        Returns:
+            None
+
+        Raises:
+            CommandError: Если Stripe вернул ошибку или недоступен.
+        """
+        try:
+            synced, deactivated = sync_price_catalog()
+        except (stripe.error.StripeError, StripeUnavailable) as error:
+            raise CommandError(f"Не удалось загрузить цены из Stripe: {error}")
+        self.stdout.write(self.style.SUCCESS(f"Синхронизировано цен: {synced}, деактивировано: {deactivated}"))
@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-16 23:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0003_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StripePrice",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("stripe_price_id", models.CharField(max_length=255, unique=True)),
+                ("stripe_product_id", models.CharField(max_length=255)),
+                ("plan", models.CharField(max_length=50)),
+                ("name", models.CharField(blank=True, max_length=255)),
+                ("unit_amount", models.PositiveIntegerField()),
+                ("currency", models.CharField(max_length=3)),
+                ("is_active", models.BooleanField(default=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Цена Stripe",
+                "verbose_name_plural": "Цены Stripe",
+                "indexes": [models.Index(fields=["is_active", "plan"], name="stripe_price_plan_idx")],
+            },
+        ),
+    ]
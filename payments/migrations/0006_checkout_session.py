@@ -0,0 +1,62 @@
+# Generated by Django 5.2 on 2026-10-16 23:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def move_checkout_session_ids(apps, schema_editor):
+    """
+    Переносит идентификаторы сессий Checkout, временно хранившиеся в stripe_payment_intent_id.
+    """
+    Payment = apps.get_model("payments", "Payment")
+    for payment_id, session_id in Payment.objects.filter(stripe_payment_intent_id__startswith="cs_").values_list(
+        "id", "stripe_payment_intent_id"
+    ):
+        Payment.objects.filter(pk=payment_id).update(
+            stripe_checkout_session_id=session_id, stripe_payment_intent_id=None
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0005_stripe_event"),
+        ("posts", "0012_content_addressed_variants"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="payment",
+            name="stripe_checkout_session_id",
+            field=models.CharField(blank=True, max_length=255, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name="payment",
+            name="stripe_checkout_url",
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name="payment",
+            name="stripe_price_id",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name="payment",
+            name="stripe_payment_intent_id",
+            field=models.CharField(blank=True, max_length=255, null=True, unique=True),
+        ),
+        migrations.RunPython(move_checkout_session_ids, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="payment",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(
+                    ("status", "pending"),
+                    ("stripe_checkout_session_id__isnull", False),
+                    models.Q(("stripe_price_id", ""), _negated=True),
+                ),
+                fields=("user", "stripe_price_id"),
+                name="payment_open_checkout_unique",
+            ),
+        ),
+    ]
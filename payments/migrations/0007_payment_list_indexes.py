@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-16 23:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0006_checkout_session"),
+        ("posts", "0012_content_addressed_variants"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(fields=["user", "payment_date", "id"], name="payment_user_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(fields=["payment_date", "id"], name="payment_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(fields=["paid_post", "status"], name="payment_post_status_idx"),
+        ),
+    ]
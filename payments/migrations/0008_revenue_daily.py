@@ -0,0 +1,91 @@
+# Generated by Django 5.2 on 2026-10-16 23:59
+
+import django.db.models.deletion
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_paid_at(apps, schema_editor):
+    """
+    Отмечает время оплаты уже успешных платежей временем их создания.
+    """
+    Payment = apps.get_model("payments", "Payment")
+    Payment.objects.filter(status="succeeded", paid_at__isnull=True).update(paid_at=models.F("payment_date"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0007_payment_list_indexes"),
+        ("posts", "0012_content_addressed_variants"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RevenueDaily",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("day", models.DateField()),
+                (
+                    "payment_method",
+                    models.CharField(
+                        choices=[("cash", "Наличные"), ("transfer", "Перевод на счет"), ("stripe", "Stripe")],
+                        max_length=10,
+                    ),
+                ),
+                ("payments_count", models.PositiveIntegerField(default=0)),
+                ("amount", models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Выручка за день",
+                "verbose_name_plural": "Выручка по дням",
+            },
+        ),
+        migrations.AddField(
+            model_name="payment",
+            name="paid_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_paid_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(fields=["paid_at"], name="payment_paid_at_idx"),
+        ),
+        migrations.AddField(
+            model_name="revenuedaily",
+            name="author",
+            field=models.ForeignKey(
+                blank=True,
+                db_constraint=False,
+                null=True,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddField(
+            model_name="revenuedaily",
+            name="post",
+            field=models.ForeignKey(
+                blank=True,
+                db_constraint=False,
+                null=True,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="+",
+                to="posts.post",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="revenuedaily",
+            constraint=models.UniqueConstraint(
+                models.F("day"),
+                django.db.models.functions.comparison.Coalesce("post", 0),
+                django.db.models.functions.comparison.Coalesce("author", 0),
+                models.F("payment_method"),
+                name="revenue_daily_bucket_unique",
+            ),
+        ),
+    ]
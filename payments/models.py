@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
 
 class Payment(models.Model):
@@ -16,8 +18,14 @@ class Payment(models.Model):
         amount (DecimalField): Сумма платежа в минимальных единицах валюты (например, копейки).
         payment_method (CharField): Метод оплаты. Может принимать значения из PAYMENT_METHODS.
         is_subscription (BooleanField): Указывает, является ли платеж подпиской (True) или одноразовым (False).
-        stripe_payment_intent_id (CharField): Уникальный идентификатор платежа в Stripe.
-        status (CharField): Статус платежа (например, 'pending', 'succeeded', 'failed').
+        stripe_payment_intent_id (CharField): Уникальный идентификатор платежа (PaymentIntent) в Stripe.
+                                              Для оплаты через Checkout заполняется после завершения оплаты.
+        stripe_price_id (CharField): Идентификатор оплачиваемой цены Stripe.
+        stripe_checkout_session_id (CharField): Уникальный идентификатор сессии Stripe Checkout.
+        stripe_checkout_url (TextField): Ссылка на страницу оплаты сессии Checkout.
+        status (CharField): Статус платежа (например, 'pending', 'succeeded', 'failed', 'expired').
+        paid_at (DateTimeField): Время перехода платежа в статус 'succeeded'; по нему платеж
+                                 относится к дню в сводке выручки RevenueDaily.
     """
 
     PAYMENT_METHODS = [
@@ -32,8 +40,48 @@ class Payment(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     payment_method = models.CharField(max_length=10, choices=PAYMENT_METHODS)
     is_subscription = models.BooleanField(default=False)
-    stripe_payment_intent_id = models.CharField(max_length=255, unique=True)
+    stripe_payment_intent_id = models.CharField(max_length=255, unique=True, null=True, blank=True)
+    stripe_price_id = models.CharField(max_length=255, blank=True)
+    stripe_checkout_session_id = models.CharField(max_length=255, unique=True, null=True, blank=True)
+    stripe_checkout_url = models.TextField(blank=True)
     status = models.CharField(max_length=50, default="pending")
+    paid_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        """
+        Метаданные модели Payment.
+
+        Атрибуты:
+            indexes (list): Индексы для списка платежей пользователя (user, payment_date, id),
+                            списка всех платежей (payment_date, id), поиска оплат поста (paid_post, status)
+                            и пересчета выручки за день (paid_at).
+            constraints (list): Не более одной открытой сессии Checkout пользователя на одну цену.
+        """
+
+        indexes = [
+            models.Index(fields=["user", "payment_date", "id"], name="payment_user_date_idx"),
+            models.Index(fields=["payment_date", "id"], name="payment_date_idx"),
+            models.Index(fields=["paid_post", "status"], name="payment_post_status_idx"),
+            models.Index(fields=["paid_at"], name="payment_paid_at_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "stripe_price_id"],
+                condition=models.Q(status="pending", stripe_checkout_session_id__isnull=False)
+                & ~models.Q(stripe_price_id=""),
+                name="payment_open_checkout_unique",
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        """
+        Сохраняет платеж, отмечая время оплаты при первом сохранении в статусе 'succeeded'.
+        """
+        if self.status == "succeeded" and self.paid_at is None:
+            self.paid_at = timezone.now()
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "paid_at"}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         """
@@ -47,3 +95,164 @@ class Payment(models.Model):
         return (
             f"{self.user.username} - {self.amount} - {'Subscription' if self.is_subscription else self.payment_method}"
         )
+
+
+class StripePrice(models.Model):
+    """
+    Локальная копия цены из каталога Stripe.
+
+    Каталог загружается из Stripe командой sync_stripe_prices и читается при оформлении
+    оплаты из памяти процесса (см. payments.services.PriceCatalog), поэтому оформление
+    не создает в Stripe ни продуктов, ни цен.
+
+    Атрибуты:
+        stripe_price_id (str): Идентификатор цены в Stripe.
+        stripe_product_id (str): Идентификатор продукта в Stripe.
+        plan (str): Код тарифа (lookup_key цены или metadata["plan"]), например 'basic' или 'premium'.
+        name (str): Название продукта.
+        unit_amount (int): Сумма в минимальных единицах валюты (например, центы).
+        currency (str): Код валюты в нижнем регистре.
+        is_active (bool): Активна ли цена в Stripe.
+        updated_at (DateTimeField): Время последней синхронизации.
+    """
+
+    stripe_price_id = models.CharField(max_length=255, unique=True)
+    stripe_product_id = models.CharField(max_length=255)
+    plan = models.CharField(max_length=50)
+    name = models.CharField(max_length=255, blank=True)
+    unit_amount = models.PositiveIntegerField()
+    currency = models.CharField(max_length=3)
+    is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Цена Stripe"
+        verbose_name_plural = "Цены Stripe"
+        indexes = [
+            models.Index(fields=["is_active", "plan"], name="stripe_price_plan_idx"),
+        ]
+
+    def __str__(self):
+        """
+        Возвращает строковое представление цены.
+
+        Returns:
+            str: Тариф, сумма и валюта.
+        """
+        return f"{self.plan} - {self.unit_amount / 100:.2f} {self.currency.upper()}"
+
+
+class StripeEvent(models.Model):
+    """
+    Событие вебхука Stripe, сохраненное для асинхронной обработки.
+
+    Вебхук только проверяет подпись и записывает событие (повторная доставка
+    того же события игнорируется по первичному ключу), а обработка выполняется
+    задачей Celery payments.tasks.process_stripe_event.
+
+    Атрибуты:
+        event_id (str): Идентификатор события в Stripe (первичный ключ).
+        type (str): Тип события, например 'payment_intent.succeeded'.
+        payload (dict): Тело события в формате API Stripe.
+        status (str): Состояние обработки из STATUSES.
+        attempts (int): Количество попыток обработки.
+        last_error (str): Текст последней ошибки обработки.
+        received_at (DateTimeField): Время получения события.
+        claimed_at (DateTimeField): Время начала последней попытки обработки.
+        processed_at (DateTimeField): Время завершения обработки.
+    """
+
+    PENDING = "pending"
+    PROCESSING = "processing"
+    PROCESSED = "processed"
+    FAILED = "failed"
+    STATUSES = [
+        (PENDING, "Ожидает обработки"),
+        (PROCESSING, "Обрабатывается"),
+        (PROCESSED, "Обработано"),
+        (FAILED, "Ошибка"),
+    ]
+
+    event_id = models.CharField(max_length=255, primary_key=True)
+    type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUSES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Событие Stripe"
+        verbose_name_plural = "События Stripe"
+        indexes = [
+            models.Index(fields=["status", "received_at"], name="stripe_event_status_idx"),
+        ]
+
+    def __str__(self):
+        """
+        Возвращает строковое представление события.
+
+        Returns:
+            str: Идентификатор, тип и состояние события.
+        """
+        return f"{self.event_id} - {self.type} - {self.status}"
+
+
+class RevenueDaily(models.Model):
+    """
+    Сводка выручки за день по посту, автору и методу оплаты.
+
+    Отчеты о выручке читают только эту таблицу, поэтому стоимость отчета зависит
+    от количества дней в периоде, а не от количества платежей. Сводка за текущий
+    день пополняется при обработке вебхука об успешной оплате
+    (см. payments.services.RevenueService.add), а закрытые дни каждую ночь
+    пересчитываются по платежам задачей payments.tasks.recompute_revenue_rollups.
+
+    Пост и автор хранятся без внешнего ключа в базе: сводка остается после
+    удаления поста или пользователя.
+
+    Атрибуты:
+        day (DateField): День оплаты (по paid_at в часовом поясе проекта).
+        post (ForeignKey): Оплаченный пост; None - подписка.
+        author (ForeignKey): Автор оплаченного поста; None - подписка.
+        payment_method (str): Метод оплаты.
+        payments_count (int): Количество успешных платежей.
+        amount (Decimal): Сумма успешных платежей.
+        updated_at (DateTimeField): Время последнего изменения.
+    """
+
+    day = models.DateField()
+    post = models.ForeignKey(
+        "posts.Post", null=True, blank=True, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+"
+    )
+    author = models.ForeignKey(
+        "users.CustomUser", null=True, blank=True, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+"
+    )
+    payment_method = models.CharField(max_length=10, choices=Payment.PAYMENT_METHODS)
+    payments_count = models.PositiveIntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Выручка за день"
+        verbose_name_plural = "Выручка по дням"
+        constraints = [
+            models.UniqueConstraint(
+                "day",
+                Coalesce("post", 0),
+                Coalesce("author", 0),
+                "payment_method",
+                name="revenue_daily_bucket_unique",
+            ),
+        ]
+
+    def __str__(self):
+        """
+        Возвращает строковое представление сводки.
+
+        Returns:
+            str: День, пост, метод оплаты и сумма.
+        """
+        return f"{self.day} - {self.post_id or 'subscription'} - {self.payment_method} - {self.amount}"
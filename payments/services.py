@@ -1,7 +1,18 @@
-import stripe
+import datetime
+import time
+
 from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from posts.cache import bump_version, get_version
+from posts.services import EntitlementService, SubscriptionService
 
-stripe.api_key = settings.STRIPE_TEST_SECRET_KEY
+from .gateway import get_gateway
+from .models import Payment, RevenueDaily, StripeEvent, StripePrice
 
 
 def create_product(name, description):
@@ -15,7 +26,7 @@ def create_product(name, description):
     Returns:
         dict: Ответ от Stripe о создании продукта, содержащий информацию о продукте, включая его ID.
     """
-    product = stripe.Product.create(
+    product = get_gateway().create_product(
         name=name,
         description=description,
     )
@@ -34,7 +45,7 @@ def create_price(product_id, amount, currency="usd"):
     Returns:
         dict: Ответ от Stripe о создании цены, содержащий информацию о цене, включая её ID.
     """
-    price = stripe.Price.create(
+    price = get_gateway().create_price(
         unit_amount=amount,
         currency=currency,
         product=product_id,
@@ -42,17 +53,28 @@ def create_price(product_id, amount, currency="usd"):
     return price
 
 
-def create_checkout_session(price_id):
+def create_checkout_session(price_id, client_reference_id=None, metadata=None, expires_at=None):
     """
     Создает сессию для оплаты в Stripe.
 
     Args:
         price_id (str): ID цены, соответствующей продукту.
+        client_reference_id (str | None): Идентификатор покупателя в приложении.
+        metadata (dict | None): Метаданные сессии (например, код тарифа).
+        expires_at (int | None): Время окончания сессии (Unix time); по умолчанию 24 часа.
 
     Returns:
         dict: Ответ от Stripe с URL для оплаты и информацией о сессии.
     """
-    session = stripe.checkout.Session.create(
+    params = {}
+    if client_reference_id is not None:
+        params["client_reference_id"] = str(client_reference_id)
+    if metadata:
+        params["metadata"] = metadata
+        params["payment_intent_data"] = {"metadata": metadata}
+    if expires_at is not None:
+        params["expires_at"] = int(expires_at)
+    session = get_gateway().create_checkout_session(
         payment_method_types=["card"],
         line_items=[
             {
@@ -63,24 +85,627 @@ def create_checkout_session(price_id):
         mode="payment",
         success_url="http://localhost:8000/success/",
         cancel_url="http://localhost:8000/cancel/",
+        **params,
     )
     return session
 
 
-def create_subscription(user, amount):
+class UnknownPlan(Exception):
+    """
+    Исключение для тарифа, которого нет в локальном каталоге цен.
+    """
+
+
+def create_subscription(user, plan):
     """
-    Создает разовую подписку для пользователя.
+    Создает сессию оплаты разовой подписки по цене из локального каталога.
+
+    Продукт и цена не создаются: они берутся из каталога (см. PriceCatalog),
+    поэтому в Stripe выполняется один запрос - создание сессии.
 
     Args:
-        user (Any): Объект пользователя, который будет подписан.
-        amount (int): Сумма подписки в копейках (например, 1000 для 10.00 USD).
+        user (User): Пользователь, оформляющий подписку.
+        plan (str): Код тарифа, например 'basic' или 'premium'.
 
     Returns:
         dict: Ответ от Stripe с URL для оплаты и информацией о сессии подписки.
+
+    Raises:
+        UnknownPlan: Если активной цены тарифа нет в каталоге.
     """
+    price = PriceCatalog.get(plan)
+    if price is None:
+        raise UnknownPlan(plan)
+    return create_checkout_session(price.stripe_price_id, client_reference_id=user.pk, metadata={"plan": plan})
 
-    product = create_product(name="Разовая подписка", description="Оплата за разовую подписку")
-    price = create_price(product.id, amount)
 
-    session = create_checkout_session(price.id)
-    return session
+class CheckoutInProgress(Exception):
+    """
+    Исключение для оформления оплаты, которое уже выполняется другим запросом пользователя.
+    """
+
+
+class CheckoutService:
+    """
+    Оформление оплаты без дублирования сессий Stripe Checkout.
+
+    Повторное нажатие кнопки или повтор запроса мобильным клиентом возвращает еще
+    открытую сессию пользователя для той же цены, а не создает новую. Одновременные
+    запросы одного пользователя упорядочиваются блокировкой в кэше (cache.add с коротким
+    временем жизни): запрос без блокировки недолго ждет платеж, созданный первым.
+    Если блокировка истекла раньше, чем Stripe ответил, второй платеж не будет создан
+    из-за условного уникального ограничения payment_open_checkout_unique.
+
+    Сессия создается со сроком CHECKOUT_SESSION_TTL; сессия считается открытой,
+    пока до ее окончания остается не меньше REUSE_MARGIN.
+
+    Атрибуты:
+        LOCK_TIMEOUT (int): Время жизни блокировки, в секундах.
+        WAIT (float): Максимальное время ожидания чужого оформления, в секундах.
+        REUSE_MARGIN (timedelta): Запас до окончания сессии, при котором она еще выдается повторно.
+
+    Методы:
+        start(user, price): Возвращает открытый платеж пользователя или создает новый.
+        open_payment(user_id, price): Возвращает платеж с открытой сессией.
+    """
+
+    LOCK_TIMEOUT = 10
+    WAIT = 3.0
+    REUSE_MARGIN = datetime.timedelta(minutes=5)
+
+    @staticmethod
+    def lock_key(user_id):
+        """
+        Возвращает ключ блокировки оформления оплаты пользователя.
+        """
+        return f"payments:checkout-lock:{user_id}"
+
+    @classmethod
+    def _open_since(cls):
+        return timezone.now() - datetime.timedelta(seconds=settings.CHECKOUT_SESSION_TTL) + cls.REUSE_MARGIN
+
+    @classmethod
+    def open_payment(cls, user_id, price):
+        """
+        Возвращает платеж пользователя с еще открытой сессией Checkout для цены.
+
+        Args:
+            user_id (int): Идентификатор пользователя.
+            price (StripePrice): Цена.
+
+        Returns:
+            Payment | None: Платеж или None.
+        """
+        return (
+            Payment.objects.filter(
+                user_id=user_id,
+                stripe_price_id=price.stripe_price_id,
+                status="pending",
+                stripe_checkout_session_id__isnull=False,
+                payment_date__gt=cls._open_since(),
+            )
+            .order_by("-payment_date")
+            .first()
+        )
+
+    @classmethod
+    def start(cls, user, price):
+        """
+        Возвращает открытый платеж пользователя для цены или создает сессию и платеж.
+
+        Args:
+            user (User): Пользователь.
+            price (StripePrice): Цена из каталога.
+
+        Returns:
+            tuple: (Payment, True, если сессия создана этим вызовом).
+
+        Raises:
+            CheckoutInProgress: Если другой запрос пользователя не завершил оформление за WAIT секунд.
+        """
+        payment = cls.open_payment(user.pk, price)
+        if payment is not None:
+            return payment, False
+
+        key = cls.lock_key(user.pk)
+        if not cache.add(key, 1, cls.LOCK_TIMEOUT):
+            deadline = time.monotonic() + cls.WAIT
+            while time.monotonic() < deadline:
+                time.sleep(0.1)
+                payment = cls.open_payment(user.pk, price)
+                if payment is not None:
+                    return payment, False
+            raise CheckoutInProgress(user.pk)
+
+        try:
+            payment = cls.open_payment(user.pk, price)
+            if payment is not None:
+                return payment, False
+            return cls._create(user, price), True
+        finally:
+            cache.delete(key)
+
+    @classmethod
+    def _create(cls, user, price):
+        """
+        Создает сессию Checkout и платеж, закрывая просроченные открытые платежи пользователя.
+        """
+        Payment.objects.filter(
+            user=user,
+            stripe_price_id=price.stripe_price_id,
+            status="pending",
+            stripe_checkout_session_id__isnull=False,
+            payment_date__lte=cls._open_since(),
+        ).update(status="expired")
+
+        session = create_checkout_session(
+            price.stripe_price_id,
+            client_reference_id=user.pk,
+            metadata={"plan": price.plan},
+            expires_at=time.time() + settings.CHECKOUT_SESSION_TTL,
+        )
+        try:
+            with transaction.atomic():
+                return Payment.objects.create(
+                    user=user,
+                    amount=price.unit_amount,
+                    payment_method="stripe",
+                    is_subscription=True,
+                    stripe_price_id=price.stripe_price_id,
+                    stripe_checkout_session_id=session["id"],
+                    stripe_checkout_url=session["url"],
+                )
+        except IntegrityError:
+            payment = cls.open_payment(user.pk, price)
+            if payment is None:
+                raise
+            return payment
+
+
+class PriceCatalog:
+    """
+    Каталог цен Stripe в памяти процесса.
+
+    Цены читаются из модели StripePrice одним запросом и хранятся в памяти процесса.
+    На каждом обращении проверяется только номер версии в общем кэше; синхронизация
+    каталога и изменение цен увеличивают версию, после чего все процессы перечитывают
+    каталог. Для тарифа выбирается последняя синхронизированная активная цена.
+
+    Атрибуты:
+        VERSION_NAME (str): Имя версии каталога в кэше.
+
+    Методы:
+        get(plan): Возвращает активную цену тарифа или None.
+        plans(): Возвращает словарь активных цен по кодам тарифов.
+        invalidate(): Делает недействительной копию каталога во всех процессах.
+    """
+
+    VERSION_NAME = "payments:prices"
+
+    _local = {"version": None, "prices": {}}
+
+    @classmethod
+    def plans(cls):
+        """
+        Возвращает активные цены, перечитывая каталог из базы при смене версии.
+
+        Returns:
+            dict: Код тарифа -> StripePrice.
+        """
+        version = get_version(cls.VERSION_NAME)
+        local = cls._local
+        if local["version"] != version:
+            prices = StripePrice.objects.filter(is_active=True).order_by("updated_at", "id")
+            local = {"version": version, "prices": {price.plan: price for price in prices}}
+            cls._local = local
+        return local["prices"]
+
+    @classmethod
+    def get(cls, plan):
+        """
+        Возвращает активную цену тарифа.
+
+        Args:
+            plan (str): Код тарифа.
+
+        Returns:
+            StripePrice | None: Цена или None, если тарифа нет в каталоге.
+        """
+        return cls.plans().get(plan)
+
+    @classmethod
+    def invalidate(cls):
+        """
+        Меняет версию каталога.
+
+        Returns:
+            None
+        """
+        bump_version(cls.VERSION_NAME)
+
+
+def sync_price_catalog():
+    """
+    Загружает активные цены из Stripe в модель StripePrice.
+
+    Цены читаются постранично (Price.list с раскрытием продукта), записываются одним
+    bulk_create с обновлением при конфликте по stripe_price_id; цены, которых больше
+    нет среди активных, помечаются неактивными. Цены без кода тарифа (lookup_key или
+    metadata["plan"]) пропускаются. После фиксации транзакции сбрасывается каталог
+    в памяти процессов.
+
+    Returns:
+        tuple: (количество синхронизированных цен, количество деактивированных цен).
+    """
+    prices = []
+    for price in get_gateway().list_prices(active=True, limit=100, expand=["data.product"]):
+        plan = price.get("lookup_key") or (price.get("metadata") or {}).get("plan")
+        if not plan or price.get("unit_amount") is None:
+            continue
+        product = price["product"]
+        prices.append(
+            StripePrice(
+                stripe_price_id=price["id"],
+                stripe_product_id=product["id"] if isinstance(product, dict) else product,
+                plan=plan,
+                name=product.get("name", "") if isinstance(product, dict) else "",
+                unit_amount=price["unit_amount"],
+                currency=price["currency"],
+                is_active=True,
+            )
+        )
+
+    with transaction.atomic():
+        StripePrice.objects.bulk_create(
+            prices,
+            update_conflicts=True,
+            unique_fields=["stripe_price_id"],
+            update_fields=["stripe_product_id", "plan", "name", "unit_amount", "currency", "is_active", "updated_at"],
+        )
+        deactivated = (
+            StripePrice.objects.filter(is_active=True)
+            .exclude(stripe_price_id__in=[price.stripe_price_id for price in prices])
+            .update(is_active=False)
+        )
+        transaction.on_commit(PriceCatalog.invalidate)
+    return len(prices), deactivated
+
+
+class StripeEventService:
+    """
+    Сервис приема и обработки событий вебхука Stripe.
+
+    Вебхук записывает событие вызовом record() и сразу отвечает Stripe, а задача
+    Celery вызывает process(). Повторная доставка события не создает новую запись,
+    а обработка начинается с захвата события одним UPDATE по состоянию, поэтому
+    каждое событие применяется один раз, даже если задача поставлена несколько раз.
+    Изменения платежа выполняются одним UPDATE с условием на текущий статус.
+
+    Успешная оплата в той же транзакции выдает доступ: продлевает подписку
+    (SubscriptionService.extend) и включает флаг пользователя. После фиксации
+    удаляется снимок доступа пользователя в общем кэше, поэтому все веб-процессы
+    видят покупку уже на следующем запросе.
+
+    Атрибуты:
+        MAX_ATTEMPTS (int): Количество попыток, после которого событие помечается ошибочным.
+        CLAIM_TIMEOUT (timedelta): Время, после которого захваченное, но не обработанное
+            событие (например, при падении воркера) можно захватить снова.
+        HANDLERS (dict): Тип события -> имя метода-обработчика.
+
+    Методы:
+        record(data): Сохраняет событие, игнорируя повторную доставку.
+        process(event_id): Захватывает и применяет событие.
+        pending_ids(older_than, limit): Возвращает события, ожидающие обработки.
+    """
+
+    MAX_ATTEMPTS = 5
+    CLAIM_TIMEOUT = datetime.timedelta(minutes=5)
+
+    HANDLERS = {
+        "payment_intent.succeeded": "_payment_intent_succeeded",
+        "payment_intent.payment_failed": "_payment_intent_failed",
+        "checkout.session.completed": "_checkout_session_completed",
+        "checkout.session.async_payment_succeeded": "_checkout_session_succeeded",
+        "checkout.session.async_payment_failed": "_checkout_session_failed",
+        "checkout.session.expired": "_checkout_session_expired",
+    }
+
+    @staticmethod
+    def record(data):
+        """
+        Сохраняет проверенное событие Stripe.
+
+        Выполняет INSERT с игнорированием конфликта по идентификатору события,
+        поэтому повторная доставка не меняет уже сохраненное событие.
+
+        Args:
+            data (dict): Тело события в формате API Stripe.
+
+        Returns:
+            None
+        """
+        StripeEvent.objects.bulk_create(
+            [StripeEvent(event_id=data["id"], type=data["type"], payload=data)], ignore_conflicts=True
+        )
+
+    @classmethod
+    def _claimable(cls, now):
+        """
+        Возвращает условие для событий, которые можно захватить для обработки.
+        """
+        return Q(status=StripeEvent.PENDING) | Q(status=StripeEvent.PROCESSING, claimed_at__lt=now - cls.CLAIM_TIMEOUT)
+
+    @classmethod
+    def pending_ids(cls, older_than, limit):
+        """
+        Возвращает идентификаторы событий, ожидающих обработки.
+
+        Args:
+            older_than (datetime): Учитываются только события, полученные раньше этого момента.
+            limit (int): Максимальное количество событий.
+
+        Returns:
+            list[str]: Идентификаторы событий в порядке получения.
+        """
+        return list(
+            StripeEvent.objects.filter(cls._claimable(timezone.now()), received_at__lt=older_than)
+            .order_by("received_at")
+            .values_list("event_id", flat=True)[:limit]
+        )
+
+    @classmethod
+    def process(cls, event_id):
+        """
+        Захватывает событие и применяет его.
+
+        Захват - один UPDATE, переводящий событие в состояние 'processing', если оно
+        ожидает обработки; если событие уже обработано или обрабатывается другим
+        воркером, метод ничего не делает. Изменения данных и отметка об обработке
+        фиксируются в одной транзакции. При ошибке событие возвращается в очередь
+        (или помечается ошибочным после MAX_ATTEMPTS попыток), а исключение
+        пробрасывается.
+
+        Args:
+            event_id (str): Идентификатор события в Stripe.
+
+        Returns:
+            bool: True, если событие было обработано этим вызовом.
+        """
+        now = timezone.now()
+        claimed = StripeEvent.objects.filter(cls._claimable(now), pk=event_id).update(
+            status=StripeEvent.PROCESSING, claimed_at=now, attempts=F("attempts") + 1
+        )
+        if not claimed:
+            return False
+
+        event = StripeEvent.objects.get(pk=event_id)
+        try:
+            with transaction.atomic():
+                handler = cls.HANDLERS.get(event.type)
+                if handler is not None:
+                    getattr(cls, handler)(event.payload["data"]["object"])
+                StripeEvent.objects.filter(pk=event_id).update(
+                    status=StripeEvent.PROCESSED, processed_at=timezone.now(), last_error=""
+                )
+        except Exception as error:
+            StripeEvent.objects.filter(pk=event_id).update(
+                status=StripeEvent.FAILED if event.attempts >= cls.MAX_ATTEMPTS else StripeEvent.PENDING,
+                last_error=repr(error),
+            )
+            raise
+        return True
+
+    @staticmethod
+    def _set_payment_status(lookup, status, **fields):
+        """
+        Меняет статус платежа одним UPDATE.
+
+        Успешный платеж не переводится в другой статус: события Stripe могут приходить
+        не по порядку. Если статус изменился, после фиксации транзакции сбрасывается
+        кэш доступа пользователя.
+
+        Args:
+            lookup (dict): Условие поиска платежа.
+            status (str): Новый статус.
+            **fields: Другие поля платежа, изменяемые тем же UPDATE.
+
+        Returns:
+            list[dict]: Измененные платежи (user_id, is_subscription и поля сводки выручки:
+                amount, payment_method, paid_post_id, paid_post__owner_id); пустой список,
+                если статус уже был установлен.
+        """
+        payments = Payment.objects.filter(**lookup).exclude(status=status)
+        if status != "succeeded":
+            payments = payments.exclude(status="succeeded")
+        if not payments.update(status=status, **fields):
+            return []
+        changed = list(
+            Payment.objects.filter(**lookup).values(
+                "user_id", "is_subscription", "amount", "payment_method", "paid_post_id", "paid_post__owner_id"
+            )
+        )
+        user_ids = [payment["user_id"] for payment in changed]
+        transaction.on_commit(lambda: EntitlementService.invalidate_many(user_ids))
+        return changed
+
+    @classmethod
+    def _grant(cls, lookup, stripe_object, **fields):
+        """
+        Отмечает платеж успешным и выдает оплаченный доступ.
+
+        Выдача выполняется только тем вызовом, который перевел платеж в 'succeeded':
+        UPDATE с условием на статус блокирует строку платежа, и параллельная обработка
+        другого события о том же платеже (или повторная доставка) после ожидания
+        блокировки не изменит ни одной строки. Оплата подписки создает или продлевает
+        Subscription на SUBSCRIPTION_PERIOD_DAYS дней; оплата поста открывает доступ
+        через сам платеж. Сумма платежа добавляется в сводку выручки за текущий день.
+
+        Args:
+            lookup (dict): Условие поиска платежа.
+            stripe_object (dict): Объект Stripe из события (metadata["plan"] - код тарифа).
+            **fields: Другие поля платежа, изменяемые вместе со статусом.
+        """
+        now = timezone.now()
+        period = datetime.timedelta(days=settings.SUBSCRIPTION_PERIOD_DAYS)
+        plan = (stripe_object.get("metadata") or {}).get("plan", "")
+        changed = cls._set_payment_status(lookup, "succeeded", paid_at=now, **fields)
+        for payment in changed:
+            if payment["is_subscription"]:
+                SubscriptionService.extend(payment["user_id"], plan, period)
+        if changed:
+            RevenueService.add(timezone.localdate(now), changed)
+
+    @classmethod
+    def _payment_intent_succeeded(cls, payment_intent):
+        cls._grant({"stripe_payment_intent_id": payment_intent["id"]}, payment_intent)
+
+    @classmethod
+    def _payment_intent_failed(cls, payment_intent):
+        cls._set_payment_status({"stripe_payment_intent_id": payment_intent["id"]}, "failed")
+
+    @classmethod
+    def _checkout_session_completed(cls, session):
+        if session.get("payment_status") in ("paid", "no_payment_required"):
+            cls._checkout_session_succeeded(session)
+
+    @classmethod
+    def _checkout_session_succeeded(cls, session):
+        fields = {"stripe_payment_intent_id": session["payment_intent"]} if session.get("payment_intent") else {}
+        cls._grant({"stripe_checkout_session_id": session["id"]}, session, **fields)
+
+    @classmethod
+    def _checkout_session_failed(cls, session):
+        cls._set_payment_status({"stripe_checkout_session_id": session["id"]}, "failed")
+
+    @classmethod
+    def _checkout_session_expired(cls, session):
+        cls._set_payment_status({"stripe_checkout_session_id": session["id"]}, "expired")
+
+
+class RevenueService:
+    """
+    Сводки выручки по дням (RevenueDaily) и отчеты по ним.
+
+    Сводка за текущий день пополняется в транзакции обработки успешной оплаты,
+    закрытые дни пересчитываются по платежам периодической задачей. Отчеты читают
+    только сводки: запрос за период затрагивает строки сводки за эти дни и не
+    обращается к таблице платежей.
+
+    Атрибуты:
+        GROUPINGS (dict): Допустимые группировки отчета -> поле RevenueDaily.
+
+    Методы:
+        add(day, payments): Добавляет успешные платежи в сводку за день.
+        recompute(start, end): Пересчитывает сводки за дни по платежам.
+        report(start, end, group_by): Возвращает выручку за период.
+    """
+
+    GROUPINGS = {"day": "day", "post": "post_id", "author": "author_id", "payment_method": "payment_method"}
+
+    @staticmethod
+    def add(day, payments):
+        """
+        Добавляет платежи в сводку за день.
+
+        Каждая строка сводки меняется одним UPDATE с F-выражениями; если строки еще
+        нет, она создается (при одновременном создании повторяется UPDATE).
+        Метод должен вызываться в транзакции, изменившей статус платежей.
+
+        Args:
+            day (date): День сводки.
+            payments (Iterable[dict]): Платежи с полями amount, payment_method,
+                paid_post_id и paid_post__owner_id.
+
+        Returns:
+            None
+        """
+        buckets = {}
+        for payment in payments:
+            key = (payment["paid_post_id"], payment["paid_post__owner_id"], payment["payment_method"])
+            count, amount = buckets.get(key, (0, 0))
+            buckets[key] = (count + 1, amount + payment["amount"])
+
+        for (post_id, author_id, payment_method), (count, amount) in buckets.items():
+            bucket = RevenueDaily.objects.filter(
+                day=day, post_id=post_id, author_id=author_id, payment_method=payment_method
+            )
+            increment = {"payments_count": F("payments_count") + count, "amount": F("amount") + amount}
+            if bucket.update(**increment):
+                continue
+            try:
+                with transaction.atomic():
+                    RevenueDaily.objects.create(
+                        day=day,
+                        post_id=post_id,
+                        author_id=author_id,
+                        payment_method=payment_method,
+                        payments_count=count,
+                        amount=amount,
+                    )
+            except IntegrityError:
+                bucket.update(**increment)
+
+    @staticmethod
+    def recompute(start, end):
+        """
+        Пересчитывает сводки за дни с start по end включительно.
+
+        Успешные платежи выбираются по индексу payment_paid_at_idx и группируются
+        одним запросом; сводки за эти дни заменяются в одной транзакции.
+
+        Args:
+            start (date): Первый день.
+            end (date): Последний день.
+
+        Returns:
+            int: Количество строк сводки.
+        """
+        since = timezone.make_aware(datetime.datetime.combine(start, datetime.time.min))
+        until = timezone.make_aware(datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time.min))
+        rows = (
+            Payment.objects.filter(status="succeeded", paid_at__gte=since, paid_at__lt=until)
+            .annotate(day=TruncDate("paid_at"))
+            .values("day", "paid_post_id", "paid_post__owner_id", "payment_method")
+            .annotate(payments_count=Count("id"), total=Sum("amount"))
+            .order_by()
+        )
+        rollups = [
+            RevenueDaily(
+                day=row["day"],
+                post_id=row["paid_post_id"],
+                author_id=row["paid_post__owner_id"],
+                payment_method=row["payment_method"],
+                payments_count=row["payments_count"],
+                amount=row["total"],
+            )
+            for row in rows
+        ]
+        with transaction.atomic():
+            RevenueDaily.objects.filter(day__range=(start, end)).delete()
+            RevenueDaily.objects.bulk_create(rollups)
+        return len(rollups)
+
+    @classmethod
+    def report(cls, start, end, group_by="day"):
+        """
+        Возвращает выручку за период, сгруппированную по дню, посту, автору или методу оплаты.
+
+        Args:
+            start (date): Первый день периода.
+            end (date): Последний день периода.
+            group_by (str): Ключ из GROUPINGS.
+
+        Returns:
+            list[dict]: Строки {group_by: значение, "payments_count": int, "amount": Decimal}.
+
+        Raises:
+            KeyError: Если группировка не поддерживается.
+        """
+        field = cls.GROUPINGS[group_by]
+        rows = (
+            RevenueDaily.objects.filter(day__range=(start, end))
+            .values(field)
+            .annotate(count=Sum("payments_count"), total=Sum("amount"))
+            .order_by(field)
+        )
+        return [{group_by: row[field], "payments_count": row["count"], "amount": row["total"]} for row in rows]
@@ -0,0 +1,77 @@
+import datetime
+import logging
+
+from celery import shared_task
+from django.utils import timezone
+
+from .services import RevenueService, StripeEventService
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def process_stripe_event(event_id):
+    """
+    Обрабатывает сохраненное событие вебхука Stripe.
+
+    Задача ставится в очередь вебхуком после записи события. Повторный запуск
+    для уже обработанного события ничего не делает (см. StripeEventService.process).
+
+    Args:
+        event_id (str): Идентификатор события в Stripe.
+
+    Returns:
+        bool: True, если событие было обработано этим запуском.
+    """
+    return StripeEventService.process(event_id)
+
+
+@shared_task
+def process_pending_stripe_events(delay_seconds=60, batch_size=100):
+    """
+    Периодическая задача, которая дообрабатывает зависшие события Stripe.
+
+    Подбирает события, которые не удалось поставить в очередь (например, брокер был
+    недоступен), вернулись в очередь после ошибки или были захвачены упавшим воркером.
+    События младше delay_seconds не трогаются: их обрабатывает задача, поставленная
+    вебхуком.
+
+    Args:
+        delay_seconds (int): Минимальный возраст события в секундах.
+        batch_size (int): Максимальное количество событий за запуск.
+
+    Returns:
+        int: Количество обработанных событий.
+    """
+    older_than = timezone.now() - datetime.timedelta(seconds=delay_seconds)
+    processed = 0
+    for event_id in StripeEventService.pending_ids(older_than, batch_size):
+        try:
+            processed += StripeEventService.process(event_id)
+        except Exception:
+            logger.exception("Не удалось обработать событие Stripe %s", event_id)
+    if processed:
+        logger.info("Дообработано событий Stripe: %s", processed)
+    return processed
+
+
+@shared_task
+def recompute_revenue_rollups(days=2):
+    """
+    Ночная задача, которая пересчитывает сводки выручки за закрытые дни.
+
+    Сводка текущего дня пополняется при обработке оплат; пересчет последних
+    закрытых дней по платежам исправляет возможные расхождения (например, после
+    ручной правки платежа) и не конкурирует с пополнением текущего дня.
+
+    Args:
+        days (int): Количество закрытых дней до сегодняшнего.
+
+    Returns:
+        int: Количество строк сводки.
+    """
+    end = timezone.localdate() - datetime.timedelta(days=1)
+    start = end - datetime.timedelta(days=days - 1)
+    rows = RevenueService.recompute(start, end)
+    logger.info("Пересчитаны сводки выручки с %s по %s: %s строк", start, end, rows)
+    return rows
@@ -0,0 +1,247 @@
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import stripe
+
+from .gateway import CircuitBreaker, StripeGateway
+
+
+class FakeStripeServer:
+    """
+    Локальный HTTP-сервер, имитирующий нужную приложению часть API Stripe.
+
+    Используется в тестах и бенчмарках вместо api.stripe.com. Шлюз можно направить
+    на сервер по HTTP (api_base=url) или подключить без сети через transport()
+    (см. gateway()). Сервер хранит цены и созданные сессии в памяти и записывает
+    все полученные запросы, чтобы тесты могли проверить количество обращений
+    к Stripe. Методом fail() можно заставить следующие запросы завершиться
+    ошибкой сервера или сбоем соединения.
+
+    Поддерживаются запросы:
+        GET /v1/prices - список цен (продукты раскрыты);
+        POST /v1/checkout/sessions - создание сессии оплаты;
+        GET /v1/checkout/sessions/<id> - получение сессии.
+
+    Атрибуты:
+        prices (list): Цены в формате API Stripe.
+        sessions (dict): Созданные сессии по идентификатору.
+        requests (list): Полученные запросы (метод, путь, параметры).
+        failures (list): Коды ответов для следующих запросов (None - сбой соединения).
+        latency (float): Задержка ответа по HTTP, в секундах.
+        url (str): Адрес сервера для api_base.
+    """
+
+    def __init__(self, prices=None):
+        self.prices = list(prices or [])
+        self.sessions = {}
+        self.requests = []
+        self.failures = []
+        self.latency = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        """
+        Запускает сервер в фоновом потоке.
+        """
+        self._thread.start()
+
+    def stop(self):
+        """
+        Останавливает сервер.
+        """
+        if self._thread.is_alive():
+            self._server.shutdown()
+        self._server.server_close()
+
+    @staticmethod
+    def price(price_id, plan, unit_amount, currency="usd", product_id=None, name=None):
+        """
+        Возвращает цену в формате API Stripe с раскрытым продуктом.
+
+        Args:
+            price_id (str): Идентификатор цены.
+            plan (str): Код тарифа (lookup_key).
+            unit_amount (int): Сумма в минимальных единицах валюты.
+            currency (str): Валюта.
+            product_id (str | None): Идентификатор продукта.
+            name (str | None): Название продукта.
+
+        Returns:
+            dict: Объект цены.
+        """
+        product_id = product_id or f"prod_{plan}"
+        return {
+            "id": price_id,
+            "object": "price",
+            "active": True,
+            "currency": currency,
+            "lookup_key": plan,
+            "metadata": {},
+            "unit_amount": unit_amount,
+            "product": {"id": product_id, "object": "product", "name": name or plan.title()},
+        }
+
+    def fail(self, count=1, status=500):
+        """
+        Заставляет следующие count запросов завершиться ошибкой.
+
+        Args:
+            count (int): Количество запросов.
+            status (int | None): Код ответа; None - сбой соединения без ответа.
+        """
+        self.failures.extend([status] * count)
+
+    def transport(self):
+        """
+        Возвращает транспорт для StripeGateway, обращающийся к серверу без сети.
+
+        Returns:
+            stripe.HTTPClient: Транспорт.
+        """
+        return FakeStripeTransport(self)
+
+    def gateway(self, **options):
+        """
+        Возвращает шлюз Stripe, подключенный к серверу через transport().
+
+        Повторы выполняются без задержки, автомат защиты хранит состояние под
+        отдельным именем.
+
+        Args:
+            **options: Параметры StripeGateway, заменяющие значения по умолчанию.
+
+        Returns:
+            StripeGateway: Шлюз.
+        """
+        options.setdefault("http_client", self.transport())
+        options.setdefault("retry_delay", 0)
+        options.setdefault("breaker", CircuitBreaker("fake-stripe"))
+        return StripeGateway(api_key="sk_test_fake", **options)
+
+    def respond(self, method, url, body=""):
+        """
+        Обрабатывает запрос по URL и телу формы и возвращает (код ответа, JSON-тело).
+
+        Returns:
+            tuple: (код ответа или None при сбое соединения, тело ответа).
+        """
+        url = urlsplit(url)
+        params = dict(parse_qsl(url.query))
+        if body:
+            params.update(parse_qsl(body))
+        return self.handle(method, url.path, params)
+
+    def calls(self, method=None, path=None):
+        """
+        Возвращает записанные запросы, отфильтрованные по методу и пути.
+        """
+        return [
+            request
+            for request in self.requests
+            if (method is None or request[0] == method) and (path is None or request[1] == path)
+        ]
+
+    def handle(self, method, path, params):
+        """
+        Обрабатывает запрос и возвращает (код ответа, тело ответа).
+        """
+        with self._lock:
+            self.requests.append((method, path, params))
+            if self.failures:
+                code = self.failures.pop(0)
+                return code, {"error": {"type": "api_error", "message": "Fake Stripe failure"}}
+            if method == "GET" and path == "/v1/prices":
+                return 200, {"object": "list", "url": "/v1/prices", "has_more": False, "data": self.prices}
+            if method == "POST" and path == "/v1/checkout/sessions":
+                session_id = f"cs_test_{next(self._ids)}"
+                session = {
+                    "id": session_id,
+                    "object": "checkout.session",
+                    "status": "open",
+                    "url": f"https://checkout.stripe.test/{session_id}",
+                    "client_reference_id": params.get("client_reference_id"),
+                    "metadata": {
+                        key[len("metadata[") : -1]: value
+                        for key, value in params.items()
+                        if key.startswith("metadata[")
+                    },
+                    "payment_intent": None,
+                }
+                self.sessions[session_id] = session
+                return 200, session
+            if method == "GET" and path.startswith("/v1/checkout/sessions/"):
+                session = self.sessions.get(path.rsplit("/", 1)[1])
+                if session is not None:
+                    return 200, session
+        return 404, {"error": {"type": "invalid_request_error", "message": f"Unknown request {method} {path}"}}
+
+    def _make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _respond(self, method):
+                time.sleep(fake.latency)
+                length = int(self.headers.get("Content-Length") or 0)
+                code, body = fake.respond(method, self.path, self.rfile.read(length).decode() if length else "")
+                if code is None:
+                    self.close_connection = True
+                    return
+                data = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._respond("GET")
+
+            def do_POST(self):
+                self._respond("POST")
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+class FakeStripeTransport(stripe.HTTPClient):
+    """
+    Транспорт клиента Stripe, передающий запросы в FakeStripeServer без сети.
+
+    Атрибуты:
+        name (str): Имя транспорта для телеметрии клиента Stripe.
+    """
+
+    name = "fake"
+
+    def __init__(self, server):
+        super().__init__()
+        self.server = server
+
+    def request(self, method, url, headers, post_data=None, *, _usage=None):
+        code, body = self.server.respond(method.upper(), url, post_data or "")
+        if code is None:
+            raise stripe.APIConnectionError("Fake Stripe connection failure", should_retry=True)
+        return json.dumps(body), code, {}
+
+    def request_stream(self, method, url, headers, post_data=None, *, _usage=None):
+        raise NotImplementedError
+
+    def close(self):
+        pass
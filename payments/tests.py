@@ -1,16 +1,46 @@
+import hashlib
+import hmac
+import json
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import skipIf
 from unittest.mock import patch
 
-from django.test import TestCase
+import stripe
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import close_old_connections, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from kombu.exceptions import OperationalError
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from posts.models import Post
+from posts.models import Category, Post, Subscription
+from posts.services import EntitlementService
 from users.models import CustomUser
 
-from .models import Payment
+from .gateway import CircuitBreaker, StripeUnavailable, set_gateway
+from .models import Payment, RevenueDaily, StripeEvent, StripePrice
 from .serializers import PaymentSerializer
-from .services import create_checkout_session, create_price, create_product, create_subscription
+from .services import (
+    CheckoutService,
+    PriceCatalog,
+    RevenueService,
+    StripeEventService,
+    UnknownPlan,
+    create_checkout_session,
+    create_price,
+    create_product,
+    create_subscription,
+)
+from .tasks import process_pending_stripe_events, recompute_revenue_rollups
+from .testing import FakeStripeServer
 
 
 class PaymentModelTest(TestCase):
@@ -202,7 +232,7 @@ class StripeServiceTests(TestCase):
     Этот класс содержит тесты для создания продуктов, цен и сессий оплаты через Stripe.
     """
 
-    @patch("stripe.Product.create")
+    @patch("payments.gateway.StripeGateway.create_product")
     def test_create_product(self, mock_create):
         """
         Тест для проверки создания продукта в Stripe.
@@ -211,7 +241,7 @@ class StripeServiceTests(TestCase):
         и возвращает ожидаемые данные.
 
         Args:
-            mock_create (MagicMock): Заглушка для метода create из Stripe API.
+            mock_create (MagicMock): Заглушка для метода шлюза Stripe.
 
         Returns:
             None
@@ -225,7 +255,7 @@ class StripeServiceTests(TestCase):
         self.assertEqual(product["description"], "Test Description")
         mock_create.assert_called_once_with(name="Test Product", description="Test Description")
 
-    @patch("stripe.Price.create")
+    @patch("payments.gateway.StripeGateway.create_price")
     def test_create_price(self, mock_create):
         """
         Тест для проверки создания цены в Stripe.
@@ -234,7 +264,7 @@ class StripeServiceTests(TestCase):
         в Stripe и возвращает ожидаемые данные.
 
         Args:
-            mock_create (MagicMock): Заглушка для метода create из Stripe API.
+            mock_create (MagicMock): Заглушка для метода шлюза Stripe.
 
         Returns:
             None
@@ -246,7 +276,7 @@ class StripeServiceTests(TestCase):
         self.assertEqual(price["id"], "price_test")
         mock_create.assert_called_once_with(unit_amount=1000, currency="usd", product="prod_test")
 
-    @patch("stripe.checkout.Session.create")
+    @patch("payments.gateway.StripeGateway.create_checkout_session")
     def test_create_checkout_session(self, mock_create):
         """
         Тест для проверки создания сессии оплаты в Stripe.
@@ -255,7 +285,7 @@ class StripeServiceTests(TestCase):
         и возвращает ожидаемые данные.
 
         Args:
-            mock_create (MagicMock): Заглушка для метода create из Stripe API.
+            mock_create (MagicMock): Заглушка для метода шлюза Stripe.
 
         Returns:
             None
@@ -268,37 +298,40 @@ class StripeServiceTests(TestCase):
         self.assertEqual(session["url"], "http://localhost:8000/session")
         mock_create.assert_called_once()
 
-    @patch("your_module.create_product")
-    @patch("your_module.create_price")
-    @patch("your_module.create_checkout_session")
-    def test_create_subscription(self, mock_checkout_session, mock_create_price, mock_create_product):
+    def test_create_subscription(self):
         """
         Тест для проверки создания подписки.
 
-        Проверяет, что функция create_subscription корректно создает сессию для подписки
-        и возвращает ожидаемую URL сессии оплаты.
-
-        Args:
-            mock_checkout_session (MagicMock): Заглушка для метода create_checkout_session.
-            mock_create_price (MagicMock): Заглушка для метода create_price.
-            mock_create_product (MagicMock): Заглушка для метода create_product.
+        Проверяет, что функция create_subscription берет цену из локального каталога
+        и выполняет в Stripe только создание сессии оплаты (без продукта и цены).
 
         Returns:
             None
         """
-        mock_create_product.return_value = {"id": "prod_test"}
-        mock_create_price.return_value = {"id": "price_test"}
-        mock_checkout_session.return_value = {"url": "http://localhost:8000/session"}
+        user = CustomUser.objects.create_user(phone_number="1234567890", password="password123")
+        StripePrice.objects.create(
+            stripe_price_id="price_basic",
+            stripe_product_id="prod_basic",
+            plan="basic",
+            unit_amount=500,
+            currency="usd",
+        )
+        PriceCatalog.invalidate()
 
-        user = "test_user"
-        amount = 1000
+        server = FakeStripeServer()
+        self.addCleanup(server.stop)
+        self.addCleanup(set_gateway, set_gateway(server.gateway()))
+        session = create_subscription(user, "basic")
 
-        session = create_subscription(user, amount)
+        self.assertEqual(session["url"], f"https://checkout.stripe.test/{session['id']}")
+        self.assertEqual(len(server.requests), 1)
+        method, path, params = server.requests[0]
+        self.assertEqual((method, path), ("POST", "/v1/checkout/sessions"))
+        self.assertEqual(params["line_items[0][price]"], "price_basic")
+        self.assertEqual(params["client_reference_id"], str(user.pk))
 
-        self.assertEqual(session["url"], "http://localhost:8000/session")
-        mock_create_product.assert_called_once_with(name="Разовая подписка", description="Оплата за разовую подписку")
-        mock_create_price.assert_called_once_with("prod_test", amount)
-        mock_checkout_session.assert_called_once_with("price_test")
+        with self.assertRaises(UnknownPlan):
+            create_subscription(user, "gold")
 
 
 class PaymentViewsTest(TestCase):
@@ -367,3 +400,733 @@ def setUp(self):
         )
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertTrue(Payment.objects.filter(user=self.user, amount=100.00).exists())
+
+
+class StripePriceCatalogTest(TestCase):
+    """
+    Тесты локального каталога цен Stripe и оформления оплаты по нему.
+
+    Запросы к Stripe уходят по HTTP на локальный FakeStripeServer.
+    """
+
+    def setUp(self):
+        """
+        Запускает локальный сервер Stripe с двумя ценами и направляет на него клиент Stripe.
+        """
+        cache.clear()
+        self.server = FakeStripeServer(
+            prices=[
+                FakeStripeServer.price("price_basic", "basic", 500),
+                FakeStripeServer.price("price_premium", "premium", 1000),
+            ]
+        )
+        self.server.start()
+        self.addCleanup(self.server.stop)
+        self.addCleanup(set_gateway, set_gateway(self.server.gateway(http_client=None, api_base=self.server.url)))
+
+        self.user = CustomUser.objects.create_user(phone_number="1234567890", password="password123")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_sync_command_upserts_and_deactivates(self):
+        """
+        Проверяет, что команда загружает цены, обновляет их и деактивирует удаленные.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("sync_stripe_prices", stdout=None)
+        self.assertEqual(PriceCatalog.get("basic").stripe_price_id, "price_basic")
+        self.assertEqual(PriceCatalog.get("premium").unit_amount, 1000)
+
+        self.server.prices = [FakeStripeServer.price("price_basic", "basic", 700)]
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("sync_stripe_prices", stdout=None)
+        self.assertEqual(PriceCatalog.get("basic").unit_amount, 700)
+        self.assertIsNone(PriceCatalog.get("premium"))
+        self.assertFalse(StripePrice.objects.get(stripe_price_id="price_premium").is_active)
+        self.assertEqual(StripePrice.objects.count(), 2)
+
+    def test_catalog_is_served_from_memory(self):
+        """
+        Проверяет, что после первой загрузки каталог читается без запросов к базе.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("sync_stripe_prices", stdout=None)
+        PriceCatalog.get("basic")
+        with self.assertNumQueries(0):
+            self.assertEqual(PriceCatalog.get("basic").plan, "basic")
+
+    def test_checkout_makes_single_stripe_call(self):
+        """
+        Проверяет, что оформление оплаты выполняет в Stripe только создание сессии.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("sync_stripe_prices", stdout=None)
+        self.server.requests.clear()
+
+        response = self.client.post(reverse("payments:payment-create"), {"subscription_type": "premium"})
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(self.server.calls("POST", "/v1/checkout/sessions"), self.server.requests)
+        session_id = next(iter(self.server.sessions))
+        self.assertEqual(response.data["url"], self.server.sessions[session_id]["url"])
+        payment = Payment.objects.get(user=self.user)
+        self.assertEqual(payment.amount, 1000)
+        self.assertEqual(payment.stripe_checkout_session_id, session_id)
+        self.assertEqual(payment.stripe_price_id, "price_premium")
+        self.assertIsNone(payment.stripe_payment_intent_id)
+
+    def test_repeated_checkout_returns_open_session(self):
+        """
+        Проверяет, что повторный запрос возвращает открытую сессию без нового обращения к Stripe.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("sync_stripe_prices", stdout=None)
+        self.server.requests.clear()
+
+        first = self.client.post(reverse("payments:payment-create"), {"subscription_type": "premium"})
+        second = self.client.post(reverse("payments:payment-create"), {"subscription_type": "premium"})
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data["url"], first.data["url"])
+        self.assertEqual(len(self.server.calls("POST", "/v1/checkout/sessions")), 1)
+        self.assertEqual(Payment.objects.filter(user=self.user).count(), 1)
+
+        other = self.client.post(reverse("payments:payment-create"), {"subscription_type": "basic"})
+        self.assertEqual(other.status_code, status.HTTP_201_CREATED)
+        self.assertNotEqual(other.data["url"], first.data["url"])
+
+    def test_expired_session_is_replaced(self):
+        """
+        Проверяет, что для просроченной сессии создается новая, а старый платеж помечается истекшим.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("sync_stripe_prices", stdout=None)
+        first = self.client.post(reverse("payments:payment-create"), {"subscription_type": "premium"})
+        Payment.objects.filter(user=self.user).update(payment_date=timezone.now() - timedelta(hours=1))
+
+        second = self.client.post(reverse("payments:payment-create"), {"subscription_type": "premium"})
+
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertNotEqual(second.data["url"], first.data["url"])
+        self.assertEqual(
+            sorted(Payment.objects.filter(user=self.user).values_list("status", flat=True)), ["expired", "pending"]
+        )
+
+    def test_concurrent_checkout_is_rejected_while_locked(self):
+        """
+        Проверяет, что запрос во время чужого оформления не создает сессию и получает 409.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("sync_stripe_prices", stdout=None)
+        self.server.requests.clear()
+        cache.add(CheckoutService.lock_key(self.user.pk), 1, CheckoutService.LOCK_TIMEOUT)
+
+        with patch.object(CheckoutService, "WAIT", 0.2):
+            response = self.client.post(reverse("payments:payment-create"), {"subscription_type": "premium"})
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.server.requests, [])
+        self.assertFalse(Payment.objects.exists())
+
+    def test_unknown_plan_is_rejected_without_stripe_call(self):
+        """
+        Проверяет, что неизвестный тариф отклоняется без обращения к Stripe.
+        """
+        response = self.client.post(reverse("payments:payment-create"), {"subscription_type": "gold"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.server.requests, [])
+
+
+class PaymentListViewTest(TestCase):
+    """
+    Тесты списка платежей: видимость, keyset-пагинация и набор читаемых полей.
+    """
+
+    def setUp(self):
+        """
+        Создает двух пользователей с платежами и сотрудника.
+        """
+        self.user = CustomUser.objects.create_user(phone_number="1234567890", password="password123")
+        self.other = CustomUser.objects.create_user(phone_number="0987654321", password="password123")
+        self.staff = CustomUser.objects.create_user(phone_number="1111111111", password="password123", is_staff=True)
+        Payment.objects.bulk_create(
+            [
+                Payment(
+                    user=self.user,
+                    amount=100 + number,
+                    payment_method="stripe" if number % 2 else "cash",
+                    stripe_payment_intent_id=f"pi_user_{number}",
+                )
+                for number in range(25)
+            ]
+            + [Payment(user=self.other, amount=500, payment_method="cash", stripe_payment_intent_id="pi_other")]
+        )
+        self.client = APIClient()
+        self.url = reverse("payments:payment-list")
+
+    def collect(self, url):
+        """
+        Проходит все страницы списка по ссылкам next и возвращает идентификаторы платежей.
+        """
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(payment["id"] for payment in response.data["results"])
+            url = response.data["next"]
+        return ids
+
+    def test_user_sees_only_own_payments_page_by_page(self):
+        """
+        Проверяет, что пользователь получает только свои платежи страницами от новых к старым.
+        """
+        self.client.force_authenticate(user=self.user)
+
+        ids = self.collect(f"{self.url}?page_size=10")
+
+        expected = list(
+            Payment.objects.filter(user=self.user).order_by("-payment_date", "-id").values_list("id", flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+    def test_staff_sees_all_payments(self):
+        """
+        Проверяет, что сотрудник видит платежи всех пользователей.
+        """
+        self.client.force_authenticate(user=self.staff)
+        self.assertEqual(len(self.collect(self.url)), 26)
+
+    def test_previous_link_and_filters(self):
+        """
+        Проверяет переход на предыдущую страницу и фильтр по методу оплаты.
+        """
+        self.client.force_authenticate(user=self.user)
+        first = self.client.get(self.url, {"page_size": 5, "payment_method": "cash"})
+        second = self.client.get(first.data["next"])
+        back = self.client.get(second.data["previous"])
+
+        self.assertIsNone(first.data["previous"])
+        self.assertEqual(back.data["results"], first.data["results"])
+        self.assertTrue(all(payment["payment_method"] == "cash" for payment in second.data["results"]))
+
+    def test_invalid_cursor_returns_404(self):
+        """
+        Проверяет, что поврежденный курсор возвращает 404.
+        """
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url, {"cursor": "broken"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_page_reads_only_listed_columns(self):
+        """
+        Проверяет, что страница читается одним запросом без неиспользуемых полей Stripe.
+        """
+        self.client.force_authenticate(user=self.user)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("stripe_checkout_url", queries[0]["sql"])
+        self.assertNotIn("COUNT", queries[0]["sql"].upper())
+
+
+class StripeGatewayTest(TestCase):
+    """
+    Тесты шлюза Stripe: повторы, таймауты и автомат защиты.
+    """
+
+    def setUp(self):
+        """
+        Создает локальный сервер Stripe и шлюз, подключенный к нему без сети.
+        """
+        cache.clear()
+        self.server = FakeStripeServer()
+        self.addCleanup(self.server.stop)
+        self.gateway = self.server.gateway(
+            max_retries=2, breaker=CircuitBreaker("test-stripe", failure_threshold=2, reset_timeout=30)
+        )
+
+    def test_retries_server_errors(self):
+        """
+        Проверяет, что ошибки сервера и сбои соединения повторяются, а запрос выполняется один раз успешно.
+        """
+        self.server.fail(1, status=503)
+        self.server.fail(1, status=None)
+
+        session = self.gateway.create_checkout_session(mode="payment")
+
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(list(self.server.sessions), [session["id"]])
+
+    def test_breaker_opens_and_fails_fast(self):
+        """
+        Проверяет, что после нескольких неудачных вызовов шлюз отказывает сразу, без запросов к Stripe.
+        """
+        self.server.fail(6, status=500)
+        for _ in range(2):
+            with self.assertRaises(StripeUnavailable):
+                self.gateway.create_checkout_session(mode="payment")
+        self.assertEqual(len(self.server.requests), 6)
+
+        with self.assertRaises(StripeUnavailable):
+            self.gateway.create_checkout_session(mode="payment")
+        self.assertEqual(len(self.server.requests), 6)
+
+        cache.delete(self.gateway.breaker._open_key)
+        self.gateway.create_checkout_session(mode="payment")
+        self.assertFalse(self.gateway.breaker.is_open())
+
+    def test_request_errors_are_not_retried(self):
+        """
+        Проверяет, что ошибка запроса пробрасывается без повторов и не считается сбоем Stripe.
+        """
+        with self.assertRaises(stripe.InvalidRequestError):
+            self.gateway.retrieve_checkout_session("cs_missing")
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertIsNone(cache.get(self.gateway.breaker._failures_key))
+
+    def test_slow_response_times_out(self):
+        """
+        Проверяет, что медленный ответ Stripe прерывается таймаутом чтения.
+        """
+        self.server.start()
+        self.server.latency = 1
+        gateway = self.server.gateway(http_client=None, api_base=self.server.url, read_timeout=0.2, max_retries=0)
+
+        started = time.monotonic()
+        with self.assertRaises(StripeUnavailable):
+            gateway.create_checkout_session(mode="payment")
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_checkout_reports_unavailable_stripe(self):
+        """
+        Проверяет, что при недоступном Stripe оформление оплаты возвращает 503 с понятным сообщением.
+        """
+        StripePrice.objects.create(
+            stripe_price_id="price_basic",
+            stripe_product_id="prod_basic",
+            plan="basic",
+            unit_amount=500,
+            currency="usd",
+        )
+        self.addCleanup(set_gateway, set_gateway(self.gateway))
+        self.server.fail(3, status=None)
+        client = APIClient()
+        client.force_authenticate(user=CustomUser.objects.create_user(phone_number="1234567890", password="pass"))
+
+        response = client.post(reverse("payments:payment-create"), {"subscription_type": "basic"})
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response.data["error"], StripeUnavailable.default_message)
+        self.assertFalse(Payment.objects.exists())
+
+
+@override_settings(STRIPE_ENDPOINT_SECRET="whsec_test")
+class StripeWebhookTest(TestCase):
+    """
+    Тесты приема вебхуков Stripe через очередь событий.
+    """
+
+    def setUp(self):
+        """
+        Создает пользователя и ожидающий платеж.
+        """
+        self.user = CustomUser.objects.create_user(phone_number="1234567890", password="password123")
+        self.payment = Payment.objects.create(
+            user=self.user,
+            amount=500,
+            payment_method="stripe",
+            is_subscription=True,
+            stripe_payment_intent_id="pi_test",
+        )
+
+    def send(
+        self, event_id, event_type="payment_intent.succeeded", object_id="pi_test", secret="whsec_test", **fields
+    ):
+        """
+        Отправляет подписанное событие на вебхук, выполняя отложенные после фиксации действия.
+        """
+        payload = json.dumps(
+            {"id": event_id, "object": "event", "type": event_type, "data": {"object": {"id": object_id, **fields}}}
+        )
+        timestamp = int(time.time())
+        signature = hmac.new(secret.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256).hexdigest()
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                reverse("payments:stripe_webhook"),
+                payload,
+                content_type="application/json",
+                HTTP_STRIPE_SIGNATURE=f"t={timestamp},v1={signature}",
+            )
+
+    def test_event_is_stored_and_processed(self):
+        """
+        Проверяет, что событие сохраняется и обрабатывается задачей.
+        """
+        response = self.send("evt_1")
+
+        self.assertEqual(response.status_code, 200)
+        event = StripeEvent.objects.get(pk="evt_1")
+        self.assertEqual(event.status, StripeEvent.PROCESSED)
+        self.assertEqual(event.attempts, 1)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, "succeeded")
+
+    def test_duplicate_delivery_is_applied_once(self):
+        """
+        Проверяет, что повторная доставка не создает запись и не обрабатывается повторно.
+        """
+        self.send("evt_1")
+        with patch.object(StripeEventService, "_payment_intent_succeeded") as handler:
+            response = self.send("evt_1")
+
+        self.assertEqual(response.status_code, 200)
+        handler.assert_not_called()
+        self.assertEqual(StripeEvent.objects.count(), 1)
+        self.assertEqual(StripeEvent.objects.get(pk="evt_1").attempts, 1)
+
+    def test_invalid_signature_is_rejected(self):
+        """
+        Проверяет, что событие с неверной подписью не сохраняется.
+        """
+        response = self.send("evt_1", secret="whsec_other")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(StripeEvent.objects.exists())
+
+    def test_failure_does_not_override_success(self):
+        """
+        Проверяет, что событие об ошибке, пришедшее после успеха, не меняет статус платежа.
+        """
+        self.send("evt_1")
+        self.send("evt_2", event_type="payment_intent.payment_failed")
+
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, "succeeded")
+        self.assertEqual(StripeEvent.objects.get(pk="evt_2").status, StripeEvent.PROCESSED)
+
+    def test_event_is_picked_up_when_broker_is_down(self):
+        """
+        Проверяет, что при недоступном брокере вебхук отвечает 200, а событие обрабатывает периодическая задача.
+        """
+        with patch("payments.views.process_stripe_event.delay", side_effect=OperationalError):
+            response = self.send("evt_1")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(StripeEvent.objects.get(pk="evt_1").status, StripeEvent.PENDING)
+
+        self.assertEqual(process_pending_stripe_events(delay_seconds=0), 1)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, "succeeded")
+
+    def test_failed_processing_is_retried(self):
+        """
+        Проверяет, что после ошибки обработки событие возвращается в очередь.
+        """
+        with patch.object(StripeEventService, "_payment_intent_succeeded", side_effect=RuntimeError("boom")):
+            self.send("evt_1")
+
+        event = StripeEvent.objects.get(pk="evt_1")
+        self.assertEqual(event.status, StripeEvent.PENDING)
+        self.assertIn("boom", event.last_error)
+
+        self.assertEqual(process_pending_stripe_events(delay_seconds=0), 1)
+        self.assertEqual(StripeEvent.objects.get(pk="evt_1").attempts, 2)
+
+    def test_subscription_payment_grants_access(self):
+        """
+        Проверяет, что успешная оплата подписки создает подписку, включает флаг и сбрасывает кэш доступа.
+        """
+        self.assertFalse(EntitlementService.has_subscription(CustomUser.objects.get(pk=self.user.pk)))
+
+        self.send("evt_1", metadata={"plan": "premium"})
+
+        subscription = Subscription.objects.get(user=self.user)
+        self.assertTrue(subscription.is_active)
+        self.assertEqual(subscription.plan, "premium")
+        self.assertAlmostEqual(subscription.end_date, timezone.now() + timedelta(days=30), delta=timedelta(minutes=1))
+        user = CustomUser.objects.get(pk=self.user.pk)
+        self.assertTrue(user.has_paid_subscription)
+        self.assertTrue(EntitlementService.has_subscription(user))
+
+    def test_payment_extends_existing_subscription(self):
+        """
+        Проверяет, что оплата до окончания подписки добавляет период к оставшемуся сроку.
+        """
+        end_date = timezone.now() + timedelta(days=10)
+        Subscription.objects.create(user=self.user, plan="basic", end_date=end_date, is_active=True)
+
+        self.send("evt_1", metadata={"plan": "basic"})
+
+        subscription = Subscription.objects.get(user=self.user)
+        self.assertEqual(subscription.end_date, end_date + timedelta(days=30))
+
+    def test_checkout_events_for_one_payment_grant_once(self):
+        """
+        Проверяет, что разные события об одной оплате продлевают подписку один раз.
+        """
+        self.payment.stripe_payment_intent_id = None
+        self.payment.stripe_checkout_session_id = "cs_test"
+        self.payment.save()
+
+        self.send(
+            "evt_1",
+            event_type="checkout.session.completed",
+            object_id="cs_test",
+            payment_status="paid",
+            payment_intent="pi_test",
+        )
+        self.send("evt_2", event_type="checkout.session.async_payment_succeeded", object_id="cs_test")
+        self.send("evt_3", metadata={"plan": "basic"})
+
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.stripe_payment_intent_id, "pi_test")
+
+        subscription = Subscription.objects.get(user=self.user)
+        self.assertAlmostEqual(subscription.end_date, timezone.now() + timedelta(days=30), delta=timedelta(minutes=1))
+        self.assertEqual(StripeEvent.objects.filter(status=StripeEvent.PROCESSED).count(), 3)
+
+    def test_expired_session_marks_payment(self):
+        """
+        Проверяет, что истекшая сессия Checkout находится по идентификатору и помечает платеж.
+        """
+        self.payment.stripe_checkout_session_id = "cs_test"
+        self.payment.save()
+
+        self.send("evt_1", event_type="checkout.session.expired", object_id="cs_test")
+
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, "expired")
+
+
+@override_settings(STRIPE_ENDPOINT_SECRET="whsec_test")
+class RevenueDailyTest(TestCase):
+    """
+    Тесты сводок выручки: пополнение при оплате, пересчет и отчеты.
+    """
+
+    send = StripeWebhookTest.send
+
+    def setUp(self):
+        """
+        Создает автора с двумя постами, покупателя и сотрудника.
+        """
+        self.author = CustomUser.objects.create_user(phone_number="1234567890", password="password123")
+        self.buyer = CustomUser.objects.create_user(phone_number="0987654321", password="password123")
+        self.staff = CustomUser.objects.create_user(phone_number="1111111111", password="password123", is_staff=True)
+        category = Category.objects.create(name="Category")
+        self.first = Post.objects.create(
+            title="First", content="Content", category=category, is_published=True, owner=self.author
+        )
+        self.second = Post.objects.create(
+            title="Second", content="Content", category=category, is_published=True, owner=self.author
+        )
+        self.today = timezone.localdate()
+
+    def paid(self, post, amount, days_ago=0, method="stripe", status="succeeded"):
+        """
+        Возвращает платеж, оплаченный days_ago дней назад.
+        """
+        paid_at = timezone.now() - timedelta(days=days_ago)
+        return Payment(
+            user=self.buyer,
+            paid_post=post,
+            amount=amount,
+            payment_method=method,
+            status=status,
+            paid_at=paid_at if status == "succeeded" else None,
+        )
+
+    def test_save_sets_paid_at_on_success(self):
+        """
+        Проверяет, что время оплаты записывается при первом переходе платежа в succeeded.
+        """
+        payment = Payment.objects.create(user=self.buyer, amount=100, payment_method="cash")
+        self.assertIsNone(payment.paid_at)
+
+        payment.status = "succeeded"
+        payment.save(update_fields=["status"])
+        payment.refresh_from_db()
+
+        self.assertIsNotNone(payment.paid_at)
+
+    def test_webhook_adds_payment_to_todays_rollup_once(self):
+        """
+        Проверяет, что успешная оплата пополняет сводку текущего дня,
+        а повторные события по тому же платежу ее не меняют.
+        """
+        for number in (1, 2):
+            Payment.objects.create(
+                user=self.buyer,
+                paid_post=self.first,
+                amount=150,
+                payment_method="stripe",
+                stripe_payment_intent_id=f"pi_{number}",
+            )
+
+        self.send("evt_1", object_id="pi_1")
+        self.send("evt_2", object_id="pi_2")
+        self.send("evt_3", object_id="pi_1")
+
+        rollup = RevenueDaily.objects.get()
+        self.assertEqual(
+            (rollup.day, rollup.post_id, rollup.author_id, rollup.payment_method),
+            (self.today, self.first.id, self.author.id, "stripe"),
+        )
+        self.assertEqual(rollup.payments_count, 2)
+        self.assertEqual(rollup.amount, Decimal("300.00"))
+
+    def test_recompute_matches_payments(self):
+        """
+        Проверяет, что пересчет строит сводки по успешным платежам и повторный пересчет их не дублирует.
+        """
+        Payment.objects.bulk_create(
+            [
+                self.paid(self.first, 100, days_ago=1),
+                self.paid(self.first, 200, days_ago=1),
+                self.paid(self.first, 50, days_ago=1, method="cash"),
+                self.paid(self.second, 300, days_ago=2),
+                self.paid(self.second, 999, days_ago=1, status="pending"),
+                self.paid(None, 400, days_ago=1),
+                self.paid(self.first, 700, days_ago=5),
+            ]
+        )
+        yesterday = self.today - timedelta(days=1)
+
+        self.assertEqual(recompute_revenue_rollups(days=2), 4)
+        self.assertEqual(recompute_revenue_rollups(days=2), 4)
+
+        rollups = {
+            (row.day, row.post_id, row.author_id, row.payment_method): (row.payments_count, row.amount)
+            for row in RevenueDaily.objects.all()
+        }
+        self.assertEqual(
+            rollups,
+            {
+                (yesterday, self.first.id, self.author.id, "stripe"): (2, Decimal("300.00")),
+                (yesterday, self.first.id, self.author.id, "cash"): (1, Decimal("50.00")),
+                (yesterday, None, None, "stripe"): (1, Decimal("400.00")),
+                (yesterday - timedelta(days=1), self.second.id, self.author.id, "stripe"): (1, Decimal("300.00")),
+            },
+        )
+
+    def test_report_reads_only_rollups(self):
+        """
+        Проверяет, что отчет группирует сводки одним запросом, не обращаясь к таблице платежей.
+        """
+        Payment.objects.bulk_create(
+            [self.paid(self.first, 100, days_ago=1), self.paid(self.second, 200, days_ago=2, method="cash")]
+        )
+        call_command("rebuild_revenue_rollups", stdout=StringIO())
+        start = self.today - timedelta(days=7)
+
+        with CaptureQueriesContext(connection) as queries:
+            by_author = RevenueService.report(start, self.today, "author")
+
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn(Payment._meta.db_table, queries[0]["sql"])
+        self.assertEqual(by_author, [{"author": self.author.id, "payments_count": 2, "amount": Decimal("300.00")}])
+        self.assertEqual(
+            [row["payment_method"] for row in RevenueService.report(start, self.today, "payment_method")],
+            ["cash", "stripe"],
+        )
+
+    def test_report_view_is_staff_only(self):
+        """
+        Проверяет, что отчет доступен только сотрудникам и проверяет параметры.
+        """
+        Payment.objects.bulk_create([self.paid(self.first, 100, days_ago=1), self.paid(self.second, 200, days_ago=1)])
+        RevenueService.recompute(self.today - timedelta(days=1), self.today)
+        client = APIClient()
+        url = reverse("payments:revenue-report")
+
+        client.force_authenticate(user=self.buyer)
+        self.assertEqual(client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        client.force_authenticate(user=self.staff)
+        response = client.get(url, {"group_by": "post"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row["post"] for row in response.data["results"]], [self.first.id, self.second.id])
+        self.assertEqual(response.data["total"], {"payments_count": 2, "amount": "300.00"})
+
+        for params in ({"group_by": "user"}, {"start": "yesterday"}, {"start": "2025-02-01", "end": "2025-01-01"}):
+            self.assertEqual(client.get(url, params).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@skipIf(connection.vendor == "sqlite", "SQLite блокирует таблицу целиком и не допускает параллельной записи")
+class StripeConcurrentDeliveryTest(TransactionTestCase):
+    """
+    Тесты одновременной обработки повторных событий об одной оплате.
+
+    Параллельная обработка проверяется на PostgreSQL, где UPDATE платежа блокирует
+    только его строку.
+    """
+
+    WORKERS = 4
+
+    def setUp(self):
+        """
+        Создает пользователя, ожидающий платеж подписки и несколько событий о нем.
+        """
+        self.user = CustomUser.objects.create_user(phone_number="1234567890", password="password123")
+        Payment.objects.create(
+            user=self.user,
+            amount=500,
+            payment_method="stripe",
+            is_subscription=True,
+            stripe_payment_intent_id="pi_test",
+        )
+        for number in range(self.WORKERS):
+            StripeEventService.record(
+                {
+                    "id": f"evt_{number}",
+                    "type": "payment_intent.succeeded",
+                    "data": {"object": {"id": "pi_test", "metadata": {"plan": "basic"}}},
+                }
+            )
+
+    def run_concurrently(self, event_ids):
+        """
+        Обрабатывает события в отдельных потоках, запуская их одновременно.
+        """
+        barrier = threading.Barrier(len(event_ids))
+        results, errors = [], []
+
+        def worker(event_id):
+            try:
+                barrier.wait()
+                results.append(StripeEventService.process(event_id))
+            except Exception as error:
+                errors.append(error)
+            finally:
+                close_old_connections()
+
+        threads = [threading.Thread(target=worker, args=(event_id,)) for event_id in event_ids]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        return results
+
+    def test_same_event_is_processed_once(self):
+        """
+        Проверяет, что одно событие, обрабатываемое несколькими воркерами, применяется один раз.
+        """
+        results = self.run_concurrently(["evt_0"] * self.WORKERS)
+
+        self.assertEqual(sorted(results), [False] * (self.WORKERS - 1) + [True])
+        self.assertEqual(StripeEvent.objects.get(pk="evt_0").attempts, 1)
+
+    def test_duplicate_events_extend_subscription_once(self):
+        """
+        Проверяет, что одновременные события об одной оплате продлевают подписку один раз.
+        """
+        self.run_concurrently([f"evt_{number}" for number in range(self.WORKERS)])
+
+        subscription = Subscription.objects.get(user=self.user)
+        self.assertAlmostEqual(subscription.end_date, timezone.now() + timedelta(days=30), delta=timedelta(minutes=1))
+        self.assertEqual(StripeEvent.objects.filter(status=StripeEvent.PROCESSED).count(), self.WORKERS)
+        self.assertTrue(CustomUser.objects.get(pk=self.user.pk).has_paid_subscription)
@@ -1,11 +1,12 @@
 from django.urls import path
 
-from .views import PaymentCreateView, PaymentListView, stripe_webhook
+from .views import PaymentCreateView, PaymentListView, RevenueReportView, stripe_webhook
 
 app_name = "payments"
 
 urlpatterns = [
     path("payments/", PaymentListView.as_view(), name="payment-list"),
     path("payments/create/", PaymentCreateView.as_view(), name="payment-create"),
+    path("revenue/", RevenueReportView.as_view(), name="revenue-report"),
     path("stripe-webhook/", stripe_webhook, name="stripe_webhook"),
 ]
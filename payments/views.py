@@ -1,178 +1,231 @@
+import datetime
+import logging
+from decimal import Decimal
+
 import stripe
 from django.conf import settings
+from django.db import transaction
 from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.views.decorators.csrf import csrf_exempt
+from kombu.exceptions import OperationalError
 from rest_framework import generics, status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from posts.paginators import KeysetPagination
+
+from .gateway import StripeUnavailable
 from .models import Payment
 from .serializers import PaymentSerializer
+from .services import CheckoutInProgress, CheckoutService, PriceCatalog, RevenueService, StripeEventService
+from .tasks import process_stripe_event
+
+logger = logging.getLogger(__name__)
 
 
 class PaymentListView(generics.ListAPIView):
     """
-    View для получения списка всех платежей.
+    View для получения списка платежей.
 
-    Этот класс предоставляет API для получения списка всех платежей,
-    доступных только для авторизованных пользователей.
+    Пользователь видит только свои платежи, сотрудник (is_staff) - все.
     Пользователи могут фильтровать платежи по посту и методу оплаты.
+    Список отдается страницами по курсору (KeysetPagination) в порядке от новых
+    к старым по (payment_date, id): страница читается по индексу
+    payment_user_date_idx, поэтому ее стоимость не зависит от количества платежей
+    пользователя и глубины страницы. Из базы читаются только поля сериализатора.
 
     Атрибуты:
-        queryset (QuerySet): Запрос для получения всех объектов Payment.
         serializer_class (Serializer): Сериализатор, который используется для представления данных Payment.
         permission_classes (list): Список разрешений, определяющих доступ к представлению.
+        pagination_class (class): Класс пагинации списка.
+        keyset_ordering (tuple): Поля сортировки для пагинации.
+        LIST_FIELDS (tuple): Поля, читаемые из базы для списка.
     """
 
+    serializer_class = PaymentSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ("-payment_date", "-id")
+    LIST_FIELDS = ("id", "user_id", "payment_date", "paid_post_id", "amount", "payment_method", "is_subscription")
 
-queryset = Payment.objects.all()
-serializer_class = PaymentSerializer
-permission_classes = [IsAuthenticated]
+    def get_queryset(self):
+        """
+        Возвращает платежи пользователя, отфильтрованные по параметрам запроса.
 
+        Этот метод позволяет фильтровать платежи по ID поста и методу оплаты,
+        если соответствующие параметры переданы в запросе.
 
-def get_queryset(self):
-    """
-    Возвращает отфильтрованный список платежей на основе параметров запроса.
+        Args:
+            None
 
-    Этот метод позволяет фильтровать платежи по ID поста и методу оплаты,
-    если соответствующие параметры переданы в запросе.
+        Returns:
+            QuerySet: Отфильтрованный список платежей, соответствующих параметрам запроса.
+        """
+        queryset = Payment.objects.only(*self.LIST_FIELDS)
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(user=self.request.user)
 
-    Args:
-        None
+        post_id = self.request.query_params.get("post_id", "")
+        payment_method = self.request.query_params.get("payment_method", None)
 
-    Returns:
-        QuerySet: Отфильтрованный список платежей, соответствующих параметрам запроса.
-    """
-    queryset = super().get_queryset()
-    post_id = self.request.query_params.get("post_id", None)
-    payment_method = self.request.query_params.get("payment_method", None)
+        if post_id.isdigit():
+            queryset = queryset.filter(paid_post_id=post_id)
+        if payment_method:
+            queryset = queryset.filter(payment_method=payment_method)
 
-    if post_id:
-        queryset = queryset.filter(paid_post_id=post_id)
-    if payment_method:
-        queryset = queryset.filter(payment_method=payment_method)
-
-    return queryset
+        return queryset
 
 
 class PaymentCreateView(APIView):
     """
     View для создания платежа.
 
-    Позволяет пользователю создать платеж за пост, создавая цену в Stripe,
-    а также сессию для получения ссылки на оплату.
+    Позволяет пользователю оплатить подписку: цена тарифа берется из локального
+    каталога (см. PriceCatalog), поэтому к Stripe выполняется не больше одного
+    запроса - создание сессии для получения ссылки на оплату. Повторный запрос
+    пользователя (двойное нажатие, повтор мобильного клиента) возвращает еще
+    открытую сессию (см. CheckoutService).
 
     Атрибуты:
         permission_classes (list): Список разрешений, определяющих доступ к представлению.
     """
 
+    permission_classes = [IsAuthenticated]
 
-permission_classes = [IsAuthenticated]
+    def post(self, request, *args, **kwargs):
+        """
+        Обрабатывает создание платежа.
 
+        Этот метод ожидает, что в запросе будет передан тип подписки (код тарифа).
+        Сумма платежа берется из каталога цен, а не из запроса.
 
-@staticmethod
-def create_price(product_id, amount):
-    """
-    Создает объект цены для указанных параметров.
+        Args:
+            request (Request): Объект запроса с данными о платеже.
+            *args: Дополнительные аргументы (не используются).
+            **kwargs: Дополнительные именованные аргументы (не используются).
 
-    Args:
-        product_id (str): Идентификатор продукта.
-        amount (int): Сумма в центах.
+        Returns:
+            Response: Ответ со ссылкой на оплату: код 201 для новой сессии и 200 для уже открытой.
+                Если данные некорректны, возвращает ошибку с соответствующим статусом;
+                если Stripe недоступен - код 503 с сообщением для пользователя.
+        """
+        subscription_type = request.data.get("subscription_type")  # 'basic' или 'premium'
 
-    Returns:
-        Price: Объект с информацией о цене.
-    """
-    price = stripe.Price.create(
-        unit_amount=amount,
-        currency="usd",
-        product=product_id,
-    )
-    return price
+        price = PriceCatalog.get(subscription_type)
+        if price is None:
+            return Response({"error": "Invalid subscription type"}, status=status.HTTP_400_BAD_REQUEST)
 
+        try:
+            payment, created = CheckoutService.start(request.user, price)
+        except CheckoutInProgress:
+            return Response({"error": "Checkout is already in progress"}, status=status.HTTP_409_CONFLICT)
+        except StripeUnavailable as error:
+            return Response({"error": str(error)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
-@staticmethod
-def create_checkout_session(price_id):
-    """
-    Создает сессию для оплаты с использованием указанного идентификатора цены.
+        return Response(
+            {"url": payment.stripe_checkout_url},
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
 
-    Args:
-        price_id (str): Идентификатор цены.
 
-    Returns:
-        Session: Объект с URL для перехода на страницу оплаты.
+class RevenueReportView(APIView):
     """
-    session = stripe.checkout.Session.create(
-        mode="payment",
-        line_items=[{"price": price_id, "quantity": 1}],
-        success_url="https://yourdomain.com/success",
-        cancel_url="https://yourdomain.com/cancel",
-    )
-    return session
+    View отчета о выручке для сотрудников.
 
+    Выручка за период считается по сводкам RevenueDaily, а не по таблице платежей,
+    поэтому время ответа зависит только от длины периода. Параметры запроса:
+    start и end (YYYY-MM-DD, по умолчанию - последние 30 дней включая сегодня)
+    и group_by (day, post, author или payment_method).
 
-def post(self, request, *args, **kwargs):
-    """
-    Обрабатывает создание платежа.
-
-    Этот метод ожидает, что в запросе будут переданы данные о платеже,
-    такие как сумма и тип подписки.
-
-    Args:
-        request (Request): Объект запроса с данными о платеже.
-        *args: Дополнительные аргументы (не используются).
-        **kwargs: Дополнительные именованные аргументы (не используются).
-
-    Returns:
-        Response: Ответ с информацией о сессии для оплаты.
-            Если данные некорректны, возвращает ошибку с соответствующим статусом.
+    Атрибуты:
+        permission_classes (list): Список разрешений, определяющих доступ к представлению.
+        DEFAULT_PERIOD_DAYS (int): Длина периода по умолчанию, в днях.
     """
-    amount = request.data.get("amount")
-    subscription_type = request.data.get("subscription_type")  # 'basic' или 'premium'
-
-    if subscription_type == "basic":
-        price = self.create_price("prod_basic_id", 500)  # 5.00 USD
-    elif subscription_type == "premium":
-        price = self.create_price("prod_premium_id", 1000)  # 10.00 USD
-    else:
-        return Response({"error": "Invalid subscription type"}, status=status.HTTP_400_BAD_REQUEST)
 
-    session = self.create_checkout_session(price.id)
+    permission_classes = [IsAdminUser]
+    DEFAULT_PERIOD_DAYS = 30
 
-    Payment.objects.create(
-        user=request.user,
-        amount=amount,
-        payment_method="stripe",
-        is_subscription=True,
-        stripe_price_id=price.id,
-        stripe_checkout_session_id=session.id,
-    )
+    def get(self, request, *args, **kwargs):
+        """
+        Возвращает выручку за период.
 
-    return Response({"url": session.url}, status=status.HTTP_201_CREATED)
+        Args:
+            request (Request): Объект запроса с параметрами отчета.
+            *args: Дополнительные аргументы (не используются).
+            **kwargs: Дополнительные именованные аргументы (не используются).
 
-
-stripe.api_key = settings.STRIPE_TEST_SECRET_KEY
+        Returns:
+            Response: Строки отчета и итог за период или ошибка 400 при неверных параметрах.
+        """
+        today = timezone.localdate()
+        try:
+            end = self._date(request.query_params.get("end")) or today
+            start = self._date(request.query_params.get("start")) or end - datetime.timedelta(
+                days=self.DEFAULT_PERIOD_DAYS - 1
+            )
+        except ValueError:
+            return Response({"error": "Invalid date"}, status=status.HTTP_400_BAD_REQUEST)
+        if start > end:
+            return Response({"error": "start must not be after end"}, status=status.HTTP_400_BAD_REQUEST)
+
+        group_by = request.query_params.get("group_by", "day")
+        if group_by not in RevenueService.GROUPINGS:
+            return Response({"error": "Invalid group_by"}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = RevenueService.report(start, end, group_by)
+        for row in rows:
+            row["amount"] = str(row["amount"])
+        return Response(
+            {
+                "start": start,
+                "end": end,
+                "group_by": group_by,
+                "results": rows,
+                "total": {
+                    "payments_count": sum(row["payments_count"] for row in rows),
+                    "amount": str(sum((Decimal(row["amount"]) for row in rows), Decimal("0.00"))),
+                },
+            }
+        )
+
+    @staticmethod
+    def _date(value):
+        """
+        Разбирает дату из параметра запроса.
+
+        Raises:
+            ValueError: Если дата указана в неверном формате.
+        """
+        if not value:
+            return None
+        date = parse_date(value)
+        if date is None:
+            raise ValueError(value)
+        return date
 
 
 @csrf_exempt
 def stripe_webhook(request):
     """
-    Обрабатывает вебхуки от Stripe.
+    Принимает вебхуки от Stripe.
 
-    Эта функция обрабатывает входящие вебхуки от Stripe, проверяет подпись и обновляет
-    статус платежа в базе данных. В зависимости от типа события, она либо обновляет статус
-    платежа на 'succeeded', либо на 'failed'.
+    Проверяет подпись события, сохраняет его в StripeEvent (повторная доставка
+    игнорируется) и сразу отвечает Stripe. Статус платежа меняет задача Celery
+    process_stripe_event; если поставить задачу не удалось, событие подберет
+    периодическая задача process_pending_stripe_events.
 
     Args:
         request (HttpRequest): Объект запроса от Stripe, содержащий данные о событии.
 
     Returns:
-        HttpResponse: Возвращает HTTP ответ с кодом 200 в случае успешной обработки,
+        HttpResponse: Возвращает HTTP ответ с кодом 200 после сохранения события
                       или код 400 в случае ошибок валидации или подписи.
     """
     payload = request.body
     sig_header = request.META.get("HTTP_STRIPE_SIGNATURE", "")
-    event = None
 
     try:
         event = stripe.Webhook.construct_event(payload, sig_header, settings.STRIPE_ENDPOINT_SECRET)
@@ -181,24 +234,16 @@ def stripe_webhook(request):
     except stripe.error.SignatureVerificationError:
         return HttpResponse(status=400)
 
-    if event["type"] == "payment_intent.succeeded":
-        payment_intent = event["data"]["object"]
-        payment_id = payment_intent["id"]
-        try:
-            payment = Payment.objects.get(stripe_payment_intent_id=payment_id)
-            payment.status = "succeeded"
-            payment.save()
-        except Payment.DoesNotExist:
-            return HttpResponse(status=404)
-
-    elif event["type"] == "payment_intent.payment_failed":
-        payment_intent = event["data"]["object"]
-        payment_id = payment_intent["id"]
-        try:
-            payment = Payment.objects.get(stripe_payment_intent_id=payment_id)
-            payment.status = "failed"
-            payment.save()
-        except Payment.DoesNotExist:
-            return HttpResponse(status=404)
-
+    StripeEventService.record(event)
+    transaction.on_commit(lambda: _enqueue_stripe_event(event["id"]))
     return HttpResponse(status=200)
+
+
+def _enqueue_stripe_event(event_id):
+    """
+    Ставит обработку события в очередь, не прерывая ответ Stripe при недоступном брокере.
+    """
+    try:
+        process_stripe_event.delay(event_id)
+    except OperationalError:
+        logger.warning("Не удалось поставить в очередь событие Stripe %s", event_id, exc_info=True)
@@ -16,3 +16,9 @@ class PostsConfig(AppConfig):
 
     default_auto_field = "django.db.models.BigAutoField"
     name = "posts"
+
+    def ready(self):
+        """
+        Подключает обработчики сигналов приложения.
+        """
+        from . import signals  # noqa: F401
@@ -0,0 +1,99 @@
+import time
+
+from django.core.cache import cache
+
+VERSION_KEY_PREFIX = "version"
+
+
+def _initial_version():
+    """
+    Возвращает начальное значение версии.
+
+    Версия начинается с текущего времени в миллисекундах, а не с единицы: если ключ
+    версии вытеснен из Redis, новая версия не совпадет ни с одной из прежних,
+    и устаревшие данные под старыми ключами не будут прочитаны.
+    """
+    return int(time.time() * 1000)
+
+
+def get_version(name):
+    """
+    Возвращает текущую версию именованного набора кэшированных данных.
+
+    Args:
+        name (str): Имя набора, например "taxonomy" или "posts:category:5".
+
+    Returns:
+        int: Номер версии, который следует включать в ключи кэша.
+    """
+    key = f"{VERSION_KEY_PREFIX}:{name}"
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), None)
+        version = cache.get(key, _initial_version())
+    return version
+
+
+def bump_version(name):
+    """
+    Увеличивает версию набора, делая недействительными все ключи предыдущей версии.
+
+    Args:
+        name (str): Имя набора.
+
+    Returns:
+        int: Новый номер версии.
+    """
+    key = f"{VERSION_KEY_PREFIX}:{name}"
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = _initial_version()
+        cache.add(key, version, None)
+        return version
+
+
+def get_or_recompute(key, compute, fresh_for, stale_for, lock_timeout=30, wait=1.0):
+    """
+    Читает значение из кэша с защитой от одновременного пересчета (cache stampede).
+
+    Значение хранится вместе с моментом, до которого оно считается свежим, и живет
+    в кэше дольше этого момента на stale_for секунд. Когда свежесть истекла, пересчет
+    выполняет только процесс, успевший захватить блокировку (cache.add), а остальные
+    продолжают отдавать устаревшее значение. Если значения нет совсем, процессы без
+    блокировки недолго ждут результата первого и только затем считают сами.
+
+    Args:
+        key (str): Ключ кэша.
+        compute (callable): Функция без аргументов, вычисляющая значение.
+        fresh_for (int): Время свежести значения, в секундах.
+        stale_for (int): Сколько секунд после истечения свежести можно отдавать устаревшее значение.
+        lock_timeout (int): Время жизни блокировки пересчета, в секундах.
+        wait (float): Максимальное время ожидания чужого пересчета при пустом кэше, в секундах.
+
+    Returns:
+        Any: Значение из кэша или только что вычисленное.
+    """
+    lock_key = f"{key}:lock"
+    entry = cache.get(key)
+    if entry is not None and entry["fresh_until"] > time.time():
+        return entry["value"]
+
+    locked = cache.add(lock_key, 1, lock_timeout)
+    if not locked:
+        if entry is not None:
+            return entry["value"]
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry["value"]
+
+    try:
+        value = compute()
+        cache.set(key, {"value": value, "fresh_until": time.time() + fresh_for}, fresh_for + stale_for)
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return value
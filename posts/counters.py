@@ -0,0 +1,254 @@
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.db import connection, transaction
+from django.dispatch import receiver
+from django_redis import get_redis_connection
+from redis.exceptions import ResponseError
+
+from .models import Post, PostViewCount
+
+
+class RedisViewBuffer:
+    """
+    Буфер просмотров постов в хэше Redis, общий для всех процессов.
+
+    Просмотр - одна команда HINCRBY без обращения к базе. Сброс переносит хэш
+    командой RENAME под постоянный ключ draining_key: она атомарна, поэтому
+    просмотр, пришедший во время сброса, попадает уже в новый хэш. Ключ draining_key
+    удаляется только после фиксации записи в базу; если запись не удалась или процесс
+    упал, следующий сброс сначала дочитывает его. Одновременно сбрасывать буфер
+    может только один процесс (блокировка cache.add), поэтому одни и те же просмотры
+    не записываются дважды; только если процесс упадет между фиксацией и удалением
+    ключа, эти просмотры будут записаны повторно. Записывает накопленное в базу
+    периодическая задача posts.tasks.flush_post_views.
+
+    Атрибуты:
+        LOCK_TIMEOUT (int): Время жизни блокировки сброса, в секундах.
+        client (Redis): Клиент Redis.
+        key (str): Ключ хэша с накопленными просмотрами.
+        draining_key (str): Ключ хэша со сбрасываемыми просмотрами.
+        lock_key (str): Ключ кэша блокировки сброса.
+    """
+
+    LOCK_TIMEOUT = 5 * 60
+
+    def __init__(self, client):
+        self.client = client
+        self.key = cache.make_key("post_views:pending")
+        self.draining_key = cache.make_key("post_views:draining")
+        self.lock_key = "post_views:flush:lock"
+
+    def hit(self, post_id):
+        """
+        Учитывает просмотр поста.
+        """
+        self.client.hincrby(self.key, post_id, 1)
+
+    def flush_due(self):
+        """
+        Буфер сбрасывается периодической задачей, а не запросами.
+        """
+        return False
+
+    @contextmanager
+    def draining(self):
+        """
+        Выдает накопленные просмотры для записи в базу.
+
+        Просмотры удаляются из Redis после фиксации транзакции, в которой выполнен
+        блок with; при исключении они остаются для следующего сброса. Если буфер
+        сейчас сбрасывает другой процесс, выдается пустой словарь.
+
+        Yields:
+            dict: Идентификатор поста -> количество просмотров.
+        """
+        if not cache.add(self.lock_key, 1, self.LOCK_TIMEOUT):
+            yield {}
+            return
+        try:
+            if not self.client.exists(self.draining_key):
+                try:
+                    self.client.rename(self.key, self.draining_key)
+                except ResponseError:
+                    pass
+            counts = self.client.hgetall(self.draining_key)
+            yield {int(post_id): int(count) for post_id, count in counts.items()}
+        except BaseException:
+            cache.delete(self.lock_key)
+            raise
+        transaction.on_commit(self._finish_draining)
+
+    def _finish_draining(self):
+        """
+        Удаляет записанные в базу просмотры и снимает блокировку сброса.
+        """
+        self.client.delete(self.draining_key)
+        cache.delete(self.lock_key)
+
+
+class LocalViewBuffer:
+    """
+    Буфер просмотров постов в памяти процесса.
+
+    Используется, когда кэш не Redis (разработка, тесты). Периодическая задача не
+    видит память веб-процессов, поэтому буфер сбрасывает запрос, заметивший, что
+    с прошлого сброса прошло flush_interval секунд. Просмотры, которые не удалось
+    записать, возвращаются в буфер.
+
+    Атрибуты:
+        flush_interval (float): Интервал сброса, в секундах.
+    """
+
+    def __init__(self, flush_interval=60):
+        self.flush_interval = flush_interval
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        self._drained_at = time.monotonic()
+
+    def hit(self, post_id):
+        """
+        Учитывает просмотр поста.
+        """
+        with self._lock:
+            self._counts[post_id] += 1
+
+    def flush_due(self):
+        """
+        Проверяет, пора ли сбросить буфер; True возвращается только одному потоку за интервал.
+        """
+        with self._lock:
+            if time.monotonic() - self._drained_at < self.flush_interval:
+                return False
+            self._drained_at = time.monotonic()
+            return True
+
+    @contextmanager
+    def draining(self):
+        """
+        Забирает накопленные просмотры, очищая буфер; при исключении возвращает их обратно.
+
+        Yields:
+            dict: Идентификатор поста -> количество просмотров.
+        """
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            self._drained_at = time.monotonic()
+        try:
+            yield dict(counts)
+        except BaseException:
+            with self._lock:
+                self._counts.update(counts)
+            raise
+
+
+_buffer = None
+
+
+def get_view_buffer():
+    """
+    Возвращает буфер просмотров процесса: общий в Redis или, если кэш не Redis, локальный.
+
+    Returns:
+        RedisViewBuffer | LocalViewBuffer: Буфер.
+    """
+    global _buffer
+    if _buffer is None:
+        try:
+            _buffer = RedisViewBuffer(get_redis_connection("default"))
+        except NotImplementedError:
+            _buffer = LocalViewBuffer(settings.POST_VIEWS_FLUSH_INTERVAL)
+    return _buffer
+
+
+def set_view_buffer(buffer):
+    """
+    Заменяет буфер просмотров процесса (для тестов).
+
+    Args:
+        buffer (RedisViewBuffer | LocalViewBuffer | None): Новый буфер; None - выбрать заново по настройкам.
+
+    Returns:
+        RedisViewBuffer | LocalViewBuffer | None: Предыдущий буфер.
+    """
+    global _buffer
+    previous, _buffer = _buffer, buffer
+    return previous
+
+
+@receiver(setting_changed)
+def reset_view_buffer(setting, **kwargs):
+    """
+    Выбирает буфер заново при изменении настроек кэша или интервала сброса (override_settings в тестах).
+    """
+    if setting in ("CACHES", "POST_VIEWS_FLUSH_INTERVAL"):
+        set_view_buffer(None)
+
+
+def record_post_view(post_id):
+    """
+    Учитывает просмотр поста, не обращаясь к базе.
+
+    Args:
+        post_id (int): Идентификатор поста.
+
+    Returns:
+        None
+    """
+    buffer = get_view_buffer()
+    buffer.hit(post_id)
+    if buffer.flush_due():
+        flush_post_views(buffer)
+
+
+def flush_post_views(buffer=None, batch_size=1000):
+    """
+    Записывает накопленные просмотры в счетчики PostViewCount.
+
+    Все счетчики обновляются запросами вида
+    INSERT ... VALUES (id, delta), ... ON CONFLICT (post_id) DO UPDATE
+    SET views_count = views_count + excluded.views_count
+    по batch_size постов в одной транзакции. Перед каждым запросом посты пакета
+    блокируются SELECT ... ORDER BY id FOR UPDATE: все сбросы захватывают строки
+    по возрастанию идентификатора, а удаленные посты отбрасываются. Прибавление
+    к текущему значению в базе не теряет просмотры, записанные другими сбросами.
+    Если запись не удалась, просмотры остаются в буфере до следующего сброса.
+    Сам пост не меняется, в том числе время его изменения (updated_at).
+
+    Args:
+        buffer (RedisViewBuffer | LocalViewBuffer | None): Буфер; по умолчанию буфер процесса.
+        batch_size (int): Количество постов в одном UPDATE.
+
+    Returns:
+        int: Количество записанных просмотров.
+    """
+    buffer = buffer or get_view_buffer()
+    with buffer.draining() as counts:
+        if counts:
+            _add_views(sorted(counts.items()), batch_size)
+    return sum(counts.values())
+
+
+def _add_views(rows, batch_size):
+    """
+    Прибавляет просмотры к счетчикам постов пакетами INSERT ... ON CONFLICT DO UPDATE.
+    """
+    table = connection.ops.quote_name(PostViewCount._meta.db_table)
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            batch = dict(rows[start : start + batch_size])
+            locked = Post.objects.select_for_update().filter(pk__in=batch).order_by("pk")
+            post_ids = list(locked.values_list("pk", flat=True))
+            if not post_ids:
+                continue
+            values = ", ".join(["(%s, %s)"] * len(post_ids))
+            cursor.execute(
+                f"INSERT INTO {table} (post_id, views_count) VALUES {values} "
+                f"ON CONFLICT (post_id) DO UPDATE SET views_count = {table}.views_count + excluded.views_count",
+                [value for post_id in post_ids for value in (post_id, batch[post_id])],
+            )
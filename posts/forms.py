@@ -1,7 +1,9 @@
 from django import forms
 from django.core.exceptions import ValidationError
 
+from .matchers import AhoCorasickMatcher
 from .models import Category, Post, Subcategory, Subscription
+from .services import TaxonomyService
 
 FORBIDDEN_WORDS = [
     "Деньги",
@@ -87,6 +89,41 @@ FORBIDDEN_WORDS = [
     "немедленно",
 ]
 
+FORBIDDEN_WORDS_MATCHER = AhoCorasickMatcher(FORBIDDEN_WORDS)
+
+
+def validate_forbidden_words(text, message):
+    """
+    Проверяет текст на наличие запрещенных слов за один проход.
+
+    В сообщении об ошибке перечисляются найденные слова и позиции их вхождений
+    (не более пяти позиций на слово).
+
+    Args:
+        text (str): Проверяемый текст.
+        message (str): Начало сообщения об ошибке.
+
+    Raises:
+        ValidationError: Если текст содержит запрещенные слова.
+    """
+    positions = {}
+    for match in FORBIDDEN_WORDS_MATCHER.find_all(text):
+        positions.setdefault(match.word, []).append(match.position)
+    if not positions:
+        return
+
+    found = []
+    for word, word_positions in positions.items():
+        shown = ", ".join(str(position) for position in word_positions[:5])
+        if len(word_positions) > 5:
+            shown += ", ..."
+        found.append(f"«{word}» (позиции: {shown})")
+    raise ValidationError(
+        "%(message)s: %(found)s.",
+        code="forbidden_words",
+        params={"message": message, "found": "; ".join(found), "words": list(positions)},
+    )
+
 
 class PostForm(forms.ModelForm):
     """
@@ -123,8 +160,7 @@ class PostForm(forms.ModelForm):
             ValidationError: Если заголовок содержит запрещенные слова.
         """
         title = self.cleaned_data["title"]
-        if any(word in title.lower() for word in FORBIDDEN_WORDS):
-            raise ValidationError("Название записи содержит запрещенные слова.")
+        validate_forbidden_words(title, "Название записи содержит запрещенные слова")
         return title
 
     def clean_content(self):
@@ -141,14 +177,17 @@ class PostForm(forms.ModelForm):
             ValidationError: Если содержание содержит запрещенные слова.
         """
         content = self.cleaned_data["content"]
-        if any(word in content.lower() for word in FORBIDDEN_WORDS):
-            raise ValidationError("Запись содержит запрещенные слова.")
+        validate_forbidden_words(content, "Запись содержит запрещенные слова")
         return content
 
     def __init__(self, *args, **kwargs):
         """
         Инициализирует форму и настраивает доступные подкатегории в зависимости от выбранной категории.
 
+        Варианты выбора берутся из кэша дерева категорий (TaxonomyService), поэтому
+        отображение формы не обращается к базе; querysets полей используются
+        только для проверки отправленных значений.
+
         Args:
             *args: Позиционные аргументы.
             **kwargs: Именованные аргументы.
@@ -159,17 +198,24 @@ class PostForm(forms.ModelForm):
         super(PostForm, self).__init__(*args, **kwargs)
         self.fields["category"].queryset = Category.objects.all()
         self.fields["subcategory"].queryset = Subcategory.objects.none()
+        self.fields["category"].choices = [("", self.fields["category"].empty_label)] + [
+            (category["id"], category["name"]) for category in TaxonomyService.get_tree()
+        ]
 
+        category_id = None
         if "category" in self.data:
             try:
                 category_id = int(self.data.get("category"))
-                self.fields["subcategory"].queryset = Subcategory.objects.filter(category_id=category_id).order_by(
-                    "name"
-                )
             except (ValueError, TypeError):
                 pass
         elif self.instance.pk:
-            self.fields["subcategory"].queryset = self.instance.category.subcategories.order_by("name")
+            category_id = self.instance.category_id
+
+        if category_id is not None:
+            self.fields["subcategory"].queryset = Subcategory.objects.filter(category_id=category_id)
+        self.fields["subcategory"].choices = [("", self.fields["subcategory"].empty_label)] + [
+            (subcategory["id"], subcategory["name"]) for subcategory in TaxonomyService.get_subcategories(category_id)
+        ]
 
 
 class SubscriptionForm(forms.ModelForm):
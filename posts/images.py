@@ -0,0 +1,91 @@
+import io
+from collections import namedtuple
+
+from PIL import Image, ImageOps
+
+Variant = namedtuple("Variant", ["format", "width", "height", "content"])
+
+FORMATS = {
+    "webp": {"pil_format": "WEBP", "extension": "webp", "mime_type": "image/webp", "options": {"quality": 80}},
+    "jpeg": {
+        "pil_format": "JPEG",
+        "extension": "jpg",
+        "mime_type": "image/jpeg",
+        "options": {"quality": 82, "optimize": True, "progressive": True},
+    },
+}
+
+
+def variant_widths(original_width, widths):
+    """
+    Возвращает ширины вариантов, не превышающие ширину оригинала.
+
+    Изображение не увеличивается: если оригинал уже самой маленькой ширины,
+    создается один вариант исходной ширины (только перекодированный).
+
+    Args:
+        original_width (int): Ширина оригинала в пикселях.
+        widths (Iterable[int]): Ширины вариантов из настроек.
+
+    Returns:
+        list[int]: Ширины вариантов по возрастанию.
+    """
+    selected = sorted({width for width in widths if width < original_width})
+    if not selected or selected[-1] < original_width <= max(widths):
+        selected.append(original_width)
+    return selected
+
+
+def build_variants(source, widths, formats):
+    """
+    Строит уменьшенные варианты изображения во всех форматах.
+
+    Ориентация берется из EXIF, метаданные в варианты не переносятся.
+    Для JPEG прозрачность заменяется белым фоном.
+
+    Args:
+        source (File): Открытый файл исходного изображения.
+        widths (Iterable[int]): Ширины вариантов.
+        formats (Iterable[str]): Форматы из FORMATS, например ("webp", "jpeg").
+
+    Returns:
+        list[Variant]: Варианты с форматом, размерами и содержимым файла.
+
+    Raises:
+        PIL.UnidentifiedImageError: Если файл не является изображением.
+    """
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+        variants = []
+        for width in variant_widths(image.width, widths):
+            height = max(round(image.height * width / image.width), 1)
+            resized = image if width == image.width else image.resize((width, height), Image.Resampling.LANCZOS)
+            for name in formats:
+                spec = FORMATS[name]
+                frame = resized
+                if has_alpha and spec["pil_format"] == "JPEG":
+                    frame = Image.new("RGB", resized.size, (255, 255, 255))
+                    frame.paste(resized, mask=resized.getchannel("A"))
+                buffer = io.BytesIO()
+                frame.save(buffer, spec["pil_format"], **spec["options"])
+                variants.append(Variant(name, width, height, buffer.getvalue()))
+        return variants
+
+
+def variant_name(variant):
+    """
+    Возвращает имя файла варианта для сохранения в хранилище.
+
+    Итоговый путь определяет контентно-адресуемое хранилище по содержимому,
+    из имени берется только расширение.
+
+    Args:
+        variant (Variant): Вариант изображения.
+
+    Returns:
+        str: Имя вида "320w.webp".
+    """
+    return f"{variant.width}w.{FORMATS[variant.format]['extension']}"
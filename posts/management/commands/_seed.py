@@ -0,0 +1,53 @@
+from django.contrib.auth import get_user_model
+
+from posts.models import Category, Post
+
+BENCHMARK_PHONE_NUMBER = "70000000000"
+
+
+def seed_posts(count, make_content=None, batch_size=5000, stdout=None):
+    """
+    Дополняет базу опубликованными постами для бенчмарков, пока их не станет count.
+
+    Посты создаются пачками через bulk_create от имени служебного пользователя
+    в служебной категории, поэтому повторный запуск не создает лишних записей.
+
+    Args:
+        count (int): Необходимое количество опубликованных постов.
+        make_content (callable | None): Функция (номер поста) -> (заголовок, текст).
+        batch_size (int): Размер пачки вставки.
+        stdout (OutputWrapper | None): Поток вывода команды для сообщений о прогрессе.
+
+    Returns:
+        int: Количество созданных постов.
+    """
+    user, _ = get_user_model().objects.get_or_create(
+        phone_number=BENCHMARK_PHONE_NUMBER, defaults={"email": "benchmark@example.com"}
+    )
+    category, _ = Category.objects.get_or_create(name="Benchmark")
+
+    existing = Post.objects.filter(is_published=True).count()
+    missing = max(count - existing, 0)
+    make_content = make_content or (lambda number: (f"Запись {number}", f"Содержание записи {number}"))
+
+    created = 0
+    while created < missing:
+        size = min(batch_size, missing - created)
+        posts = []
+        for number in range(existing + created, existing + created + size):
+            title, content = make_content(number)
+            posts.append(
+                Post(
+                    title=title,
+                    content=content,
+                    category=category,
+                    owner=user,
+                    is_published=True,
+                    is_paid=number % 3 == 0,
+                )
+            )
+        Post.objects.bulk_create(posts, batch_size=batch_size)
+        created += size
+        if stdout is not None:
+            stdout.write(f"Создано {created} из {missing} записей")
+    return created
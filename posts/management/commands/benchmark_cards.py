@@ -0,0 +1,90 @@
+import statistics
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.template import Context, Template
+from django.template.loader import render_to_string
+
+from posts.cache import get_version
+from posts.models import Post
+from posts.services import PostCardCache, TaxonomyService
+
+from ._seed import seed_posts
+
+PAGE_TEMPLATE = Template(
+    "{% load posts_filters %}"
+    "{% post_cards posts template_name as cards %}"
+    "{% for post, card in cards %}{{ card }}{% endfor %}"
+)
+
+
+class Command(BaseCommand):
+    """
+    Бенчмарк кэша фрагментов карточек постов.
+
+    Измеряет время рендеринга страницы из N карточек главной страницы: без кэша
+    (каждая карточка рендерится шаблоном), с холодным кэшем (рендеринг и запись
+    фрагментов) и с прогретым кэшем (один get_many на страницу).
+
+    Атрибуты:
+        help (str): Описание команды, которое будет отображаться в справке.
+    """
+
+    help = "Сравнивает время рендеринга страницы карточек без кэша, с холодным и с прогретым кэшем фрагментов"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cards", type=int, default=50, help="Количество карточек на странице")
+        parser.add_argument("--template", default="posts/cards/home_card.html", help="Шаблон карточки")
+        parser.add_argument("--repeat", type=int, default=20, help="Количество замеров")
+
+    def handle(self, *args, **options):
+        """
+        Выполняет замеры и выводит медианное время каждого варианта.
+
+        Args:
+            *args: Позиционные аргументы, переданные в команду.
+            **options: Именованные аргументы, переданные в команду.
+
+        Returns:
+            None: Метод выводит таблицу результатов.
+        """
+        template_name = options["template"]
+        seed_posts(options["cards"], stdout=self.stdout)
+        posts = list(Post.objects.filter(is_published=True).order_by("-created_at", "-id")[: options["cards"]])
+        readable_post_ids = {post.id for post in posts if not post.is_paid}
+        context = Context({"posts": posts, "template_name": template_name, "readable_post_ids": readable_post_ids})
+
+        taxonomy_version = get_version(TaxonomyService.VERSION_NAME)
+        keys = [
+            PostCardCache.cache_key(template_name, post, post.id in readable_post_ids, taxonomy_version)
+            for post in posts
+        ]
+
+        def without_cache():
+            return "".join(
+                render_to_string(template_name, {"post": post, "readable": post.id in readable_post_ids})
+                for post in posts
+            )
+
+        def with_cache():
+            return PAGE_TEMPLATE.render(context)
+
+        def clear():
+            cache.delete_many(keys)
+
+        cases = [
+            ("без кэша", without_cache, None),
+            ("холодный кэш", with_cache, clear),
+            ("прогретый кэш", with_cache, None),
+        ]
+        for name, render, prepare in cases:
+            render()
+            timings = []
+            for _ in range(options["repeat"]):
+                if prepare is not None:
+                    prepare()
+                started = time.perf_counter()
+                render()
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(f"{name:<16} {len(posts)} карточек, медиана {statistics.median(timings):8.2f} мс")
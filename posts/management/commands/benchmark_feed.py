@@ -0,0 +1,71 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.paginators import KeysetPaginator
+
+from ._seed import seed_posts
+
+
+class Command(BaseCommand):
+    """
+    Бенчмарк keyset-пагинации ленты постов.
+
+    Сравнивает время получения первой и глубокой страницы ленты опубликованных постов
+    через KeysetPaginator и, для сравнения, через OFFSET. Для keyset-пагинации время
+    глубокой страницы должно совпадать со временем первой.
+
+    Атрибуты:
+        help (str): Описание команды, которое будет отображаться в справке.
+    """
+
+    help = "Сравнивает время первой и глубокой страницы ленты: keyset против OFFSET"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=100_000, help="Минимальное количество постов в базе")
+        parser.add_argument("--page-size", type=int, default=20, help="Размер страницы")
+        parser.add_argument("--depth", type=int, default=1000, help="Номер глубокой страницы")
+        parser.add_argument("--repeat", type=int, default=20, help="Количество замеров")
+
+    def handle(self, *args, **options):
+        """
+        Выполняет замеры и выводит медианное время каждого варианта.
+
+        Args:
+            *args: Позиционные аргументы, переданные в команду.
+            **options: Именованные аргументы, переданные в команду.
+
+        Returns:
+            None: Метод выводит таблицу результатов.
+        """
+        page_size = options["page_size"]
+        depth = options["depth"]
+        seed_posts(max(options["posts"], page_size * depth), stdout=self.stdout)
+
+        queryset = Post.objects.filter(is_published=True)
+        paginator = KeysetPaginator(queryset, page_size)
+
+        offset = (depth - 1) * page_size
+        anchor = queryset.order_by(*paginator.ordering).values(*paginator.fields)[offset - 1]
+        deep_cursor = paginator.encode_cursor(paginator.position(anchor))
+
+        cases = [
+            ("keyset, страница 1", lambda: paginator.get_page()),
+            (f"keyset, страница {depth}", lambda: paginator.get_page(deep_cursor)),
+            ("offset, страница 1", lambda: list(queryset.order_by(*paginator.ordering)[:page_size])),
+            (
+                f"offset, страница {depth}",
+                lambda: list(queryset.order_by(*paginator.ordering)[offset : offset + page_size]),
+            ),
+        ]
+
+        for name, fetch in cases:
+            fetch()
+            timings = []
+            for _ in range(options["repeat"]):
+                started = time.perf_counter()
+                fetch()
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(f"{name:<24} медиана {statistics.median(timings):8.2f} мс")
@@ -0,0 +1,71 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.forms import FORBIDDEN_WORDS, FORBIDDEN_WORDS_MATCHER
+
+WORDS = (
+    "платформа подписчик публикация автор читатель статья новость обзор история музыка кино книга "
+    "путешествие технология наука спорт здоровье кулинария рецепт фотография искусство экономика"
+).split()
+
+
+def naive_has_forbidden_words(text):
+    """
+    Прежняя проверка: отдельный поиск подстроки для каждого запрещенного слова.
+    """
+    return any(word in text.lower() for word in FORBIDDEN_WORDS)
+
+
+class Command(BaseCommand):
+    """
+    Бенчмарк проверки текста поста на запрещенные слова.
+
+    Сравнивает прежнюю проверку (поиск каждого слова отдельно) с автоматом
+    Ахо–Корасик на длинных текстах без запрещенных слов (худший случай для обеих
+    проверок: текст просматривается целиком).
+
+    Атрибуты:
+        help (str): Описание команды, которое будет отображаться в справке.
+    """
+
+    help = "Сравнивает проверку запрещенных слов: поиск по каждому слову против автомата Ахо–Корасик"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", type=int, default=100_000, help="Размер текста в символах")
+        parser.add_argument("--repeat", type=int, default=20, help="Количество замеров")
+
+    def handle(self, *args, **options):
+        """
+        Выполняет замеры и выводит медианное время каждого варианта.
+
+        Args:
+            *args: Позиционные аргументы, переданные в команду.
+            **options: Именованные аргументы, переданные в команду.
+
+        Returns:
+            None: Метод выводит таблицу результатов.
+        """
+        rng = random.Random(0)
+        words = []
+        length = 0
+        while length < options["size"]:
+            words.append(rng.choice(WORDS))
+            length += len(words[-1]) + 1
+        text = " ".join(words)[: options["size"]]
+
+        cases = [
+            ("поиск по каждому слову", lambda: naive_has_forbidden_words(text)),
+            ("автомат Ахо–Корасик", lambda: FORBIDDEN_WORDS_MATCHER.find_all(text)),
+        ]
+
+        for name, check in cases:
+            check()
+            timings = []
+            for _ in range(options["repeat"]):
+                started = time.perf_counter()
+                check()
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(f"{name:<24} медиана {statistics.median(timings):8.2f} мс")
@@ -0,0 +1,85 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+
+from posts.models import Post
+from posts.services import PostSearchService
+
+from ._seed import seed_posts
+
+WORDS = (
+    "платформа подписка публикация автор читатель статья новость обзор история музыка кино книга "
+    "путешествие технология наука спорт здоровье кулинария рецепт фотография искусство экономика "
+    "финансы образование программирование дизайн природа город культура театр выставка интервью"
+).split()
+
+
+def make_content(number):
+    """
+    Генерирует заголовок и текст поста из случайных русских слов (детерминированно по номеру).
+    """
+    rng = random.Random(number)
+    title = " ".join(rng.choices(WORDS, k=5)).capitalize()
+    content = " ".join(rng.choices(WORDS, k=80))
+    return title, content
+
+
+class Command(BaseCommand):
+    """
+    Бенчмарк полнотекстового поиска постов.
+
+    Сравнивает время получения первой страницы результатов через PostSearchService
+    и через поиск подстроки (ILIKE/LIKE по заголовку и содержанию). На PostgreSQL
+    первый вариант использует GIN-индекс по search_vector.
+
+    Атрибуты:
+        help (str): Описание команды, которое будет отображаться в справке.
+    """
+
+    help = "Сравнивает время поиска: полнотекстовый поиск против поиска подстроки"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=1_000_000, help="Минимальное количество постов в базе")
+        parser.add_argument("--query", default="кулинария рецепт", help="Поисковый запрос")
+        parser.add_argument("--repeat", type=int, default=10, help="Количество замеров")
+
+    def handle(self, *args, **options):
+        """
+        Выполняет замеры и выводит медианное время каждого варианта.
+
+        Args:
+            *args: Позиционные аргументы, переданные в команду.
+            **options: Именованные аргументы, переданные в команду.
+
+        Returns:
+            None: Метод выводит таблицу результатов.
+        """
+        seed_posts(options["posts"], make_content=make_content, stdout=self.stdout)
+        if connection.vendor != "postgresql":
+            self.stdout.write(self.style.WARNING("Не PostgreSQL: замеряется запасная реализация поиска"))
+
+        query = options["query"]
+        substring = Post.objects.filter(is_published=True)
+        for term in query.split():
+            substring = substring.filter(Q(title__icontains=term) | Q(content__icontains=term))
+
+        cases = [
+            ("полнотекстовый поиск", lambda: PostSearchService.search(query)),
+            (
+                "поиск подстроки",
+                lambda: list(substring.order_by("-created_at", "-id")[: PostSearchService.PAGE_SIZE]),
+            ),
+        ]
+
+        for name, fetch in cases:
+            fetch()
+            timings = []
+            for _ in range(options["repeat"]):
+                started = time.perf_counter()
+                fetch()
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(f"{name:<24} медиана {statistics.median(timings):8.2f} мс")
@@ -0,0 +1,80 @@
+from collections import deque, namedtuple
+
+Match = namedtuple("Match", ["word", "position"])
+
+
+class AhoCorasickMatcher:
+    """
+    Поиск множества слов за один проход по тексту (алгоритм Ахо–Корасик).
+
+    Автомат строится один раз при создании объекта: бор по словам, дополненный
+    суффиксными ссылками, разворачивается в полную таблицу переходов, поэтому
+    на каждый символ текста приходится ровно одно обращение к словарю.
+    Поиск не зависит от регистра: переходы добавляются и для заглавных вариантов
+    букв, так что текст не нужно приводить к нижнему регистру, а позиции совпадений
+    указывают на исходный текст.
+
+    Атрибуты:
+        words (list): Искомые слова в исходном написании.
+    """
+
+    def __init__(self, words):
+        self.words = list(words)
+        self._transitions = [{}]
+        self._outputs = [()]
+        self._build(word.lower() for word in self.words)
+
+    def _build(self, patterns):
+        """
+        Строит бор, суффиксные ссылки и полную таблицу переходов.
+        """
+        children = [{}]
+        for index, pattern in enumerate(patterns):
+            state = 0
+            for char in pattern:
+                if char not in children[state]:
+                    children.append({})
+                    self._outputs.append(())
+                    children[state][char] = len(children) - 1
+                state = children[state][char]
+            self._outputs[state] += (index,)
+
+        self._transitions = [None] * len(children)
+        self._transitions[0] = dict(children[0])
+        fail = [0] * len(children)
+        queue = deque(children[0].values())
+        while queue:
+            state = queue.popleft()
+            self._outputs[state] += self._outputs[fail[state]]
+            self._transitions[state] = {**self._transitions[fail[state]], **children[state]}
+            for char, child in children[state].items():
+                fail[child] = self._transitions[fail[state]].get(char, 0)
+                queue.append(child)
+
+        for transitions in self._transitions:
+            for char, target in list(transitions.items()):
+                upper = char.upper()
+                if len(upper) == 1 and upper not in transitions:
+                    transitions[upper] = target
+
+    def find_all(self, text):
+        """
+        Находит все вхождения слов в тексте, включая пересекающиеся.
+
+        Args:
+            text (str): Проверяемый текст.
+
+        Returns:
+            list[Match]: Совпадения (слово в исходном написании, позиция начала) в порядке окончания.
+        """
+        transitions = self._transitions
+        outputs = self._outputs
+        state = 0
+        matches = []
+        for end, char in enumerate(text):
+            state = transitions[state].get(char, 0)
+            if outputs[state]:
+                for index in outputs[state]:
+                    word = self.words[index]
+                    matches.append(Match(word, end - len(word) + 1))
+        return matches
@@ -0,0 +1,66 @@
+import mimetypes
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+
+from .storage import content_addressed_storage
+
+
+def post_image_url(post, variant=None):
+    """
+    Возвращает URL изображения поста или его варианта.
+
+    Файлы бесплатных постов отдаются напрямую из хранилища. Для платных постов
+    путь файла в хранилище не раскрывается: URL ведет на PostMediaView, которая
+    проверяет доступ и передает отдачу файла nginx.
+
+    Args:
+        post (Post | dict): Пост или словарь карточки с полями id, is_paid и image.
+        variant (PostImageVariant | None): Вариант изображения; None - оригинал.
+
+    Returns:
+        str | None: URL файла или None, если у поста нет изображения.
+    """
+    if isinstance(post, dict):
+        post_id, is_paid, image_name = post["id"], post["is_paid"], post["image"]
+    else:
+        post_id, is_paid, image_name = post.id, post.is_paid, post.image.name
+    if not image_name:
+        return None
+    if is_paid:
+        if variant is not None:
+            return reverse("post_image_variant", args=[post_id, variant.id])
+        return reverse("post_image", args=[post_id])
+    if variant is not None:
+        return variant.file.url
+    return content_addressed_storage().url(image_name)
+
+
+def protected_media_response(name, storage=None):
+    """
+    Возвращает ответ, отдающий защищенный файл после проверки доступа.
+
+    При PROTECTED_MEDIA_X_ACCEL ответ не содержит тела: заголовок X-Accel-Redirect
+    указывает nginx внутренний путь файла (location с директивой internal), и байты
+    отдает nginx, не занимая процесс Django. Без nginx (при разработке) файл
+    отдается через FileResponse.
+
+    Args:
+        name (str): Путь файла в хранилище.
+        storage (Storage | None): Хранилище файла; по умолчанию контентно-адресуемое.
+
+    Returns:
+        HttpResponse: Ответ с X-Accel-Redirect или с содержимым файла.
+    """
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    if settings.PROTECTED_MEDIA_X_ACCEL:
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = f"{settings.PROTECTED_MEDIA_INTERNAL_URL}{quote(name)}"
+    else:
+        storage = storage or content_addressed_storage()
+        response = FileResponse(storage.open(name), content_type=content_type)
+    patch_cache_control(response, private=True, max_age=settings.PROTECTED_MEDIA_MAX_AGE)
+    return response
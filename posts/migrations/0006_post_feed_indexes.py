@@ -0,0 +1,31 @@
+# Generated by Django 5.2 on 2026-10-16 22:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0005_alter_post_owner"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(fields=["-created_at", "-id"], name="post_feed_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(fields=["is_published", "-created_at", "-id"], name="post_published_feed_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(fields=["is_paid", "-created_at", "-id"], name="post_paid_feed_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(fields=["category", "-created_at", "-id"], name="post_category_feed_idx"),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2 on 2026-10-16 23:02
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+CREATE_SEARCH_VECTOR_SQL = """
+CREATE OR REPLACE FUNCTION posts_post_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('russian', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(NEW.content, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER posts_post_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, content ON posts_post
+    FOR EACH ROW EXECUTE FUNCTION posts_post_search_vector_update();
+
+UPDATE posts_post SET search_vector =
+    setweight(to_tsvector('russian', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('russian', coalesce(content, '')), 'B');
+
+CREATE INDEX posts_post_search_vector_gin ON posts_post USING gin (search_vector);
+"""
+
+DROP_SEARCH_VECTOR_SQL = """
+DROP INDEX IF EXISTS posts_post_search_vector_gin;
+DROP TRIGGER IF EXISTS posts_post_search_vector_trigger ON posts_post;
+DROP FUNCTION IF EXISTS posts_post_search_vector_update();
+"""
+
+
+def create_search_vector_trigger(apps, schema_editor):
+    """
+    Создает триггер, заполняющий search_vector, и GIN-индекс (только в PostgreSQL).
+
+    В остальных СУБД поле остается пустым, а поиск выполняется запасной реализацией на Python.
+    """
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(CREATE_SEARCH_VECTOR_SQL)
+
+
+def drop_search_vector_trigger(apps, schema_editor):
+    """
+    Удаляет триггер и GIN-индекс поискового вектора (только в PostgreSQL).
+    """
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_SEARCH_VECTOR_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0006_post_feed_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_vector_trigger, drop_search_vector_trigger),
+    ]
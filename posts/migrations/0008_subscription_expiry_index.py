@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-16 23:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0007_post_search_vector"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="subscription",
+            index=models.Index(fields=["is_active", "end_date"], name="subscription_expiry_idx"),
+        ),
+    ]
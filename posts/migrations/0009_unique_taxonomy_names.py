@@ -0,0 +1,53 @@
+# Generated by Django 5.2 on 2026-10-16 23:13
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicates(apps, schema_editor):
+    """
+    Объединяет одноименные категории и подкатегории перед добавлением ограничений уникальности.
+
+    Остается запись с наименьшим id, подкатегории и посты дубликатов переносятся в нее.
+    """
+    Category = apps.get_model("posts", "Category")
+    Subcategory = apps.get_model("posts", "Subcategory")
+    Post = apps.get_model("posts", "Post")
+
+    for duplicate in Category.objects.values("name").annotate(keep=Min("id"), total=Count("id")).filter(total__gt=1):
+        others = Category.objects.filter(name=duplicate["name"]).exclude(pk=duplicate["keep"])
+        Subcategory.objects.filter(category__in=others).update(category_id=duplicate["keep"])
+        Post.objects.filter(category__in=others).update(category_id=duplicate["keep"])
+        others.delete()
+
+    duplicates = (
+        Subcategory.objects.values("category_id", "name")
+        .annotate(keep=Min("id"), total=Count("id"))
+        .filter(total__gt=1)
+    )
+    for duplicate in duplicates:
+        others = Subcategory.objects.filter(category_id=duplicate["category_id"], name=duplicate["name"]).exclude(
+            pk=duplicate["keep"]
+        )
+        Post.objects.filter(subcategory__in=others).update(subcategory_id=duplicate["keep"])
+        others.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0008_subscription_expiry_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="category",
+            name="name",
+            field=models.CharField(max_length=255, unique=True),
+        ),
+        migrations.AddConstraint(
+            model_name="subcategory",
+            constraint=models.UniqueConstraint(fields=("category", "name"), name="subcategory_unique_name"),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2 on 2026-10-16 23:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0009_unique_taxonomy_names"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PostImageVariant",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("source", models.CharField(max_length=255)),
+                ("format", models.CharField(choices=[("webp", "WebP"), ("jpeg", "JPEG")], max_length=10)),
+                ("width", models.PositiveIntegerField()),
+                ("height", models.PositiveIntegerField()),
+                ("file", models.ImageField(max_length=255, upload_to="uploads/variants/")),
+                (
+                    "post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="image_variants", to="posts.post"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Вариант изображения",
+                "verbose_name_plural": "Варианты изображений",
+                "ordering": ("format", "width"),
+                "constraints": [
+                    models.UniqueConstraint(fields=("post", "format", "width"), name="post_image_variant_unique")
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2 on 2026-10-16 23:27
+
+import posts.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0010_post_image_variants"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="post",
+            name="image",
+            field=models.ImageField(
+                blank=True,
+                max_length=255,
+                null=True,
+                storage=posts.storage.content_addressed_storage,
+                upload_to="uploads/",
+            ),
+        ),
+        migrations.CreateModel(
+            name="StoredFile",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("name", models.CharField(max_length=255, unique=True)),
+                ("ref_count", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Файл хранилища",
+                "verbose_name_plural": "Файлы хранилища",
+                "indexes": [models.Index(fields=["ref_count", "updated_at"], name="stored_file_unreferenced_idx")],
+            },
+        ),
+    ]
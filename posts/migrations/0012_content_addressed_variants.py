@@ -0,0 +1,21 @@
+# Generated by Django 5.2 on 2026-10-16 23:33
+
+import posts.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0011_content_addressed_media"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="postimagevariant",
+            name="file",
+            field=models.ImageField(
+                max_length=255, storage=posts.storage.content_addressed_storage, upload_to="uploads/variants/"
+            ),
+        ),
+    ]
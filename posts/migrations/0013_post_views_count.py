@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-17 00:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0012_content_addressed_variants"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="views_count",
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+    ]
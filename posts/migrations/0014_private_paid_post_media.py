@@ -0,0 +1,60 @@
+# Generated by Django 5.2 on 2026-10-17 00:42
+
+import posts.models
+import posts.storage
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def move_paid_post_media(apps, schema_editor):
+    """
+    Переносит изображения платных постов и их варианты в закрытую часть хранилища.
+
+    Ссылки переходят на новые пути, публичные копии без ссылок удалит задача очистки.
+    """
+    Post = apps.get_model("posts", "Post")
+    PostImageVariant = apps.get_model("posts", "PostImageVariant")
+    StoredFile = apps.get_model("posts", "StoredFile")
+    storage = posts.storage.content_addressed_storage()
+
+    def relocate(name):
+        if not name or storage.is_private(name) or not storage.exists(name):
+            return name
+        private_name = storage.relocate(name, True)
+        now = timezone.now()
+        StoredFile.objects.filter(name=name, ref_count__gt=0).update(ref_count=F("ref_count") - 1, updated_at=now)
+        if not StoredFile.objects.filter(name=private_name).update(ref_count=F("ref_count") + 1, updated_at=now):
+            StoredFile.objects.create(name=private_name, ref_count=1)
+        return private_name
+
+    paid = Post.objects.filter(is_paid=True).exclude(image="").exclude(image__isnull=True)
+    for post_id, image in paid.values_list("id", "image").iterator():
+        private_image = relocate(image)
+        if private_image == image:
+            continue
+        Post.objects.filter(pk=post_id).update(image=private_image)
+        for variant_id, file in PostImageVariant.objects.filter(post_id=post_id).values_list("id", "file"):
+            PostImageVariant.objects.filter(pk=variant_id).update(file=relocate(file), source=private_image)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0013_post_views_count"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="post",
+            name="image",
+            field=models.ImageField(
+                blank=True,
+                max_length=255,
+                null=True,
+                storage=posts.storage.content_addressed_storage,
+                upload_to=posts.models.post_image_upload_to,
+            ),
+        ),
+        migrations.RunPython(move_paid_post_media, migrations.RunPython.noop),
+    ]
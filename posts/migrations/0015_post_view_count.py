@@ -0,0 +1,62 @@
+# Generated by Django 5.2 on 2026-10-17 01:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_views_to_counters(apps, schema_editor):
+    """
+    Переносит записанные просмотры постов в таблицу счетчиков.
+    """
+    Post = apps.get_model("posts", "Post")
+    PostViewCount = apps.get_model("posts", "PostViewCount")
+    viewed = Post.objects.filter(views_count__gt=0).values_list("id", "views_count")
+    PostViewCount.objects.bulk_create(
+        (PostViewCount(post_id=post_id, views_count=views_count) for post_id, views_count in viewed.iterator()),
+        batch_size=1000,
+    )
+
+
+def copy_counters_to_views(apps, schema_editor):
+    """
+    Возвращает просмотры из таблицы счетчиков в поле поста.
+    """
+    Post = apps.get_model("posts", "Post")
+    PostViewCount = apps.get_model("posts", "PostViewCount")
+    for post_id, views_count in PostViewCount.objects.values_list("post_id", "views_count").iterator():
+        Post.objects.filter(pk=post_id).update(views_count=views_count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0014_private_paid_post_media"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PostViewCount",
+            fields=[
+                (
+                    "post",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="view_count",
+                        serialize=False,
+                        to="posts.post",
+                    ),
+                ),
+                ("views_count", models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "Счетчик просмотров",
+                "verbose_name_plural": "Счетчики просмотров",
+            },
+        ),
+        migrations.RunPython(copy_views_to_counters, copy_counters_to_views),
+        migrations.RemoveField(
+            model_name="post",
+            name="views_count",
+        ),
+    ]
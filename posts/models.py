@@ -1,8 +1,11 @@
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.utils import timezone
 
+from .storage import ContentAddressedStorage, content_addressed_storage
+
 User = get_user_model()
 
 
@@ -19,10 +22,9 @@ class Category(models.Model):
         parent (ForeignKey): Ссылка на родительскую категорию (если есть).
     """
 
-    name = models.CharField(max_length=255)
+    name = models.CharField(max_length=255, unique=True)
     description = models.TextField(blank=True)
 
-
     class Meta:
         verbose_name = "Категория"
         verbose_name_plural = "Категории"
@@ -55,6 +57,9 @@ class Subcategory(models.Model):
     class Meta:
         verbose_name = "Подкатегория"
         verbose_name_plural = "Подкатегории"
+        constraints = [
+            models.UniqueConstraint(fields=["category", "name"], name="subcategory_unique_name"),
+        ]
 
     def __str__(self):
         """
@@ -66,6 +71,24 @@ class Subcategory(models.Model):
         return self.name
 
 
+def post_image_upload_to(instance, filename):
+    """
+    Возвращает предложенное имя загружаемого изображения поста.
+
+    Изображение платного поста сразу записывается в закрытую часть хранилища
+    (см. ContentAddressedStorage.private_prefix).
+
+    Args:
+        instance (Post): Пост.
+        filename (str): Имя загруженного файла.
+
+    Returns:
+        str: Имя для хранилища.
+    """
+    directory = ContentAddressedStorage.private_prefix if instance.is_paid else "uploads"
+    return f"{directory}/{filename}"
+
+
 class Post(models.Model):
     """
     Модель поста.
@@ -85,7 +108,11 @@ class Post(models.Model):
         owner (ForeignKey): Ссылка на пользователя, который является владельцем поста.
         is_published (bool): Указывает, опубликован ли пост.
         is_paid (bool): Указывает, является ли пост платным.
-        image (ImageField): Изображение, связанное с постом (необязательное поле).
+        image (ImageField): Изображение, связанное с постом (необязательное поле). Хранится
+            по хэшу содержимого (см. posts.storage.ContentAddressedStorage); изображения
+            платных постов - в закрытой части хранилища.
+        search_vector (SearchVectorField): Поисковый вектор заголовка и содержания. В PostgreSQL
+            поддерживается триггером базы данных и индексируется GIN-индексом (см. миграцию 0007).
     """
 
     title = models.CharField(max_length=255)
@@ -97,10 +124,13 @@ class Post(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    image = models.ImageField(upload_to="uploads/", null=True, blank=True)
+    image = models.ImageField(
+        upload_to=post_image_upload_to, storage=content_addressed_storage, max_length=255, null=True, blank=True
+    )
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     is_published = models.BooleanField(default=False)
     is_paid = models.BooleanField(default=False)
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         """
@@ -113,6 +143,7 @@ class Post(models.Model):
             verbose_name (str): Человекочитаемое имя модели в единственном числе.
             verbose_name_plural (str): Человекочитаемое имя модели во множественном числе.
             permissions (tuple): Кортеж разрешений, связанных с моделью.
+            indexes (list): Индексы по ключу (created_at, id) для keyset-пагинации лент.
         """
 
         verbose_name = "Запись"
@@ -121,6 +152,12 @@ class Post(models.Model):
             ("can_unpublish_post", "Может отменять публикацию записи"),
             ("can_delete_post", "Может удалять запись"),
         )
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="post_feed_idx"),
+            models.Index(fields=["is_published", "-created_at", "-id"], name="post_published_feed_idx"),
+            models.Index(fields=["is_paid", "-created_at", "-id"], name="post_paid_feed_idx"),
+            models.Index(fields=["category", "-created_at", "-id"], name="post_category_feed_idx"),
+        ]
 
     def __str__(self):
         """
@@ -131,6 +168,135 @@ class Post(models.Model):
         """
         return self.title
 
+    @property
+    def views_count(self):
+        """
+        Возвращает количество просмотров поста (см. PostViewCount).
+
+        Чтобы не делать отдельный запрос, загружайте пост с select_related("view_count").
+
+        Returns:
+            int: Количество просмотров; 0, если просмотры еще не записывались.
+        """
+        try:
+            return self.view_count.views_count
+        except PostViewCount.DoesNotExist:
+            return 0
+
+
+class PostViewCount(models.Model):
+    """
+    Счетчик просмотров поста.
+
+    Хранится отдельно от Post, поэтому сохранение поста (формы, админка, сигналы)
+    не может затереть просмотры, записанные за это время. Строку создает и меняет
+    только сброс буфера просмотров (см. posts.counters), поэтому значение отстает
+    на интервал сброса; у поста без записанных просмотров строки нет.
+
+    Атрибуты:
+        post (OneToOneField): Пост; является первичным ключом.
+        views_count (int): Количество просмотров.
+    """
+
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name="view_count")
+    views_count = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Счетчик просмотров"
+        verbose_name_plural = "Счетчики просмотров"
+
+    def __str__(self):
+        """
+        Возвращает строковое представление счетчика.
+
+        Returns:
+            str: Идентификатор поста и количество просмотров.
+        """
+        return f"{self.post_id}: {self.views_count}"
+
+
+class StoredFile(models.Model):
+    """
+    Счетчик ссылок на файл контентно-адресуемого хранилища.
+
+    Один файл может быть изображением нескольких постов и аватаром нескольких
+    пользователей. Счетчик меняется сигналами при сохранении и удалении объектов
+    (см. StoredFileService); файл удаляется задачей очистки, только когда счетчик
+    равен нулю дольше льготного периода.
+
+    Атрибуты:
+        name (str): Путь файла в хранилище.
+        ref_count (int): Количество объектов, ссылающихся на файл.
+        updated_at (DateTimeField): Время последнего изменения счетчика.
+    """
+
+    name = models.CharField(max_length=255, unique=True)
+    ref_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Файл хранилища"
+        verbose_name_plural = "Файлы хранилища"
+        indexes = [
+            models.Index(fields=["ref_count", "updated_at"], name="stored_file_unreferenced_idx"),
+        ]
+
+    def __str__(self):
+        """
+        Возвращает строковое представление файла.
+
+        Returns:
+            str: Путь файла и количество ссылок.
+        """
+        return f"{self.name} ({self.ref_count})"
+
+
+class PostImageVariant(models.Model):
+    """
+    Уменьшенная копия изображения поста.
+
+    Варианты строятся задачей posts.tasks.generate_post_image_variants после
+    сохранения поста с новым изображением. Поле source хранит путь оригинала,
+    из которого построен вариант: варианты прежнего изображения не используются,
+    даже если задача для нового еще не выполнилась.
+
+    Атрибуты:
+        post (ForeignKey): Пост, к изображению которого относится вариант.
+        source (str): Путь исходного изображения в хранилище.
+        format (str): Формат файла варианта.
+        width (int): Ширина варианта в пикселях.
+        height (int): Высота варианта в пикселях.
+        file (ImageField): Файл варианта; хранится по хэшу содержимого, как и оригинал.
+    """
+
+    WEBP = "webp"
+    JPEG = "jpeg"
+    FORMAT_CHOICES = [(WEBP, "WebP"), (JPEG, "JPEG")]
+
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="image_variants")
+    source = models.CharField(max_length=255)
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    file = models.ImageField(upload_to="uploads/variants/", storage=content_addressed_storage, max_length=255)
+
+    class Meta:
+        verbose_name = "Вариант изображения"
+        verbose_name_plural = "Варианты изображений"
+        ordering = ("format", "width")
+        constraints = [
+            models.UniqueConstraint(fields=["post", "format", "width"], name="post_image_variant_unique"),
+        ]
+
+    def __str__(self):
+        """
+        Возвращает строковое представление варианта.
+
+        Returns:
+            str: Путь файла, формат и ширина варианта.
+        """
+        return f"{self.file.name} ({self.format}, {self.width}w)"
+
 
 class Subscription(models.Model):
     """
@@ -154,6 +320,18 @@ class Subscription(models.Model):
     end_date = models.DateTimeField()
     is_active = models.BooleanField(default=False)
 
+    class Meta:
+        """
+        Метаданные модели Subscription.
+
+        Атрибуты:
+            indexes (list): Индекс (is_active, end_date) для поиска истекших активных подписок.
+        """
+
+        indexes = [
+            models.Index(fields=["is_active", "end_date"], name="subscription_expiry_idx"),
+        ]
+
     def __str__(self):
         """
         Возвращает строковое представление подписки.
@@ -1,4 +1,15 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class CustomPageNumberPagination(PageNumberPagination):
@@ -20,3 +31,343 @@ class CustomPageNumberPagination(PageNumberPagination):
     page_size = 5
     page_size_query_param = "page_size"
     max_page_size = 100
+
+
+class CursorJSONEncoder(DjangoJSONEncoder):
+    """
+    JSON-энкодер значений курсора.
+
+    В отличие от DjangoJSONEncoder сохраняет микросекунды у дат: при усечении
+    до миллисекунд курсор указывал бы не на ту строку.
+    """
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class InvalidCursor(Exception):
+    """
+    Исключение для поврежденного или подделанного курсора пагинации.
+    """
+
+
+class KeysetPage:
+    """
+    Страница результатов keyset-пагинации.
+
+    В отличие от страницы Django Paginator, не знает общего количества страниц:
+    для перехода доступны только курсоры соседних страниц.
+
+    Атрибуты:
+        object_list (list): Объекты текущей страницы.
+        next_cursor (str | None): Курсор следующей страницы.
+        previous_cursor (str | None): Курсор предыдущей страницы.
+    """
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Пагинатор по ключу (keyset/cursor pagination).
+
+    Вместо OFFSET страница выбирается условием «строго после последней строки
+    предыдущей страницы» по упорядоченному набору полей, поэтому стоимость запроса
+    не зависит от глубины страницы и опирается на индекс по этим полям.
+    Последнее поле упорядочивания должно быть уникальным (обычно "id"),
+    чтобы порядок был стабильным.
+
+    Курсор непрозрачен для клиента: это base64 от JSON со значениями ключа
+    и направлением перехода.
+
+    Атрибуты:
+        queryset (QuerySet): Исходный запрос без сортировки.
+        per_page (int): Количество объектов на странице.
+        ordering (tuple): Поля сортировки, например ("-created_at", "-id").
+    """
+
+    def __init__(self, queryset, per_page, ordering=("-created_at", "-id")):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+        self.fields = [field.lstrip("-") for field in self.ordering]
+
+    def get_page(self, cursor=None):
+        """
+        Возвращает страницу, начинающуюся после позиции курсора.
+
+        Args:
+            cursor (str | None): Курсор, полученный с предыдущей страницы. None - первая страница.
+
+        Returns:
+            KeysetPage: Страница с объектами и курсорами соседних страниц.
+
+        Raises:
+            InvalidCursor: Если курсор не удалось разобрать.
+        """
+        position, backwards = self.decode_cursor(cursor) if cursor else (None, False)
+
+        ordering = self.reverse_ordering() if backwards else self.ordering
+        queryset = self.queryset
+        if position is not None:
+            queryset = queryset.filter(self.seek_filter(position, backwards))
+
+        rows = list(queryset.order_by(*ordering)[: self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if backwards:
+            rows.reverse()
+
+        if backwards:
+            has_next, has_previous = position is not None, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+
+        next_cursor = self.encode_cursor(self.position(rows[-1])) if has_next and rows else None
+        previous_cursor = self.encode_cursor(self.position(rows[0]), backwards=True) if has_previous and rows else None
+        return KeysetPage(rows, next_cursor=next_cursor, previous_cursor=previous_cursor)
+
+    def get_page_from_rows(self, rows, cursor=None):
+        """
+        Возвращает страницу из списка, уже отсортированного по полям ключа.
+
+        Используется запасными реализациями, которые ранжируют результаты в Python
+        (например, поиск без PostgreSQL), чтобы курсоры были совместимы с основной реализацией.
+
+        Args:
+            rows (list): Объекты или словари, отсортированные в порядке self.ordering.
+            cursor (str | None): Курсор страницы.
+
+        Returns:
+            KeysetPage: Страница с объектами и курсорами соседних страниц.
+
+        Raises:
+            InvalidCursor: Если курсор не удалось разобрать.
+        """
+        position, backwards = self.decode_cursor(cursor) if cursor else (None, False)
+
+        if position is None:
+            start, end = 0, self.per_page
+        elif backwards:
+            end = next(
+                (index for index, row in enumerate(rows) if not self.is_before(self.position(row), position)),
+                len(rows),
+            )
+            start = max(end - self.per_page, 0)
+        else:
+            start = next(
+                (index for index, row in enumerate(rows) if self.is_before(position, self.position(row))), len(rows)
+            )
+            end = start + self.per_page
+
+        page_rows = rows[start:end]
+        has_next = end < len(rows)
+        has_previous = start > 0
+        next_cursor = self.encode_cursor(self.position(page_rows[-1])) if has_next and page_rows else None
+        previous_cursor = (
+            self.encode_cursor(self.position(page_rows[0]), backwards=True) if has_previous and page_rows else None
+        )
+        return KeysetPage(page_rows, next_cursor=next_cursor, previous_cursor=previous_cursor)
+
+    def is_before(self, left, right):
+        """
+        Проверяет, что позиция left идет в ленте раньше позиции right.
+        """
+        for ordering_field, left_value, right_value in zip(self.ordering, left, right):
+            if left_value == right_value:
+                continue
+            if ordering_field.startswith("-"):
+                return left_value > right_value
+            return left_value < right_value
+        return False
+
+    def reverse_ordering(self):
+        """
+        Возвращает сортировку, обратную основной (для перехода назад).
+        """
+        return tuple(field[1:] if field.startswith("-") else f"-{field}" for field in self.ordering)
+
+    def seek_filter(self, position, backwards=False):
+        """
+        Строит условие «после позиции» для составного ключа.
+
+        Для ключа (a, b) по убыванию это `a <= x AND (a < x OR (a = x AND b < y))`:
+        избыточное условие `a <= x` позволяет СУБД начать сканирование индекса
+        прямо с позиции курсора, а не разбирать OR по всей таблице.
+
+        Args:
+            position (list): Значения полей ключа в позиции курсора.
+            backwards (bool): Строить условие для движения назад.
+
+        Returns:
+            Q: Условие фильтрации.
+        """
+        condition = Q()
+        for index, ordering_field in enumerate(self.ordering):
+            descending = ordering_field.startswith("-") != backwards
+            lookup = "lt" if descending else "gt"
+            step = Q(**{f"{self.fields[index]}__{lookup}": position[index]})
+            for prefix_field, value in zip(self.fields[:index], position[:index]):
+                step &= Q(**{prefix_field: value})
+            condition |= step
+
+        descending = self.ordering[0].startswith("-") != backwards
+        bound = Q(**{f"{self.fields[0]}__{'lte' if descending else 'gte'}": position[0]})
+        return bound & condition
+
+    def position(self, row):
+        """
+        Возвращает значения полей ключа для объекта или словаря из values().
+        """
+        if isinstance(row, dict):
+            return [row[field] for field in self.fields]
+        return [getattr(row, field) for field in self.fields]
+
+    def encode_cursor(self, position, backwards=False):
+        """
+        Кодирует позицию в непрозрачный курсор.
+        """
+        payload = {"p": position}
+        if backwards:
+            payload["r"] = 1
+        data = json.dumps(payload, cls=CursorJSONEncoder, separators=(",", ":"))
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        """
+        Разбирает курсор и приводит значения к типам полей модели.
+
+        Значения ключа должны быть строками или числами: None и вложенные
+        структуры в условии фильтрации не имеют смысла.
+
+        Returns:
+            tuple: (список значений ключа, флаг движения назад).
+
+        Raises:
+            InvalidCursor: Если курсор поврежден.
+        """
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            position = payload["p"]
+            backwards = bool(payload.get("r"))
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise InvalidCursor(cursor)
+
+        if not isinstance(position, list) or len(position) != len(self.fields):
+            raise InvalidCursor(cursor)
+        if not all(isinstance(value, (str, int, float)) for value in position):
+            raise InvalidCursor(cursor)
+
+        try:
+            position = [self.to_python(field, value) for field, value in zip(self.fields, position)]
+        except (TypeError, ValidationError):
+            raise InvalidCursor(cursor)
+        return position, backwards
+
+    def to_python(self, field_name, value):
+        """
+        Преобразует значение из курсора к типу поля модели (для аннотаций возвращает как есть).
+        """
+        try:
+            field = self.queryset.model._meta.get_field(field_name)
+        except FieldDoesNotExist:
+            return value
+        return field.to_python(value)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Пагинация DRF по ключу на основе KeysetPaginator.
+
+    Ответ содержит ссылки next и previous с курсором и список results, без общего
+    количества объектов: COUNT по большой таблице стоил бы дороже самой страницы.
+    Поля сортировки берутся из атрибута keyset_ordering представления.
+
+    Атрибуты:
+        page_size (int): Количество объектов на странице по умолчанию.
+        page_size_query_param (str): Параметр запроса с размером страницы.
+        max_page_size (int): Максимальный размер страницы.
+        cursor_query_param (str): Параметр запроса с курсором.
+        ordering (tuple): Поля сортировки, если представление их не задает.
+    """
+
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    ordering = ("-created_at", "-id")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Возвращает объекты страницы по курсору из запроса.
+
+        Args:
+            queryset (QuerySet): Запрос без сортировки.
+            request (Request): Запрос.
+            view (APIView | None): Представление.
+
+        Returns:
+            list: Объекты страницы.
+
+        Raises:
+            NotFound: Если курсор поврежден.
+        """
+        self.request = request
+        ordering = getattr(view, "keyset_ordering", self.ordering)
+        paginator = KeysetPaginator(queryset, self.get_page_size(request), ordering=ordering)
+        try:
+            self.page = paginator.get_page(request.query_params.get(self.cursor_query_param))
+        except InvalidCursor:
+            raise NotFound("Некорректный курсор страницы.")
+        return list(self.page)
+
+    def get_page_size(self, request):
+        """
+        Возвращает размер страницы из параметра запроса, ограниченный max_page_size.
+        """
+        value = request.query_params.get(self.page_size_query_param, "")
+        if value.isdigit() and int(value) > 0:
+            return min(int(value), self.max_page_size)
+        return self.page_size
+
+    def get_link(self, cursor):
+        """
+        Возвращает абсолютную ссылку на страницу с курсором или None.
+        """
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(remove_query_param(url, self.cursor_query_param), self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        """
+        Возвращает ответ со ссылками на соседние страницы и объектами страницы.
+        """
+        return Response(
+            {
+                "next": self.get_link(self.page.next_cursor),
+                "previous": self.get_link(self.page.previous_cursor),
+                "results": data,
+            }
+        )
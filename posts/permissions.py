@@ -0,0 +1,29 @@
+from rest_framework import permissions
+
+from .services import EntitlementService
+
+
+class CanReadPost(permissions.BasePermission):
+    """
+    Разрешение на чтение поста.
+
+    Бесплатные посты доступны всем, платные - только пользователям,
+    у которых есть доступ по данным EntitlementService (подписка, оплата поста,
+    владение постом или роль модератора).
+    """
+
+    message = "Платная запись доступна только по подписке или после оплаты."
+
+    def has_object_permission(self, request, view, obj):
+        """
+        Проверяет, может ли пользователь читать пост.
+
+        Args:
+            request (Request): Объект запроса, содержащий информацию о пользователе.
+            view (View): Представление, к которому применяется разрешение.
+            obj (Post): Проверяемый пост.
+
+        Returns:
+            bool: True, если пользователь может читать пост, иначе False.
+        """
+        return EntitlementService.can_read(request.user, obj)
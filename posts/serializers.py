@@ -1,6 +1,7 @@
 from rest_framework import serializers
 
-from .models import Subscription
+from .media import post_image_url
+from .models import Post, Subscription
 
 
 class SubscriptionSerializer(serializers.ModelSerializer):
@@ -20,3 +21,86 @@ class SubscriptionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Subscription
         fields = ["user", "plan", "end_date", "is_active"]
+
+
+class PostListSerializer(serializers.ModelSerializer):
+    """
+    Облегченный сериализатор поста для списков.
+
+    Не содержит текста поста; поле can_read показывает, доступен ли пост
+    текущему пользователю (множество доступных постов страницы передается
+    в контексте как readable_post_ids).
+
+    Атрибуты:
+        category_name (str): Название категории поста.
+        image (str): URL изображения; файлы платных постов отдаются через защищенную ссылку.
+        can_read (bool): Может ли текущий пользователь читать пост.
+    """
+
+    category_name = serializers.CharField(source="category.name", read_only=True)
+    image = serializers.SerializerMethodField()
+    can_read = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Post
+        fields = ["id", "title", "created_at", "image", "is_paid", "category", "category_name", "can_read"]
+
+    def get_image(self, obj):
+        """
+        Возвращает абсолютный URL изображения; для платных постов - защищенный (см. posts.media).
+
+        Args:
+            obj (Post): Сериализуемый пост.
+
+        Returns:
+            str | None: URL изображения или None.
+        """
+        url = post_image_url(obj)
+        request = self.context.get("request")
+        if url and request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+    def get_can_read(self, obj):
+        """
+        Возвращает признак доступа текущего пользователя к посту.
+
+        Args:
+            obj (Post): Сериализуемый пост.
+
+        Returns:
+            bool: True, если пользователь может читать пост.
+        """
+        readable_post_ids = self.context.get("readable_post_ids")
+        if readable_post_ids is None:
+            return not obj.is_paid
+        return obj.id in readable_post_ids
+
+
+class PostDetailSerializer(PostListSerializer):
+    """
+    Полный сериализатор поста для детального просмотра.
+
+    Атрибуты:
+        subcategory_name (str): Название подкатегории поста.
+        owner_name (str): Полное имя владельца поста.
+    """
+
+    subcategory_name = serializers.CharField(source="subcategory.name", read_only=True, default=None)
+    owner_name = serializers.CharField(source="owner.get_full_name", read_only=True)
+
+    class Meta(PostListSerializer.Meta):
+        fields = PostListSerializer.Meta.fields + [
+            "content",
+            "updated_at",
+            "subcategory",
+            "subcategory_name",
+            "owner",
+            "owner_name",
+        ]
+
+    def get_can_read(self, obj):
+        """
+        Детальный просмотр отдается только при наличии доступа (см. CanReadPost).
+        """
+        return True
@@ -1,6 +1,23 @@
+import math
+import re
+import time
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
 from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, FloatField, Prefetch, Q, prefetch_related_objects
+from django.db.models.functions import Cast, Greatest
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from payments.models import Payment
+from users.roles import RoleResolver
 
-from .models import Post
+from .cache import bump_version, get_or_recompute, get_version
+from .models import Category, Post, StoredFile, Subcategory, Subscription, User
+from .paginators import KeysetPage, KeysetPaginator
+from .storage import ContentAddressedStorage
 
 
 class PostService:
@@ -10,30 +27,855 @@ class PostService:
     Этот класс содержит статические методы для работы с постами, включая
     получение постов по категориям с использованием кэширования.
 
+    Атрибуты:
+        CARD_FIELDS (tuple): Поля поста, необходимые для карточки в ленте.
+        CATEGORY_PAGE_SIZE (int): Количество постов на странице категории.
+        CATEGORY_CACHE_TIMEOUT (int): Время свежести страницы категории в кэше, в секундах.
+        CATEGORY_STALE_TIMEOUT (int): Сколько секунд после истечения свежести можно отдавать устаревшую страницу.
+        FEED_VERSION_NAME (str): Имя версии лент постов в кэше.
+
     Методы:
-        get_posts_by_category(category_id): Возвращает список постов в указанной категории с кэшированием.
+        get_cards(queryset): Возвращает проекцию запроса только с полями карточки.
+        category_queryset(category_id): Возвращает запрос карточек опубликованных постов категории.
+        get_posts_by_category(category_id, cursor): Возвращает страницу постов категории с кэшированием.
+        invalidate_category(category_id): Сбрасывает кэш страниц категории.
+        feed_version(): Возвращает версию лент постов.
+        invalidate_feeds(): Меняет версию лент постов.
+        invalidate_post(*category_ids): Сбрасывает кэш категорий поста и версию лент.
     """
 
+    CARD_FIELDS = (
+        "id",
+        "title",
+        "created_at",
+        "updated_at",
+        "image",
+        "is_paid",
+        "category_id",
+        "category_name",
+        "owner_id",
+    )
+    CATEGORY_PAGE_SIZE = 20
+    CATEGORY_CACHE_TIMEOUT = 60 * 15
+    CATEGORY_STALE_TIMEOUT = 60 * 60
+    FEED_VERSION_NAME = "posts:feed"
+
+    @staticmethod
+    def get_cards(queryset):
+        """
+        Возвращает проекцию постов только с полями, необходимыми для карточки.
+
+        Вместо полных объектов Post (включая объемное поле content) выбираются
+        словари с идентификатором, заголовком, датой, путем к изображению и
+        названием категории, полученным через JOIN.
+
+        Args:
+            queryset (QuerySet): Исходный запрос постов.
+
+        Returns:
+            QuerySet: Запрос values() со словарями карточек.
+        """
+        return queryset.annotate(category_name=F("category__name")).values(*PostService.CARD_FIELDS)
+
+    @staticmethod
+    def category_queryset(category_id):
+        """
+        Возвращает проекцию опубликованных постов категории с полями карточки.
+
+        Args:
+            category_id (int): Идентификатор категории.
+
+        Returns:
+            QuerySet: Словари карточек постов категории.
+        """
+        return PostService.get_cards(Post.objects.filter(category_id=category_id, is_published=True))
+
+    @staticmethod
+    def category_version_name(category_id):
+        """
+        Возвращает имя версии кэша постов категории.
+
+        Args:
+            category_id (int): Идентификатор категории.
+
+        Returns:
+            str: Имя версии для posts.cache.
+        """
+        return f"posts:category:{category_id}"
+
     @staticmethod
-    def get_posts_by_category(category_id):
+    def get_posts_by_category(category_id, cursor=None):
         """
-        Возвращает список всех записей в указанной категории с кэшированием.
+        Возвращает страницу опубликованных постов категории с кэшированием.
 
-        Этот метод проверяет кэш на наличие постов в указанной категории. Если посты
-        не найдены в кэше, выполняется запрос к базе данных, и результат кэшируется на 15 минут.
+        В кэше хранятся готовые результаты первой страницы: идентификаторы постов,
+        данные карточек и курсор следующей страницы. Ключ включает версию категории,
+        которую увеличивают сигналы сохранения и удаления поста (см. posts.signals),
+        поэтому публикация поста сразу делает кэш категории недействительным. После
+        истечения свежести страницу пересчитывает только один процесс, остальные отдают
+        устаревшее значение (см. posts.cache.get_or_recompute). Страницы по курсору не
+        кэшируются: курсор приходит от клиента, и ключи по нему позволили бы заполнить
+        кэш произвольными записями, а сам запрос по ключу идет по индексу.
 
         Args:
             category_id (int): Идентификатор категории, для которой нужно получить посты.
+            cursor (str | None): Курсор страницы; None - первая страница.
+
+        Returns:
+            KeysetPage: Страница словарей карточек постов.
+
+        Raises:
+            InvalidCursor: Если курсор поврежден.
+        """
+        paginator = KeysetPaginator(PostService.category_queryset(category_id), PostService.CATEGORY_PAGE_SIZE)
+        if cursor:
+            return paginator.get_page(cursor)
+
+        version = get_version(PostService.category_version_name(category_id))
+        cache_key = f"posts:category:{category_id}:v{version}:first"
+
+        def compute():
+            page = paginator.get_page()
+            return {
+                "ids": [card["id"] for card in page.object_list],
+                "cards": page.object_list,
+                "next": page.next_cursor,
+            }
+
+        result = get_or_recompute(
+            cache_key, compute, PostService.CATEGORY_CACHE_TIMEOUT, PostService.CATEGORY_STALE_TIMEOUT
+        )
+        return KeysetPage(result["cards"], next_cursor=result["next"])
+
+    @staticmethod
+    def invalidate_category(category_id):
+        """
+        Делает недействительными все закэшированные страницы категории.
+
+        Args:
+            category_id (int): Идентификатор категории.
+
+        Returns:
+            None
+        """
+        bump_version(PostService.category_version_name(category_id))
+
+    @staticmethod
+    def feed_version():
+        """
+        Возвращает версию лент постов, которая меняется при любом изменении поста.
+
+        Используется в ETag страниц со списками постов.
+
+        Returns:
+            int: Номер версии.
+        """
+        return get_version(PostService.FEED_VERSION_NAME)
+
+    @staticmethod
+    def invalidate_feeds():
+        """
+        Меняет версию лент постов.
+
+        Returns:
+            None
+        """
+        bump_version(PostService.FEED_VERSION_NAME)
+
+    @staticmethod
+    def invalidate_post(*category_ids):
+        """
+        Сбрасывает кэш страниц категорий поста и меняет версию лент после изменения поста.
+
+        Args:
+            *category_ids (int | None): Категории поста (текущая и прежняя); None пропускаются.
+
+        Returns:
+            None
+        """
+        for category_id in set(category_ids) - {None}:
+            PostService.invalidate_category(category_id)
+        PostService.invalidate_feeds()
+
+
+class PostCardCache:
+    """
+    Кэш отрендеренных HTML-фрагментов карточек постов.
+
+    Фрагмент карточки хранится под ключом, включающим шаблон, идентификатор поста,
+    момент его последнего изменения (updated_at) и версию дерева категорий, поэтому
+    редактирование поста или переименование категории просто приводит к промаху,
+    а устаревшие фрагменты истекают сами. Фрагменты всей страницы читаются одним
+    запросом cache.get_many, отсутствующие рендерятся и записываются одним set_many.
+
+    Шаблон карточки получает переменные post и readable (доступно ли пользователю
+    содержание поста); значение readable входит в ключ. Данные конкретного
+    пользователя (например, CSRF-токен формы) в шаблон карточки не передаются
+    и должны выводиться вне фрагмента.
+
+    Атрибуты:
+        TIMEOUT (int): Время хранения фрагмента в кэше, в секундах.
+        KEY_PREFIX (str): Префикс ключей фрагментов.
+
+    Методы:
+        render(posts, template_name, readable_post_ids): Возвращает пары (пост, HTML карточки).
+    """
+
+    TIMEOUT = 60 * 60 * 24
+    KEY_PREFIX = "posts:card"
+
+    @staticmethod
+    def _value(post, field):
+        """
+        Возвращает поле поста для объекта модели или словаря из values().
+        """
+        if isinstance(post, dict):
+            return post[field]
+        return getattr(post, field)
+
+    @classmethod
+    def cache_key(cls, template_name, post, readable, taxonomy_version):
+        """
+        Возвращает ключ кэша фрагмента карточки.
+
+        Args:
+            template_name (str): Шаблон карточки.
+            post (Post | dict): Пост или словарь карточки с полями id и updated_at.
+            readable (bool): Доступно ли содержание поста пользователю.
+            taxonomy_version (int): Версия дерева категорий.
+
+        Returns:
+            str: Ключ кэша.
+        """
+        updated_at = cls._value(post, "updated_at")
+        stamp = int(updated_at.timestamp() * 1_000_000) if updated_at else 0
+        return (
+            f"{cls.KEY_PREFIX}:{template_name}:{cls._value(post, 'id')}:{stamp}:"
+            f"t{taxonomy_version}:{'r' if readable else 'l'}"
+        )
+
+    @classmethod
+    def render(cls, posts, template_name, readable_post_ids=None, prefetch=()):
+        """
+        Возвращает HTML карточек постов страницы, используя кэш фрагментов.
+
+        Args:
+            posts (Iterable[Post | dict]): Посты страницы.
+            template_name (str): Шаблон карточки.
+            readable_post_ids (set | None): Идентификаторы постов, содержание которых доступно
+                пользователю; None - содержание доступно для всех постов.
+            prefetch (tuple): Связи, которые загружаются через prefetch_related только для
+                постов, чьих карточек нет в кэше (например, "image_variants").
+
+        Returns:
+            list[tuple]: Пары (пост, HTML карточки) в исходном порядке.
+        """
+        posts = list(posts)
+        if not posts:
+            return []
+
+        taxonomy_version = get_version(TaxonomyService.VERSION_NAME)
+        keys = []
+        for post in posts:
+            readable = readable_post_ids is None or cls._value(post, "id") in readable_post_ids
+            keys.append((cls.cache_key(template_name, post, readable, taxonomy_version), readable))
+
+        fragments = cache.get_many([key for key, _ in keys])
+        misses = [(post, key, readable) for post, (key, readable) in zip(posts, keys) if key not in fragments]
+        if prefetch:
+            prefetch_related_objects([post for post, _, _ in misses if isinstance(post, Post)], *prefetch)
+
+        missing = {}
+        for post, key, readable in misses:
+            if key not in missing:
+                missing[key] = render_to_string(template_name, {"post": post, "readable": readable})
+        if missing:
+            cache.set_many(missing, cls.TIMEOUT)
+            fragments.update(missing)
+
+        return [(post, mark_safe(fragments[key])) for post, (key, _) in zip(posts, keys)]
+
+
+class TaxonomyService:
+    """
+    Кэш дерева категорий и подкатегорий.
+
+    Дерево строится из моделей Category и Subcategory и хранится в Redis под
+    ключом, включающим номер версии, а также в памяти процесса. На каждом чтении
+    проверяется только номер версии (одно обращение к кэшу, без запросов к базе);
+    сохранение или удаление категории либо подкатегории увеличивает версию
+    (см. posts.signals), после чего все процессы перечитывают дерево.
+
+    Атрибуты:
+        VERSION_NAME (str): Имя версии набора в кэше.
+        TIMEOUT (int): Время хранения дерева в Redis, в секундах.
+
+    Методы:
+        get_tree(): Возвращает список категорий с вложенными подкатегориями.
+        get_category(category_id): Возвращает категорию из дерева или None.
+        get_subcategory(subcategory_id): Возвращает подкатегорию из дерева или None.
+        get_subcategories(category_id): Возвращает подкатегории категории.
+        invalidate(): Делает недействительным кэш дерева.
+    """
+
+    VERSION_NAME = "taxonomy"
+    TIMEOUT = 60 * 60 * 24
+
+    _local = {"version": None, "tree": [], "categories": {}, "subcategories": {}}
+
+    @classmethod
+    def _load(cls):
+        """
+        Возвращает актуальную копию дерева в памяти процесса, перечитывая ее при смене версии.
 
         Returns:
-            QuerySet: Список постов в указанной категории.
+            dict: Копия с ключами tree, categories и subcategories.
         """
+        version = get_version(cls.VERSION_NAME)
+        local = cls._local
+        if local["version"] == version:
+            return local
 
-        cache_key = f"poss_in_category_{category_id}"
-        posts = cache.get(cache_key)
+        key = f"taxonomy:tree:{version}"
+        tree = cache.get(key)
+        if tree is None:
+            tree = cls.build_tree()
+            cache.set(key, tree, cls.TIMEOUT)
+
+        local = {
+            "version": version,
+            "tree": tree,
+            "categories": {category["id"]: category for category in tree},
+            "subcategories": {
+                subcategory["id"]: subcategory for category in tree for subcategory in category["subcategories"]
+            },
+        }
+        cls._local = local
+        return local
+
+    @staticmethod
+    def build_tree():
+        """
+        Строит дерево категорий из базы данных двумя запросами.
+
+        Returns:
+            list: Список словарей категорий с ключами id, name, description и subcategories.
+        """
+        categories = Category.objects.order_by("name").prefetch_related(
+            Prefetch("subcategories", queryset=Subcategory.objects.order_by("name"))
+        )
+        return [
+            {
+                "id": category.id,
+                "name": category.name,
+                "description": category.description,
+                "subcategories": [
+                    {"id": subcategory.id, "name": subcategory.name, "category_id": category.id}
+                    for subcategory in category.subcategories.all()
+                ],
+            }
+            for category in categories
+        ]
+
+    @classmethod
+    def get_tree(cls):
+        """
+        Возвращает дерево категорий.
+
+        Returns:
+            list: Список словарей категорий с вложенными подкатегориями.
+        """
+        return cls._load()["tree"]
+
+    @classmethod
+    def get_category(cls, category_id):
+        """
+        Возвращает категорию по идентификатору.
+
+        Args:
+            category_id (int): Идентификатор категории.
+
+        Returns:
+            dict | None: Словарь категории или None, если категории нет.
+        """
+        return cls._load()["categories"].get(category_id)
+
+    @classmethod
+    def get_subcategory(cls, subcategory_id):
+        """
+        Возвращает подкатегорию по идентификатору.
+
+        Args:
+            subcategory_id (int): Идентификатор подкатегории.
+
+        Returns:
+            dict | None: Словарь подкатегории или None, если подкатегории нет.
+        """
+        return cls._load()["subcategories"].get(subcategory_id)
+
+    @classmethod
+    def get_subcategories(cls, category_id):
+        """
+        Возвращает подкатегории категории, отсортированные по названию.
+
+        Args:
+            category_id (int): Идентификатор категории.
+
+        Returns:
+            list: Список словарей подкатегорий (пустой, если категории нет).
+        """
+        category = cls.get_category(category_id)
+        return category["subcategories"] if category else []
+
+    @classmethod
+    def invalidate(cls):
+        """
+        Делает недействительным кэш дерева во всех процессах.
+
+        Returns:
+            None
+        """
+        bump_version(cls.VERSION_NAME)
+        cls._local = {"version": None, "tree": [], "categories": {}, "subcategories": {}}
+
+
+class PostSearchService:
+    """
+    Полнотекстовый поиск по опубликованным постам.
 
-        if posts is None:
-            posts = Post.objects.filter(category_id=category_id)
-            cache.set(cache_key, posts, 60 * 15)
+    В PostgreSQL используется поле search_vector, которое поддерживает триггер базы
+    данных (конфигурация "russian", веса A для заголовка и B для содержания),
+    и GIN-индекс по нему; результаты ранжируются ts_rank. В остальных СУБД
+    (например, SQLite в тестах) работает запасная реализация на Python с теми же
+    весами. В обоих случаях результаты разбиты на страницы по ключу (rank, id).
 
-        return posts
+    Атрибуты:
+        CONFIG (str): Конфигурация текстового поиска PostgreSQL.
+        PAGE_SIZE (int): Количество результатов на странице.
+        ORDERING (tuple): Порядок результатов: по убыванию ранга, затем идентификатора.
+        TITLE_WEIGHT (float): Вес совпадения в заголовке для запасной реализации.
+        CONTENT_WEIGHT (float): Вес совпадения в содержании для запасной реализации.
+
+    Методы:
+        search(query, cursor): Возвращает страницу результатов поиска.
+    """
+
+    CONFIG = "russian"
+    PAGE_SIZE = 20
+    ORDERING = ("-rank", "-id")
+    TITLE_WEIGHT = 1.0
+    CONTENT_WEIGHT = 0.4
+
+    @classmethod
+    def search(cls, query, cursor=None):
+        """
+        Возвращает страницу постов, соответствующих запросу, в порядке релевантности.
+
+        Args:
+            query (str): Поисковый запрос в синтаксисе websearch.
+            cursor (str | None): Курсор страницы; None - первая страница.
+
+        Returns:
+            KeysetPage: Страница словарей карточек с дополнительным полем rank.
+
+        Raises:
+            InvalidCursor: Если курсор поврежден.
+        """
+        queryset = Post.objects.filter(is_published=True)
+        if not query.strip():
+            return KeysetPage([])
+        if connection.vendor == "postgresql":
+            return cls._search_postgres(queryset, query, cursor)
+        return cls._search_python(queryset, query, cursor)
+
+    @classmethod
+    def _search_postgres(cls, queryset, query, cursor):
+        """
+        Ищет по search_vector с ранжированием ts_rank.
+
+        ts_rank возвращает real, а курсор хранит ранг как float Python (double):
+        значение real, прочитанное и переданное обратно, не равно исходному при
+        сравнении в SQL, и страницы повторяли бы или пропускали посты с равным
+        рангом. Поэтому ранг приводится к double precision в самом запросе,
+        и значение в курсоре совпадает с ним точно.
+        """
+        search_query = SearchQuery(query, config=cls.CONFIG, search_type="websearch")
+        queryset = queryset.filter(search_vector=search_query).annotate(
+            rank=Cast(SearchRank(F("search_vector"), search_query), FloatField())
+        )
+        cards = PostService.get_cards(queryset).values(*PostService.CARD_FIELDS, "rank")
+        return KeysetPaginator(cards, cls.PAGE_SIZE, ordering=cls.ORDERING).get_page(cursor)
+
+    @classmethod
+    def _search_python(cls, queryset, query, cursor):
+        """
+        Запасная реализация: отбирает кандидатов по вхождению слов и ранжирует их в Python.
+
+        Все слова запроса должны встречаться в заголовке или содержании. Ранг - сумма
+        взвешенных частот слов, нормированная по длине текста, как ts_rank с нормализацией 1.
+        """
+        terms = re.findall(r"\w+", query.lower())
+        if not terms:
+            return KeysetPage([])
+
+        for term in terms:
+            queryset = queryset.filter(Q(title__icontains=term) | Q(content__icontains=term))
+
+        rows = []
+        for card in PostService.get_cards(queryset).values(*PostService.CARD_FIELDS, "content"):
+            title = card["title"].lower()
+            content = card.pop("content").lower()
+            weight = sum(
+                cls.TITLE_WEIGHT * title.count(term) + cls.CONTENT_WEIGHT * content.count(term) for term in terms
+            )
+            card["rank"] = weight / (1 + math.log(1 + len(title.split()) + len(content.split())))
+            rows.append(card)
+
+        rows.sort(key=lambda card: (card["rank"], card["id"]), reverse=True)
+        return KeysetPaginator(queryset, cls.PAGE_SIZE, ordering=cls.ORDERING).get_page_from_rows(rows, cursor)
+
+
+class EntitlementService:
+    """
+    Проверка доступа пользователей к платным постам.
+
+    Платный пост доступен владельцу, модератору постов, пользователю с активной
+    подпиской (Subscription или флаг has_paid_subscription) и пользователю,
+    оплатившему именно этот пост (Payment со статусом "succeeded"). Бесплатные посты
+    доступны всем.
+
+    Сведения о доступе пользователя (срок подписки и оплаченные посты) загружаются
+    одним снимком, который хранится в объекте пользователя в пределах запроса и в кэше
+    не дольше TIMEOUT секунд и не дольше окончания подписки. Кэш сбрасывается вебхуком
+    платежей и сигналами при изменении подписки или пользователя.
+
+    Атрибуты:
+        TIMEOUT (int): Максимальное время хранения снимка в кэше, в секундах.
+        ATTRIBUTE (str): Атрибут пользователя, в котором снимок хранится в пределах запроса.
+
+    Методы:
+        can_read(user, post): Проверяет доступ пользователя к посту.
+        readable_post_ids(user, posts): Возвращает идентификаторы доступных постов из списка.
+        fingerprint(user): Возвращает отпечаток прав доступа пользователя для ETag.
+        invalidate(user_id): Сбрасывает кэш доступа пользователя.
+        invalidate_many(user_ids): Сбрасывает кэш доступа нескольких пользователей.
+    """
+
+    TIMEOUT = 60 * 10
+    ATTRIBUTE = "_entitlements_cache"
+
+    @staticmethod
+    def cache_key(user_id):
+        """
+        Возвращает ключ кэша снимка доступа пользователя.
+        """
+        return f"posts:entitlements:{user_id}"
+
+    @classmethod
+    def get_entitlements(cls, user):
+        """
+        Возвращает снимок доступа пользователя, загружая его не более одного раза за запрос.
+
+        Args:
+            user (User | AnonymousUser): Пользователь.
+
+        Returns:
+            dict | None: Словарь {"subscribed", "subscribed_until", "post_ids"} или None для анонимного пользователя.
+        """
+        if user is None or not user.is_authenticated:
+            return None
+
+        entitlements = getattr(user, cls.ATTRIBUTE, None)
+        if entitlements is None:
+            key = cls.cache_key(user.pk)
+            entitlements = cache.get(key)
+            if entitlements is None:
+                entitlements = cls._load(user)
+                timeout = cls.TIMEOUT
+                if entitlements["subscribed_until"] is not None:
+                    timeout = max(min(timeout, int(entitlements["subscribed_until"] - time.time())), 1)
+                cache.set(key, entitlements, timeout)
+            setattr(user, cls.ATTRIBUTE, entitlements)
+        return entitlements
+
+    @classmethod
+    def _load(cls, user):
+        """
+        Загружает из базы срок активной подписки и оплаченные посты пользователя.
+
+        Срок активной подписки (Subscription.end_date) ограничивает доступ и время хранения
+        снимка, даже если у пользователя установлен флаг has_paid_subscription: флаг
+        без подписки действует бессрочно.
+        """
+        end_date = Subscription.objects.filter(user=user, is_active=True).values_list("end_date", flat=True).first()
+        subscribed_until = end_date.timestamp() if end_date is not None else None
+        post_ids = Payment.objects.filter(user=user, status="succeeded", paid_post__isnull=False).values_list(
+            "paid_post_id", flat=True
+        )
+        return {
+            "subscribed": user.has_paid_subscription or subscribed_until is not None,
+            "subscribed_until": subscribed_until,
+            "post_ids": set(post_ids),
+        }
+
+    @classmethod
+    def has_subscription(cls, user):
+        """
+        Проверяет, действует ли подписка пользователя в данный момент.
+
+        Args:
+            user (User | AnonymousUser): Пользователь.
+
+        Returns:
+            bool: True, если подписка активна и не истекла.
+        """
+        entitlements = cls.get_entitlements(user)
+        if entitlements is None or not entitlements["subscribed"]:
+            return False
+        return entitlements["subscribed_until"] is None or entitlements["subscribed_until"] > time.time()
+
+    @classmethod
+    def readable_post_ids(cls, user, posts):
+        """
+        Возвращает идентификаторы постов из списка, которые пользователь может читать.
+
+        Args:
+            user (User | AnonymousUser): Пользователь.
+            posts (Iterable): Объекты Post или словари карточек с ключами id, is_paid и owner_id.
+
+        Returns:
+            set: Идентификаторы доступных постов.
+        """
+        posts = [
+            (
+                (post["id"], post["is_paid"], post.get("owner_id"))
+                if isinstance(post, dict)
+                else (post.id, post.is_paid, post.owner_id)
+            )
+            for post in posts
+        ]
+        free = {post_id for post_id, is_paid, _ in posts if not is_paid}
+        if len(free) == len(posts):
+            return free
+        if cls.has_subscription(user) or user.is_superuser or RoleResolver.is_post_moderator(user):
+            return {post_id for post_id, _, _ in posts}
+
+        entitlements = cls.get_entitlements(user)
+        if entitlements is None:
+            return free
+        return free | {
+            post_id for post_id, _, owner_id in posts if post_id in entitlements["post_ids"] or owner_id == user.pk
+        }
+
+    @classmethod
+    def fingerprint(cls, user):
+        """
+        Возвращает строку, которая меняется при изменении доступа пользователя к постам.
+
+        Используется в ETag страниц, содержимое которых зависит от доступа.
+
+        Args:
+            user (User | AnonymousUser): Пользователь.
+
+        Returns:
+            str: Отпечаток прав доступа пользователя.
+        """
+        entitlements = cls.get_entitlements(user)
+        if entitlements is None:
+            return "anonymous"
+        return ":".join(
+            [
+                str(user.pk),
+                str(int(cls.has_subscription(user))),
+                str(int(user.is_superuser or RoleResolver.is_post_moderator(user))),
+                ",".join(str(post_id) for post_id in sorted(entitlements["post_ids"])),
+            ]
+        )
+
+    @classmethod
+    def can_read(cls, user, post):
+        """
+        Проверяет, может ли пользователь читать пост.
+
+        Args:
+            user (User | AnonymousUser): Пользователь.
+            post (Post | dict): Пост или словарь карточки.
+
+        Returns:
+            bool: True, если доступ есть.
+        """
+        post_id = post["id"] if isinstance(post, dict) else post.id
+        return post_id in cls.readable_post_ids(user, [post])
+
+    @classmethod
+    def invalidate(cls, user_id):
+        """
+        Сбрасывает кэш доступа пользователя.
+
+        Args:
+            user_id (int): Идентификатор пользователя.
+        """
+        cache.delete(cls.cache_key(user_id))
+
+    @classmethod
+    def invalidate_many(cls, user_ids, batch_size=1000):
+        """
+        Сбрасывает кэш доступа нескольких пользователей пачками.
+
+        Args:
+            user_ids (Iterable[int]): Идентификаторы пользователей.
+            batch_size (int): Количество ключей в одной команде удаления.
+        """
+        user_ids = list(user_ids)
+        for start in range(0, len(user_ids), batch_size):
+            cache.delete_many([cls.cache_key(user_id) for user_id in user_ids[start : start + batch_size]])
+
+
+class SubscriptionService:
+    """
+    Выдача подписки после оплаты.
+
+    Методы:
+        extend(user_id, plan, period): Создает или продлевает подписку пользователя.
+    """
+
+    @staticmethod
+    def extend(user_id, plan, period):
+        """
+        Создает подписку или продлевает существующую и включает флаг подписки пользователя.
+
+        Продление выполняется одним UPDATE: новый срок отсчитывается от большего из
+        текущего окончания подписки и текущего момента, поэтому оплата до истечения
+        подписки добавляет период к оставшемуся сроку. Если подписки еще нет, она
+        создается; при одновременном создании повторяется UPDATE. Флаг
+        has_paid_subscription меняется UPDATE без сигналов, а кэш доступа пользователя
+        сбрасывается после фиксации транзакции. Метод должен вызываться в транзакции.
+
+        Args:
+            user_id (int): Идентификатор пользователя.
+            plan (str): Код тарифа; пустое значение оставляет текущий тариф.
+            period (timedelta): Длительность оплаченного периода.
+
+        Returns:
+            None
+        """
+        now = timezone.now()
+        changes = {"end_date": Greatest(F("end_date"), now) + period, "is_active": True}
+        if plan:
+            changes["plan"] = plan
+        if not Subscription.objects.filter(user_id=user_id).update(**changes):
+            try:
+                with transaction.atomic():
+                    Subscription.objects.create(user_id=user_id, plan=plan, end_date=now + period, is_active=True)
+            except IntegrityError:
+                Subscription.objects.filter(user_id=user_id).update(**changes)
+
+        User.objects.filter(pk=user_id, has_paid_subscription=False).update(has_paid_subscription=True)
+        transaction.on_commit(lambda: EntitlementService.invalidate(user_id))
+
+
+class StoredFileService:
+    """
+    Учет ссылок на файлы контентно-адресуемого хранилища.
+
+    Сигналы сохранения и удаления постов и пользователей вызывают replace() и release(),
+    поэтому счетчик меняется в той же транзакции, что и ссылающийся объект. Изменения
+    выполняются одним UPDATE с F-выражением без чтения счетчика. Файлы вне хранилища
+    (загруженные до его появления) не учитываются. Массовые операции (QuerySet.update,
+    bulk_create) сигналов не отправляют и счетчики не меняют.
+
+    Методы:
+        is_tracked(name): Проверяет, учитываются ли ссылки на файл.
+        acquire(name): Увеличивает счетчик ссылок на файл.
+        register(name): Учитывает файл без ссылок.
+        release(name): Уменьшает счетчик ссылок на файл.
+        replace(previous, current): Переносит ссылку объекта с одного файла на другой.
+    """
+
+    @staticmethod
+    def is_tracked(name):
+        """
+        Проверяет, что файл лежит в контентно-адресуемом хранилище.
+
+        Args:
+            name (str | None): Путь файла.
+
+        Returns:
+            bool: True, если ссылки на файл учитываются.
+        """
+        return bool(name) and (
+            name.startswith(f"{ContentAddressedStorage.prefix}/") or ContentAddressedStorage.is_private(name)
+        )
+
+    @classmethod
+    def acquire(cls, name):
+        """
+        Увеличивает счетчик ссылок на файл, создавая запись при первой ссылке.
+
+        Args:
+            name (str | None): Путь файла.
+
+        Returns:
+            None
+        """
+        if not cls.is_tracked(name):
+            return
+        increment = {"ref_count": F("ref_count") + 1, "updated_at": timezone.now()}
+        if StoredFile.objects.filter(name=name).update(**increment):
+            return
+        try:
+            with transaction.atomic():
+                StoredFile.objects.create(name=name, ref_count=1)
+        except IntegrityError:
+            StoredFile.objects.filter(name=name).update(**increment)
+
+    @classmethod
+    def register(cls, name):
+        """
+        Учитывает файл без ссылок, чтобы его удалила задача очистки.
+
+        Используется для файлов, которые записаны в хранилище, но не понадобились.
+        Если запись о файле уже есть, счетчик не меняется.
+
+        Args:
+            name (str | None): Путь файла.
+
+        Returns:
+            None
+        """
+        if cls.is_tracked(name):
+            StoredFile.objects.get_or_create(name=name)
+
+    @classmethod
+    def release(cls, name):
+        """
+        Уменьшает счетчик ссылок на файл; файл удаляется позже задачей очистки.
+
+        Args:
+            name (str | None): Путь файла.
+
+        Returns:
+            None
+        """
+        if not cls.is_tracked(name):
+            return
+        StoredFile.objects.filter(name=name, ref_count__gt=0).update(
+            ref_count=F("ref_count") - 1, updated_at=timezone.now()
+        )
+
+    @classmethod
+    def replace(cls, previous, current):
+        """
+        Переносит ссылку объекта с прежнего файла на новый.
+
+        Args:
+            previous (str | None): Прежний путь файла.
+            current (str | None): Новый путь файла.
+
+        Returns:
+            None
+        """
+        if (previous or "") == (current or ""):
+            return
+        cls.acquire(current)
+        cls.release(previous)
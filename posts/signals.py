@@ -0,0 +1,198 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from users.models import CustomUser
+
+from .models import Category, Post, PostImageVariant, Subcategory, Subscription
+from .services import EntitlementService, PostService, StoredFileService, TaxonomyService
+from .tasks import generate_post_image_variants
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Subcategory)
+@receiver(post_delete, sender=Subcategory)
+def invalidate_taxonomy(sender, **kwargs):
+    """
+    Сбрасывает кэш дерева категорий при изменении категории или подкатегории.
+
+    Args:
+        sender (Model): Модель, отправившая сигнал.
+        **kwargs: Параметры сигнала.
+
+    Returns:
+        None
+    """
+    TaxonomyService.invalidate()
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_state(sender, instance, **kwargs):
+    """
+    Запоминает прежние категорию и изображение поста перед сохранением.
+
+    Если пост переносится в другую категорию, кэш нужно сбросить и у старой категории;
+    если изменилось изображение, нужно построить его уменьшенные копии.
+
+    Args:
+        sender (Model): Модель, отправившая сигнал.
+        instance (Post): Сохраняемый пост.
+        **kwargs: Параметры сигнала.
+
+    Returns:
+        None
+    """
+    previous = (
+        Post.objects.filter(pk=instance.pk).values_list("category_id", "image").first()
+        if not instance._state.adding
+        else None
+    )
+    instance._previous_category_id, instance._previous_image = previous or (None, "")
+
+
+@receiver(pre_save, sender=Post)
+def place_post_image(sender, instance, **kwargs):
+    """
+    Переносит изображение поста в закрытую часть хранилища, если пост платный, и обратно.
+
+    Новые загрузки сразу попадают в нужную часть (см. post_image_upload_to), здесь
+    переносятся уже сохраненные файлы при смене платности поста. Ссылка поста
+    переходит на новый путь (count_post_image_references), публичная копия без
+    других ссылок удаляется задачей очистки, а варианты строятся заново
+    (schedule_image_variants), потому что путь изображения изменился.
+
+    Args:
+        sender (Model): Модель, отправившая сигнал.
+        instance (Post): Сохраняемый пост.
+        **kwargs: Параметры сигнала.
+
+    Returns:
+        None
+    """
+    image = instance.image
+    if image and image._committed and image.storage.exists(image.name):
+        image.name = image.storage.relocate(image.name, instance.is_paid)
+
+
+@receiver(post_save, sender=Post)
+def schedule_image_variants(sender, instance, **kwargs):
+    """
+    Ставит в очередь построение уменьшенных копий, если изображение поста изменилось.
+
+    Задача запускается после фиксации транзакции, чтобы увидеть сохраненный пост.
+
+    Args:
+        sender (Model): Модель, отправившая сигнал.
+        instance (Post): Сохраненный пост.
+        **kwargs: Параметры сигнала.
+
+    Returns:
+        None
+    """
+    if (instance.image.name or "") != (getattr(instance, "_previous_image", "") or ""):
+        post_id = instance.pk
+        transaction.on_commit(lambda: generate_post_image_variants.delay(post_id))
+
+
+@receiver(post_save, sender=Post)
+def count_post_image_references(sender, instance, **kwargs):
+    """
+    Переносит ссылку поста с прежнего файла изображения на новый (см. StoredFileService).
+
+    Args:
+        sender (Model): Модель, отправившая сигнал.
+        instance (Post): Сохраненный пост.
+        **kwargs: Параметры сигнала.
+
+    Returns:
+        None
+    """
+    StoredFileService.replace(getattr(instance, "_previous_image", ""), instance.image.name)
+
+
+@receiver(post_delete, sender=Post)
+def release_post_image(sender, instance, **kwargs):
+    """
+    Освобождает ссылку удаленного поста на файл изображения.
+
+    Args:
+        sender (Model): Модель, отправившая сигнал.
+        instance (Post): Удаленный пост.
+        **kwargs: Параметры сигнала.
+
+    Returns:
+        None
+    """
+    StoredFileService.release(instance.image.name)
+
+
+@receiver(post_delete, sender=PostImageVariant)
+def release_image_variant_file(sender, instance, **kwargs):
+    """
+    Освобождает ссылку удаленного варианта изображения на его файл.
+
+    Args:
+        sender (Model): Модель, отправившая сигнал.
+        instance (PostImageVariant): Удаленный вариант.
+        **kwargs: Параметры сигнала.
+
+    Returns:
+        None
+    """
+    StoredFileService.release(instance.file.name)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_caches(sender, instance, **kwargs):
+    """
+    Сбрасывает кэш страниц категорий, затронутых изменением поста, и меняет версию лент.
+
+    Args:
+        sender (Model): Модель, отправившая сигнал.
+        instance (Post): Сохраненный или удаленный пост.
+        **kwargs: Параметры сигнала.
+
+    Returns:
+        None
+    """
+    PostService.invalidate_post(instance.category_id, getattr(instance, "_previous_category_id", None))
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def invalidate_subscription_entitlements(sender, instance, **kwargs):
+    """
+    Сбрасывает кэш доступа пользователя при изменении его подписки.
+
+    Args:
+        sender (Model): Модель, отправившая сигнал.
+        instance (Subscription): Сохраненная или удаленная подписка.
+        **kwargs: Параметры сигнала.
+
+    Returns:
+        None
+    """
+    EntitlementService.invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_user_entitlements(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Сбрасывает кэш доступа пользователя при изменении флага has_paid_subscription.
+
+    Сохранения отдельных полей, не влияющих на доступ (например, last_login), кэш не сбрасывают.
+
+    Args:
+        sender (Model): Модель, отправившая сигнал.
+        instance (CustomUser): Сохраненный пользователь.
+        created (bool): Создан ли пользователь.
+        update_fields (frozenset | None): Сохраненные поля.
+        **kwargs: Параметры сигнала.
+
+    Returns:
+        None
+    """
+    if not created and (update_fields is None or "has_paid_subscription" in update_fields):
+        EntitlementService.invalidate(instance.pk)
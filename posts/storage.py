@@ -0,0 +1,150 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage, storages
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Файловое хранилище, в котором путь файла определяется его содержимым.
+
+    При сохранении загрузка читается по частям (content.chunks()) и одновременно
+    записывается во временный файл и хэшируется SHA-256, поэтому файл читается
+    один раз и целиком в память не загружается. Затем временный файл атомарно
+    переименовывается в "<prefix>/<aa>/<bb>/<хэш><расширение>". Если файл с таким
+    содержимым уже есть, временный файл удаляется и возвращается существующий путь:
+    одинаковые загрузки хранятся один раз, а содержимое по пути никогда не меняется,
+    что позволяет отдавать такие файлы с заголовком Cache-Control: immutable.
+
+    Файлы хранилища не удаляются при удалении записей: на один файл могут ссылаться
+    несколько объектов. Ссылки учитываются в модели StoredFile (см. StoredFileService),
+    а файлы без ссылок удаляет задача posts.tasks.delete_unreferenced_files.
+
+    Закрытые файлы (изображения платных постов) хранятся в отдельном каталоге
+    private_prefix, который nginx не отдает публично: к ним есть доступ только через
+    внутренний location /protected-media/ после проверки прав (см. posts.media).
+    Файл попадает в закрытую часть, если предложенное имя начинается с private_prefix;
+    между частями файл переносится методом relocate().
+
+    Атрибуты:
+        prefix (str): Каталог внутри MEDIA_ROOT, в котором хранятся публичные файлы.
+        private_prefix (str): Каталог внутри MEDIA_ROOT, в котором хранятся закрытые файлы.
+        temporary_dir (str): Каталог временных файлов внутри prefix.
+    """
+
+    prefix = "cas"
+    private_prefix = "private"
+    temporary_dir = "tmp"
+
+    @classmethod
+    def is_private(cls, name):
+        """
+        Проверяет, относится ли путь (или предложенное имя) к закрытой части хранилища.
+
+        Args:
+            name (str | None): Путь файла.
+
+        Returns:
+            bool: True для закрытого файла.
+        """
+        return bool(name) and name.startswith(f"{cls.private_prefix}/")
+
+    def get_available_name(self, name, max_length=None):
+        """
+        Возвращает имя без изменений: итоговый путь вычисляется по содержимому в _save().
+        """
+        return name
+
+    def content_name(self, digest, extension, private=False):
+        """
+        Возвращает путь файла по хэшу содержимого.
+
+        Args:
+            digest (str): Шестнадцатеричный SHA-256 содержимого.
+            extension (str): Расширение исходного имени, например ".jpg".
+            private (bool): Путь в закрытой части хранилища.
+
+        Returns:
+            str: Путь вида "cas/ab/cd/abcd...ef.jpg" (или "private/ab/cd/abcd...ef.jpg").
+        """
+        prefix = self.private_prefix if private else self.prefix
+        return f"{prefix}/{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+    def relocate(self, name, private):
+        """
+        Возвращает путь того же содержимого в закрытой или публичной части хранилища.
+
+        Если файл уже в нужной части, путь возвращается без изменений, иначе файл
+        копируется (прежний остается, пока на него есть ссылки, и удаляется задачей
+        очистки).
+
+        Args:
+            name (str): Путь файла.
+            private (bool): Нужна ли закрытая часть.
+
+        Returns:
+            str: Путь файла в нужной части хранилища.
+        """
+        if self.is_private(name) == private:
+            return name
+        proposed = os.path.basename(name)
+        if private:
+            proposed = f"{self.private_prefix}/{proposed}"
+        with self.open(name) as source:
+            return self.save(proposed, source)
+
+    def _save(self, name, content):
+        """
+        Записывает файл под путем, вычисленным по его содержимому.
+
+        Args:
+            name (str): Имя, предложенное полем (используются расширение и признак закрытой части).
+            content (File): Загружаемый файл.
+
+        Returns:
+            str: Путь файла в хранилище.
+        """
+        extension = os.path.splitext(name)[1].lower()
+        temporary_dir = self.path(f"{self.prefix}/{self.temporary_dir}")
+        os.makedirs(temporary_dir, exist_ok=True)
+
+        digest = hashlib.sha256()
+        fd, temporary_path = tempfile.mkstemp(dir=temporary_dir)
+        try:
+            with os.fdopen(fd, "wb") as temporary_file:
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    digest.update(chunk)
+                    temporary_file.write(chunk)
+
+            name = self.content_name(digest.hexdigest(), extension, private=self.is_private(name))
+            full_path = self.path(name)
+            if os.path.exists(full_path):
+                os.remove(temporary_path)
+                # Обновляем время изменения: файл снова используется, и очистка
+                # не должна удалить его до того, как новая ссылка будет учтена.
+                os.utime(full_path)
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                os.chmod(temporary_path, self.file_permissions_mode or 0o644)
+                os.replace(temporary_path, full_path)
+        except BaseException:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+        return name
+
+
+def content_addressed_storage():
+    """
+    Возвращает контентно-адресуемое хранилище из настройки STORAGES["content_addressed"].
+
+    Используется как вызываемое значение параметра storage полей FileField,
+    чтобы хранилище можно было заменить в настройках без новой миграции.
+
+    Returns:
+        Storage: Экземпляр хранилища.
+    """
+    return storages["content_addressed"]
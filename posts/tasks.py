@@ -0,0 +1,182 @@
+import datetime
+import logging
+
+from celery import shared_task
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from . import counters
+from .images import build_variants, variant_name
+from .models import Post, PostImageVariant, StoredFile, Subscription
+from .services import EntitlementService, PostService, StoredFileService
+from .storage import content_addressed_storage
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+@shared_task
+def expire_subscriptions():
+    """
+    Периодическая задача, которая деактивирует истекшие подписки.
+
+    Вместо обхода подписок по одной выполняет три запроса по индексу
+    (is_active, end_date): выборку идентификаторов пользователей с истекшими
+    подписками, UPDATE флага has_paid_subscription этих пользователей и UPDATE
+    самих подписок. Оба UPDATE выполняются в одной транзакции с одним и тем же
+    моментом времени, поэтому продленная за это время подписка не будет затронута.
+    После фиксации транзакции сбрасывается кэш доступа затронутых пользователей.
+
+    Returns:
+        int: Количество деактивированных подписок.
+    """
+    now = timezone.now()
+    expired = Subscription.objects.filter(is_active=True, end_date__lte=now)
+
+    with transaction.atomic():
+        user_ids = list(expired.values_list("user_id", flat=True))
+        if not user_ids:
+            return 0
+        User.objects.filter(pk__in=expired.values("user_id"), has_paid_subscription=True).update(
+            has_paid_subscription=False
+        )
+        count = expired.update(is_active=False)
+        transaction.on_commit(lambda: EntitlementService.invalidate_many(user_ids))
+
+    logger.info("Деактивировано истекших подписок: %s", count)
+    return count
+
+
+@shared_task
+def generate_post_image_variants(post_id):
+    """
+    Строит уменьшенные копии изображения поста в форматах WebP и JPEG.
+
+    Задача ставится в очередь после сохранения поста с новым изображением
+    (см. posts.signals). Ширины и форматы задаются настройками
+    POST_IMAGE_VARIANT_WIDTHS и POST_IMAGE_VARIANT_FORMATS. Файлы вариантов
+    записываются до транзакции; в транзакции прежние варианты поста заменяются
+    новыми, только если изображение поста за это время не сменилось (иначе
+    результат отбрасывается - новое изображение обработает своя задача).
+    Файлы вариантов хранятся по хэшу содержимого (в закрытой части хранилища,
+    если там лежит оригинал), ссылки на них учитываются StoredFileService,
+    а ненужные файлы удаляет delete_unreferenced_files.
+    После замены обновляется updated_at поста и сбрасывается кэш страниц его
+    категории и версия лент, чтобы карточки и ETag страниц перестроились со
+    srcset. Если изображение не удалось разобрать, вариантов нет и шаблоны
+    продолжают выводить оригинал.
+
+    Args:
+        post_id (int): Идентификатор поста.
+
+    Returns:
+        int: Количество созданных вариантов.
+    """
+    post = Post.objects.filter(pk=post_id).only("id", "image").first()
+    if post is None:
+        return 0
+
+    source = post.image.name or ""
+    variants = []
+    if source:
+        try:
+            with post.image.open("rb") as image_file:
+                variants = build_variants(
+                    image_file, settings.POST_IMAGE_VARIANT_WIDTHS, settings.POST_IMAGE_VARIANT_FORMATS
+                )
+        except (OSError, Image.DecompressionBombError):
+            logger.warning("Не удалось построить варианты изображения %s поста %s", source, post_id, exc_info=True)
+
+    storage = PostImageVariant._meta.get_field("file").storage
+    prefix = f"{storage.private_prefix}/" if storage.is_private(source) else ""
+    created = [
+        PostImageVariant(
+            post_id=post_id,
+            source=source,
+            format=variant.format,
+            width=variant.width,
+            height=variant.height,
+            file=storage.save(prefix + variant_name(variant), ContentFile(variant.content)),
+        )
+        for variant in variants
+    ]
+
+    with transaction.atomic():
+        locked = Post.objects.select_for_update().filter(pk=post_id)
+        current, category_id = locked.values_list("image", "category_id").first() or (None, None)
+        if (current or "") != source:
+            for variant in created:
+                StoredFileService.register(variant.file.name)
+            return 0
+        PostImageVariant.objects.filter(post_id=post_id).delete()
+        PostImageVariant.objects.bulk_create(created)
+        for variant in created:
+            StoredFileService.acquire(variant.file.name)
+        Post.objects.filter(pk=post_id).update(updated_at=timezone.now())
+        transaction.on_commit(lambda: PostService.invalidate_post(category_id))
+
+    logger.info("Построено вариантов изображения поста %s: %s", post_id, len(created))
+    return len(created)
+
+
+@shared_task
+def delete_unreferenced_files(grace_seconds=60 * 60, batch_size=1000):
+    """
+    Удаляет файлы контентно-адресуемого хранилища, на которые больше никто не ссылается.
+
+    Файл удаляется, если его счетчик ссылок равен нулю дольше льготного периода
+    и сам файл не обновлялся за это время (хранилище обновляет время изменения,
+    когда та же загрузка приходит повторно). Период защищает загрузки, которые уже
+    записаны в хранилище, но ссылка на них еще не учтена. Каждая запись удаляется
+    в своей транзакции под блокировкой строки, поэтому одновременно учтенная
+    новая ссылка не потеряется: UPDATE счетчика дождется блокировки и создаст
+    запись заново.
+
+    Args:
+        grace_seconds (int): Льготный период, в секундах.
+        batch_size (int): Максимальное количество файлов за один запуск.
+
+    Returns:
+        int: Количество удаленных файлов.
+    """
+    storage = content_addressed_storage()
+    cutoff = timezone.now() - datetime.timedelta(seconds=grace_seconds)
+    unreferenced = StoredFile.objects.filter(ref_count=0, updated_at__lt=cutoff)
+
+    deleted = 0
+    for name in list(unreferenced.values_list("name", flat=True)[:batch_size]):
+        with transaction.atomic():
+            stored_file = unreferenced.select_for_update().filter(name=name).first()
+            if stored_file is None:
+                continue
+            if storage.exists(name) and storage.get_modified_time(name) >= cutoff:
+                continue
+            stored_file.delete()
+            transaction.on_commit(lambda name=name: storage.delete(name))
+            deleted += 1
+
+    logger.info("Удалено файлов без ссылок: %s", deleted)
+    return deleted
+
+
+@shared_task
+def flush_post_views():
+    """
+    Периодическая задача, которая записывает накопленные просмотры постов в базу.
+
+    Все счетчики обновляются пакетными UPDATE ... FROM (VALUES ...) (см.
+    posts.counters.flush_post_views); одновременные запуски не теряют и не
+    удваивают просмотры.
+
+    Returns:
+        int: Количество записанных просмотров.
+    """
+    views = counters.flush_post_views()
+    if views:
+        logger.info("Записано просмотров постов: %s", views)
+    return views
@@ -1,5 +1,9 @@
 from django import template
 
+from posts.media import post_image_url
+from posts.services import PostCardCache
+from users.roles import RoleResolver
+
 register = template.Library()
 
 
@@ -10,6 +14,8 @@ def is_group(user, group_name):
 
     Этот фильтр можно использовать в шаблонах Django для проверки,
     является ли данный пользователь членом группы с заданным именем.
+    Группы пользователя загружаются RoleResolver один раз за запрос,
+    поэтому повторные проверки в шаблоне не обращаются к базе.
 
     Args:
         user (User): Объект пользователя, который необходимо проверить.
@@ -19,4 +25,87 @@ def is_group(user, group_name):
         bool: Возвращает True, если пользователь принадлежит к указанной группе;
               в противном случае возвращает False.
     """
-    return user.groups.filter(name=group_name).exists()
+    return RoleResolver.has_group(user, group_name)
+
+
+@register.simple_tag(takes_context=True)
+def cursor_url(context, cursor):
+    """
+    Формирует ссылку на страницу keyset-пагинации, сохраняя остальные параметры запроса.
+
+    Args:
+        context (Context): Контекст шаблона, содержащий объект запроса.
+        cursor (str): Курсор страницы, на которую ведет ссылка.
+
+    Returns:
+        str: Строка запроса вида "?cursor=...&q=...".
+    """
+    params = context["request"].GET.copy()
+    params["cursor"] = cursor
+    return f"?{params.urlencode()}"
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts, template_name, prefetch=""):
+    """
+    Рендерит карточки постов через кэш фрагментов (см. PostCardCache).
+
+    Фрагменты всех карточек страницы читаются из кэша одним запросом. Доступность
+    содержания берется из переменной контекста readable_post_ids, если она есть.
+
+    Пример:
+        {% post_cards posts "posts/cards/list_row.html" as cards %}
+        {% for post, card in cards %}{{ card }}{% endfor %}
+
+    Args:
+        context (Context): Контекст шаблона.
+        posts (Iterable[Post | dict]): Посты страницы.
+        template_name (str): Шаблон карточки.
+        prefetch (str): Связи через запятую, загружаемые только для карточек, которых нет в кэше.
+
+    Returns:
+        list[tuple]: Пары (пост, HTML карточки).
+    """
+    return PostCardCache.render(
+        posts, template_name, context.get("readable_post_ids"), prefetch=tuple(filter(None, prefetch.split(",")))
+    )
+
+
+@register.simple_tag
+def image_srcset(post, image_format):
+    """
+    Формирует значение атрибута srcset из вариантов изображения поста.
+
+    Учитываются только варианты текущего изображения (см. PostImageVariant.source);
+    пока задача их не построила, возвращается пустая строка и шаблон выводит оригинал.
+    Если варианты загружены через prefetch_related, запросов к базе нет.
+
+    Args:
+        post (Post): Пост с изображением.
+        image_format (str): Формат вариантов, например "webp" или "jpeg".
+
+    Returns:
+        str: Строка вида "/media/cas/...webp 320w, /media/cas/...webp 640w"; для платных
+            постов URL ведут на защищенную отдачу (см. posts.media.post_image_url).
+    """
+    if not post.image:
+        return ""
+    return ", ".join(
+        f"{post_image_url(post, variant)} {variant.width}w"
+        for variant in post.image_variants.all()
+        if variant.source == post.image.name and variant.format == image_format
+    )
+
+
+@register.simple_tag
+def post_image(post):
+    """
+    Возвращает URL изображения поста (для платных постов - защищенный).
+
+    Args:
+        post (Post): Пост с изображением.
+
+    Returns:
+        str | None: URL изображения.
+    """
+    return post_image_url(post)
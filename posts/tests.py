@@ -1,10 +1,41 @@
+import datetime
+import hashlib
+import importlib
+import io
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from unittest import skipIf
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
 from django.core.cache import cache
-from django.test import TestCase
-from django.urls import reverse
-
-from .models import Category, Post, Subcategory, Subscription
-from .services import PostService
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, close_old_connections, connection
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import clear_url_caches, reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+import config.urls
+from payments.models import Payment
+
+from .cache import get_version
+from .counters import LocalViewBuffer, RedisViewBuffer, flush_post_views, get_view_buffer, set_view_buffer
+from .forms import PostForm
+from .matchers import AhoCorasickMatcher, Match
+from .models import Category, Post, PostImageVariant, PostViewCount, StoredFile, Subcategory, Subscription
+from .paginators import InvalidCursor, KeysetPaginator
+from .services import EntitlementService, PostCardCache, PostSearchService, PostService, TaxonomyService
+from .tasks import delete_unreferenced_files, expire_subscriptions
+from .tasks import flush_post_views as flush_post_views_task
+from .tasks import generate_post_image_variants
+from .views import PostMediaView
 
 User = get_user_model()
 
@@ -148,11 +179,17 @@ class PostServiceTest(TestCase):
         """
         Настраивает тестовые данные перед выполнением каждого теста.
 
-        Создает тестовую категорию и несколько постов для использования в тестах.
+        Создает тестового пользователя, категорию и два опубликованных поста.
         """
-        self.category_id = 1
-        self.post1 = Post.objects.create(title="Post 1", content="Content 1", category_id=self.category_id)
-        self.post2 = Post.objects.create(title="Post 2", content="Content 2", category_id=self.category_id)
+        self.user = User.objects.create_user(phone_number="1234567890", password="testpass")
+        self.category = Category.objects.create(name="Test Category")
+        self.category_id = self.category.id
+        self.post1 = Post.objects.create(
+            title="Post 1", content="Content 1", category=self.category, owner=self.user, is_published=True
+        )
+        self.post2 = Post.objects.create(
+            title="Post 2", content="Content 2", category=self.category, owner=self.user, is_published=True
+        )
 
     def tearDown(self):
         """
@@ -166,33 +203,86 @@ class PostServiceTest(TestCase):
         """
         Тест для проверки кэширования результатов при получении постов по категории.
 
-        Проверяет, что метод get_posts_by_category возвращает правильное количество постов
-        и кэширует результаты.
+        Проверяет, что метод get_posts_by_category возвращает карточки постов
+        в порядке новизны, а повторный вызов не обращается к базе данных.
         """
-        posts = PostService.get_posts_by_category(self.category_id)
-        self.assertEqual(len(posts), 2)
-        self.assertEqual(posts[0].title, "Post 1")
-        self.assertEqual(posts[1].title, "Post 2")
+        page = PostService.get_posts_by_category(self.category_id)
+        self.assertEqual([card["title"] for card in page], ["Post 2", "Post 1"])
+        self.assertNotIn("content", page.object_list[0])
 
-        cached_posts = cache.get(f"poss_in_category_{self.category_id}")
-        self.assertIsNotNone(cached_posts)
-        self.assertEqual(len(cached_posts), 2)
+        with self.assertNumQueries(0):
+            cached_page = PostService.get_posts_by_category(self.category_id)
+        self.assertEqual([card["id"] for card in cached_page], [self.post2.id, self.post1.id])
 
-    def test_get_posts_by_category_returns_cached_results(self):
+    def test_get_posts_by_category_invalidated_on_publish(self):
         """
-        Тест для проверки возвращения кэшированных результатов.
+        Тест для проверки сброса кэша при публикации и удалении поста.
 
-        Проверяет, что метод get_posts_by_category возвращает кэшированные посты,
-        даже если посты были удалены из базы данных.
+        Проверяет, что опубликованный в категории пост сразу появляется в выдаче,
+        а удаленный - пропадает.
         """
         PostService.get_posts_by_category(self.category_id)
 
-        Post.objects.all().delete()
+        draft = Post.objects.create(title="Post 3", content="Content 3", category=self.category, owner=self.user)
+        self.assertEqual(len(PostService.get_posts_by_category(self.category_id)), 2)
+
+        draft.is_published = True
+        draft.save()
+        self.assertEqual(len(PostService.get_posts_by_category(self.category_id)), 3)
+
+        self.post1.delete()
+        self.assertEqual(len(PostService.get_posts_by_category(self.category_id)), 2)
+
+    def test_get_posts_by_category_moved_post(self):
+        """
+        Тест для проверки сброса кэша старой категории при переносе поста.
+        """
+        other = Category.objects.create(name="Other Category")
+        PostService.get_posts_by_category(self.category_id)
+        PostService.get_posts_by_category(other.id)
+
+        self.post1.category = other
+        self.post1.save()
+
+        self.assertEqual([card["id"] for card in PostService.get_posts_by_category(self.category_id)], [self.post2.id])
+        self.assertEqual([card["id"] for card in PostService.get_posts_by_category(other.id)], [self.post1.id])
+
+    def test_get_posts_by_category_serves_stale_while_recomputing(self):
+        """
+        Тест для проверки защиты от одновременного пересчета.
+
+        Если свежесть страницы истекла, а пересчет уже выполняет другой процесс
+        (блокировка занята), возвращается устаревшее значение без запросов к базе.
+        """
+        PostService.get_posts_by_category(self.category_id)
+        version = get_version(PostService.category_version_name(self.category_id))
+        key = f"posts:category:{self.category_id}:v{version}:first"
+        entry = cache.get(key)
+        entry["fresh_until"] = 0
+        cache.set(key, entry)
+        cache.add(f"{key}:lock", 1)
+
+        with self.assertNumQueries(0):
+            page = PostService.get_posts_by_category(self.category_id)
+        self.assertEqual(len(page), 2)
+
+        cache.delete(f"{key}:lock")
+        with self.assertNumQueries(1):
+            PostService.get_posts_by_category(self.category_id)
+        self.assertGreater(cache.get(key)["fresh_until"], 0)
+
+    def test_get_posts_by_category_caches_only_first_page(self):
+        """
+        Тест для проверки, что страницы по курсору не попадают в кэш.
 
-        posts = PostService.get_posts_by_category(self.category_id)
-        self.assertEqual(len(posts), 2)
-        self.assertEqual(posts[0].title, "Post 1")
-        self.assertEqual(posts[1].title, "Post 2")
+        Курсор приходит от клиента, поэтому произвольные курсоры не должны создавать записи в кэше.
+        """
+        cursor = KeysetPaginator(Post.objects.all(), 1).encode_cursor([timezone.now(), 10**9])
+        with patch("posts.services.get_or_recompute") as get_or_recompute:
+            PostService.get_posts_by_category(self.category_id, cursor)
+            with self.assertRaises(InvalidCursor):
+                PostService.get_posts_by_category(self.category_id, "garbage")
+        get_or_recompute.assert_not_called()
 
     def test_get_posts_by_category_with_non_existent_category(self):
         """
@@ -417,3 +507,1465 @@ class PostUpdateViewTest(TestCase):
         self.assertEqual(response.status_code, 302)
         self.post.refresh_from_db()
         self.assertEqual(self.post.title, "Updated Test Post")
+
+
+class KeysetPaginatorTest(TestCase):
+    """
+    Тесты для KeysetPaginator.
+
+    Проверяют, что переход по курсорам вперед и назад обходит ленту без пропусков
+    и повторов в стабильном порядке (created_at, id).
+    """
+
+    def setUp(self):
+        """
+        Создает пользователя, категорию и семь опубликованных постов.
+        """
+        self.user = User.objects.create_user(phone_number="1234567890", password="testpass")
+        self.category = Category.objects.create(name="Test Category")
+        for number in range(7):
+            Post.objects.create(
+                title=f"Post {number}", content="Content", category=self.category, owner=self.user, is_published=True
+            )
+        self.queryset = Post.objects.filter(is_published=True)
+        self.expected_ids = list(self.queryset.order_by("-created_at", "-id").values_list("id", flat=True))
+
+    def test_forward_and_backward_walk(self):
+        """
+        Проверяет обход ленты вперед до конца и обратно до начала.
+        """
+        paginator = KeysetPaginator(self.queryset, 3)
+
+        pages = [paginator.get_page()]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual([post.id for page in pages for post in page], self.expected_ids)
+        self.assertFalse(pages[0].has_previous())
+
+        previous = paginator.get_page(pages[-1].previous_cursor)
+        self.assertEqual([post.id for post in previous], self.expected_ids[3:6])
+        first = paginator.get_page(previous.previous_cursor)
+        self.assertEqual([post.id for post in first], self.expected_ids[:3])
+        self.assertFalse(first.has_previous())
+        self.assertTrue(first.has_next())
+
+    def test_values_queryset(self):
+        """
+        Проверяет, что пагинатор работает с запросами values().
+        """
+        paginator = KeysetPaginator(self.queryset.values("id", "title", "created_at"), 5)
+        first = paginator.get_page()
+        second = paginator.get_page(first.next_cursor)
+        self.assertEqual([row["id"] for row in list(first) + list(second)], self.expected_ids)
+
+    def test_invalid_cursor(self):
+        """
+        Проверяет, что поврежденный курсор отклоняется.
+        """
+        paginator = KeysetPaginator(self.queryset, 3)
+        for cursor in ("garbage", "eyJwIjpbMV19", "eyJwIjpbImJhZCIsMV19"):
+            with self.assertRaises(InvalidCursor):
+                paginator.get_page(cursor)
+
+    def test_cursor_with_non_scalar_values(self):
+        """
+        Проверяет, что курсор с None или вложенными значениями ключа отклоняется, а не роняет запрос.
+        """
+        paginator = KeysetPaginator(self.queryset, 3)
+        for position in ([1, 2], [None, 1], ["2024-01-01T00:00:00+00:00", None], [[1], 1], [{"a": 1}, 1]):
+            cursor = paginator.encode_cursor(position)
+            with self.assertRaises(InvalidCursor):
+                paginator.get_page(cursor)
+            self.assertEqual(self.client.get("/api/posts/feed/", {"cursor": cursor}).status_code, 400)
+            for url in ("/", "/posts/free/"):
+                self.assertEqual(self.client.get(url, {"cursor": cursor}).status_code, 404)
+
+
+class PostFeedViewTest(TestCase):
+    """
+    Тесты для JSON-ленты постов.
+    """
+
+    def setUp(self):
+        """
+        Создает пользователя, категорию и опубликованные посты.
+        """
+        self.user = User.objects.create_user(phone_number="1234567890", password="testpass")
+        self.category = Category.objects.create(name="Test Category")
+        for number in range(25):
+            Post.objects.create(
+                title=f"Post {number}",
+                content="Content",
+                category=self.category,
+                owner=self.user,
+                is_published=True,
+                is_paid=number % 2 == 0,
+            )
+        Post.objects.create(title="Draft", content="Content", category=self.category, owner=self.user)
+
+    def test_feed_pages(self):
+        """
+        Проверяет, что лента отдает страницы по курсору и не включает черновики.
+        """
+        first = self.client.get(reverse("post_feed")).json()
+        self.assertEqual(len(first["results"]), 20)
+        self.assertIsNone(first["previous"])
+
+        second = self.client.get(reverse("post_feed"), {"cursor": first["next"]}).json()
+        self.assertEqual(len(second["results"]), 5)
+        self.assertIsNone(second["next"])
+        titles = [post["title"] for post in first["results"] + second["results"]]
+        self.assertNotIn("Draft", titles)
+        self.assertEqual(len(set(titles)), 25)
+
+    def test_feed_filters_and_invalid_cursor(self):
+        """
+        Проверяет фильтр is_paid и ответ 400 на поврежденный курсор.
+        """
+        paid = self.client.get(reverse("post_feed"), {"is_paid": "true"}).json()
+        self.assertEqual(len(paid["results"]), 13)
+        self.assertTrue(all(post["is_paid"] for post in paid["results"]))
+
+        response = self.client.get(reverse("post_feed"), {"cursor": "garbage"})
+        self.assertEqual(response.status_code, 400)
+
+
+class PostListViewTest(TestCase):
+    """
+    Тесты для списка публикаций.
+
+    Проверяют проекцию полей карточки, постраничную выдачу и потоковый режим для сотрудников.
+    """
+
+    def setUp(self):
+        """
+        Создает пользователя, сотрудника, категорию и 60 постов.
+        """
+        self.user = User.objects.create_user(phone_number="1234567890", password="testpass")
+        self.staff = User.objects.create_user(phone_number="0987654321", password="testpass", is_staff=True)
+        self.category = Category.objects.create(name="Test Category")
+        Post.objects.bulk_create(
+            Post(title=f"Post {number}", content="Long content " * 100, category=self.category, owner=self.user)
+            for number in range(60)
+        )
+
+    def test_projected_page(self):
+        """
+        Проверяет, что страница содержит 50 карточек без поля content.
+        """
+        response = self.client.get(reverse("post_list"))
+        self.assertEqual(response.status_code, 200)
+        posts = response.context["posts"]
+        self.assertEqual(len(posts), 50)
+        self.assertNotIn("content", posts[0])
+        self.assertEqual(posts[0]["category_name"], "Test Category")
+        self.assertTrue(response.context["page_obj"].has_next())
+
+    def test_stream_all_for_staff(self):
+        """
+        Проверяет, что сотрудник получает потоковый список всех постов.
+        """
+        self.client.login(phone_number="0987654321", password="testpass")
+        response = self.client.get(reverse("post_list"), {"all": "1"})
+        self.assertTrue(response.streaming)
+        content = b"".join(response.streaming_content).decode()
+        self.assertEqual(content.count('class="list-group-item"'), 60)
+
+    def test_stream_all_ignored_for_regular_user(self):
+        """
+        Проверяет, что обычный пользователь получает постраничный список.
+        """
+        self.client.login(phone_number="1234567890", password="testpass")
+        response = self.client.get(reverse("post_list"), {"all": "1"})
+        self.assertFalse(response.streaming)
+        self.assertEqual(len(response.context["posts"]), 50)
+
+
+class TaxonomyServiceTest(TestCase):
+    """
+    Тесты для кэша дерева категорий.
+
+    Проверяют построение дерева, его сброс при изменении категорий и отсутствие
+    запросов к базе при прогретом кэше.
+    """
+
+    def setUp(self):
+        """
+        Создает две категории с подкатегориями.
+        """
+        self.books = Category.objects.create(name="Книги")
+        self.music = Category.objects.create(name="Музыка")
+        self.novels = Subcategory.objects.create(name="Романы", category=self.books)
+        Subcategory.objects.create(name="Джаз", category=self.music)
+
+    def tearDown(self):
+        """
+        Очищает кэш после выполнения каждого теста.
+        """
+        cache.clear()
+
+    def test_tree(self):
+        """
+        Проверяет структуру дерева и поиск по идентификаторам.
+        """
+        tree = TaxonomyService.get_tree()
+        self.assertEqual([category["name"] for category in tree], ["Книги", "Музыка"])
+        self.assertEqual(TaxonomyService.get_subcategory(self.novels.id)["category_id"], self.books.id)
+        self.assertEqual([item["name"] for item in TaxonomyService.get_subcategories(self.books.id)], ["Романы"])
+        self.assertIsNone(TaxonomyService.get_category(0))
+
+    def test_warm_cache_makes_no_queries(self):
+        """
+        Проверяет, что повторное чтение дерева не обращается к базе данных.
+        """
+        TaxonomyService.get_tree()
+        with self.assertNumQueries(0):
+            TaxonomyService.get_tree()
+            self.client.get(reverse("get_subcategories"), {"category": self.books.id})
+
+    def test_home_makes_no_taxonomy_queries(self):
+        """
+        Проверяет, что главная страница при прогретом кэше выполняет только запрос ленты.
+        """
+        self.client.get(reverse("home"))
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("home"))
+        self.assertContains(response, "Романы")
+
+    def test_invalidation_on_save_and_delete(self):
+        """
+        Проверяет, что сохранение и удаление подкатегории сбрасывают кэш.
+        """
+        TaxonomyService.get_tree()
+        Subcategory.objects.create(name="Поэзия", category=self.books)
+        self.assertEqual(len(TaxonomyService.get_subcategories(self.books.id)), 2)
+
+        self.music.delete()
+        self.assertEqual([category["name"] for category in TaxonomyService.get_tree()], ["Книги"])
+
+    def test_subcategories_endpoint(self):
+        """
+        Проверяет JSON-ответ со списком подкатегорий.
+        """
+        response = self.client.get(reverse("get_subcategories"), {"category": self.books.id})
+        self.assertEqual(response.json(), [{"id": self.novels.id, "name": "Романы"}])
+
+
+class PostSearchServiceTest(TestCase):
+    """
+    Тесты для полнотекстового поиска постов.
+    """
+
+    def setUp(self):
+        """
+        Создает пользователя, категорию и посты с разными совпадениями.
+        """
+        self.user = User.objects.create_user(phone_number="1234567890", password="testpass")
+        self.category = Category.objects.create(name="Test Category")
+        self.in_title = Post.objects.create(
+            title="Django", content="Заметки о фреймворке", category=self.category, owner=self.user, is_published=True
+        )
+        self.in_content = Post.objects.create(
+            title="Заметки",
+            content="Несколько слов о веб-разработке на django и python",
+            category=self.category,
+            owner=self.user,
+            is_published=True,
+        )
+        Post.objects.create(title="Django", content="Черновик", category=self.category, owner=self.user)
+
+    def test_title_match_ranks_higher(self):
+        """
+        Проверяет, что совпадение в заголовке ранжируется выше совпадения в тексте, а черновики не находятся.
+        """
+        page = PostSearchService.search("django")
+        self.assertEqual([post["id"] for post in page], [self.in_title.id, self.in_content.id])
+
+    def test_all_terms_required(self):
+        """
+        Проверяет, что находятся только посты, содержащие все слова запроса.
+        """
+        page = PostSearchService.search("django python")
+        self.assertEqual([post["id"] for post in page], [self.in_content.id])
+        self.assertEqual(len(PostSearchService.search("   ")), 0)
+
+    def test_pages_by_cursor(self):
+        """
+        Проверяет, что результаты разбиваются на страницы без повторов.
+        """
+        for number in range(PostSearchService.PAGE_SIZE + 5):
+            Post.objects.create(
+                title=f"Python {number}", content="Текст", category=self.category, owner=self.user, is_published=True
+            )
+
+        first = PostSearchService.search("python")
+        second = PostSearchService.search("python", first.next_cursor)
+        self.assertEqual(len(first), PostSearchService.PAGE_SIZE)
+        self.assertEqual(len(second), 6)
+        self.assertFalse(second.has_next())
+        ids = [post["id"] for post in list(first) + list(second)]
+        self.assertEqual(len(set(ids)), PostSearchService.PAGE_SIZE + 6)
+
+        back = PostSearchService.search("python", second.previous_cursor)
+        self.assertEqual([post["id"] for post in back], [post["id"] for post in first])
+
+    @skipIf(connection.vendor != "postgresql", "Ранжирование ts_rank есть только в PostgreSQL")
+    def test_postgres_pages_past_rank_ties(self):
+        """
+        Проверяет, что страницы поиска в PostgreSQL проходят группы постов с равным рангом
+        без повторов и пропусков в обе стороны.
+        """
+        for number in range(PostSearchService.PAGE_SIZE + 7):
+            Post.objects.create(
+                title="Python python" if number % 3 else "Python",
+                content=f"Текст номер {number}",
+                category=self.category,
+                owner=self.user,
+                is_published=True,
+            )
+
+        pages = [PostSearchService.search("python")]
+        while pages[-1].has_next():
+            pages.append(PostSearchService.search("python", pages[-1].next_cursor))
+        rows = [(post["rank"], post["id"]) for page in pages for post in page]
+        self.assertEqual(len({post_id for _, post_id in rows}), PostSearchService.PAGE_SIZE + 7)
+        self.assertEqual(rows, sorted(rows, reverse=True))
+
+        back = PostSearchService.search("python", pages[1].previous_cursor)
+        self.assertEqual([post["id"] for post in back], [post["id"] for post in pages[0]])
+
+    def test_search_views(self):
+        """
+        Проверяет страницу поиска и JSON API.
+        """
+        response = self.client.get(reverse("post_search"), {"q": "django"})
+        self.assertContains(response, self.in_content.title)
+
+        data = self.client.get(reverse("post_search_api"), {"q": "django"}).json()
+        self.assertEqual(len(data["results"]), 2)
+        self.assertIsNone(data["next"])
+
+        response = self.client.get(reverse("post_search_api"), {"q": "django", "cursor": "garbage"})
+        self.assertEqual(response.status_code, 400)
+
+
+class AhoCorasickMatcherTest(TestCase):
+    """
+    Тесты для поиска запрещенных слов автоматом Ахо–Корасик.
+    """
+
+    def test_finds_overlapping_matches(self):
+        """
+        Проверяет, что находятся все вхождения, включая пересекающиеся и вложенные.
+        """
+        matcher = AhoCorasickMatcher(["he", "she", "his", "hers"])
+        self.assertEqual(matcher.find_all("ushers"), [Match("she", 1), Match("he", 2), Match("hers", 2)])
+
+    def test_case_insensitive_positions(self):
+        """
+        Проверяет, что регистр не важен, а позиции указывают на исходный текст.
+        """
+        matcher = AhoCorasickMatcher(["Деньги", "казино"])
+        self.assertEqual(matcher.find_all("Легкие ДЕНЬГИ в Казино"), [Match("Деньги", 7), Match("казино", 16)])
+        self.assertEqual(matcher.find_all("Обычный текст"), [])
+
+
+class PostFormForbiddenWordsTest(TestCase):
+    """
+    Тесты для проверки запрещенных слов в PostForm.
+    """
+
+    def setUp(self):
+        """
+        Создает категорию для формы.
+        """
+        self.category = Category.objects.create(name="Test Category")
+
+    def test_rejection_reports_words_and_positions(self):
+        """
+        Проверяет, что ошибка перечисляет найденные слова и их позиции.
+        """
+        form = PostForm(
+            data={"title": "Обзор", "content": "Казино и снова казино, срочно", "category": self.category.id}
+        )
+        self.assertFalse(form.is_valid())
+        error = form.errors.as_data()["content"][0]
+        self.assertEqual(error.code, "forbidden_words")
+        self.assertEqual(error.params["words"], ["казино", "срочно"])
+        self.assertIn("«казино» (позиции: 0, 15)", form.errors["content"][0])
+
+    def test_clean_text_is_valid(self):
+        """
+        Проверяет, что текст без запрещенных слов проходит проверку.
+        """
+        form = PostForm(data={"title": "Обзор", "content": "Книга о путешествиях", "category": self.category.id})
+        self.assertTrue(form.is_valid(), form.errors)
+
+
+class PostDetailRolesTest(TestCase):
+    """
+    Тесты количества запросов страницы поста при проверке ролей.
+    """
+
+    def setUp(self):
+        """
+        Создает модератора постов и пост другого пользователя.
+        """
+        cache.clear()
+        self.moderator = User.objects.create_user(phone_number="1234567890", password="testpass")
+        group = Group.objects.create(name="Post moderator group")
+        group.permissions.add(Permission.objects.get(codename="can_delete_post"))
+        self.moderator.groups.add(group)
+        owner = User.objects.create_user(phone_number="0987654321", password="testpass")
+        category = Category.objects.create(name="Test Category")
+        self.post = Post.objects.create(title="Test Post", content="Content", category=category, owner=owner)
+        self.client.login(phone_number="1234567890", password="testpass")
+
+    @override_settings(ROLES_CACHE_TIMEOUT=0)
+    def test_roles_loaded_once_per_request(self):
+        """
+        Проверяет, что роли загружаются двумя запросами независимо от количества проверок.
+
+        Запросы: сессия, пользователь, пост, группы и разрешения пользователя,
+        подписка и оплаченные посты (для ETag, см. EntitlementService.fingerprint).
+        """
+        with self.assertNumQueries(7):
+            response = self.client.get(reverse("post_detail", args=[self.post.id]))
+        self.assertContains(response, "Отменить публикацию")
+
+    @override_settings(ROLES_CACHE_TIMEOUT=30)
+    def test_roles_cached_between_requests(self):
+        """
+        Проверяет, что при включенном общем кэше роли не загружаются повторно и сбрасываются при изменении групп.
+        """
+        self.client.get(reverse("post_detail", args=[self.post.id]))
+        with self.assertNumQueries(3):
+            self.client.get(reverse("post_detail", args=[self.post.id]))
+
+        self.moderator.groups.clear()
+        response = self.client.get(reverse("post_detail", args=[self.post.id]))
+        self.assertNotContains(response, "Отменить публикацию")
+
+    def test_moderator_can_unpublish_and_delete(self):
+        """
+        Проверяет, что модератор проходит проверки UnpublishPostView и PostDeleteView, а обычный пользователь нет.
+        """
+        self.post.is_published = True
+        self.post.save()
+        self.assertEqual(self.client.post(reverse("unpublish_post", args=[self.post.id])).status_code, 302)
+        self.post.refresh_from_db()
+        self.assertFalse(self.post.is_published)
+        self.assertEqual(self.client.get(reverse("post_delete", args=[self.post.id])).status_code, 200)
+
+        User.objects.create_user(phone_number="5555555555", password="testpass")
+        self.client.login(phone_number="5555555555", password="testpass")
+        self.assertEqual(self.client.post(reverse("unpublish_post", args=[self.post.id])).status_code, 403)
+        self.assertEqual(self.client.get(reverse("post_delete", args=[self.post.id])).status_code, 403)
+
+
+class EntitlementServiceTest(TestCase):
+    """
+    Тесты для проверки доступа к платным постам.
+    """
+
+    def setUp(self):
+        """
+        Создает читателя, автора, бесплатный и два платных поста.
+        """
+        cache.clear()
+        self.reader = User.objects.create_user(phone_number="1234567890", password="testpass")
+        self.author = User.objects.create_user(phone_number="0987654321", password="testpass")
+        category = Category.objects.create(name="Test Category")
+        self.free = Post.objects.create(
+            title="Free", content="Бесплатный текст", category=category, owner=self.author, is_published=True
+        )
+        self.paid = Post.objects.create(
+            title="Paid",
+            content="Платный текст",
+            category=category,
+            owner=self.author,
+            is_published=True,
+            is_paid=True,
+        )
+        self.other = Post.objects.create(
+            title="Other",
+            content="Другой текст",
+            category=category,
+            owner=self.author,
+            is_published=True,
+            is_paid=True,
+        )
+        self.posts = [self.free, self.paid, self.other]
+
+    def test_purchased_post_and_owner(self):
+        """
+        Проверяет доступ к оплаченному посту, к собственным постам и отсутствие доступа у анонимного пользователя.
+        """
+        Payment.objects.create(
+            user=self.reader,
+            paid_post=self.paid,
+            amount=100,
+            payment_method="stripe",
+            status="succeeded",
+            stripe_payment_intent_id="pi_paid",
+        )
+        # Подписка и оплаченные посты, затем группы и разрешения (проверка роли модератора).
+        with self.assertNumQueries(4):
+            readable = EntitlementService.readable_post_ids(self.reader, self.posts)
+        self.assertEqual(readable, {self.free.id, self.paid.id})
+
+        user = User.objects.get(pk=self.reader.pk)
+        with self.assertNumQueries(0):
+            EntitlementService.readable_post_ids(user, self.posts)
+
+        all_ids = {post.id for post in self.posts}
+        self.assertEqual(EntitlementService.readable_post_ids(self.author, self.posts), all_ids)
+        anonymous = self.client.get(reverse("post_feed")).wsgi_request.user
+        self.assertEqual(EntitlementService.readable_post_ids(anonymous, self.posts), {self.free.id})
+
+    def test_subscription_until_end_date(self):
+        """
+        Проверяет, что активная подписка открывает все посты, а истекшая - нет.
+        """
+        subscription = Subscription.objects.create(
+            user=self.reader, plan="basic", end_date=timezone.now() + datetime.timedelta(days=1), is_active=True
+        )
+        self.assertTrue(EntitlementService.can_read(self.reader, self.other))
+
+        subscription.end_date = timezone.now() - datetime.timedelta(minutes=1)
+        subscription.save()
+        self.assertFalse(EntitlementService.can_read(User.objects.get(pk=self.reader.pk), self.other))
+
+    def test_subscription_end_date_limits_paid_flag(self):
+        """
+        Проверяет, что при активной подписке флаг has_paid_subscription не продлевает доступ после end_date.
+        """
+        self.reader.has_paid_subscription = True
+        self.reader.save()
+        Subscription.objects.create(
+            user=self.reader, plan="basic", end_date=timezone.now() + datetime.timedelta(seconds=30), is_active=True
+        )
+        self.assertTrue(EntitlementService.can_read(self.reader, self.other))
+
+        with patch("posts.services.time.time", return_value=time.time() + 60):
+            self.assertFalse(EntitlementService.can_read(User.objects.get(pk=self.reader.pk), self.other))
+
+        cache.clear()
+        with patch("posts.services.cache.set") as cache_set:
+            EntitlementService.get_entitlements(User.objects.get(pk=self.reader.pk))
+        self.assertLessEqual(cache_set.call_args.args[2], 30)
+
+    @override_settings(STRIPE_ENDPOINT_SECRET="whsec_test")
+    def test_webhook_invalidates_cache(self):
+        """
+        Проверяет, что вебхук об успешной оплате сбрасывает кэш и пост становится доступен.
+        """
+        Payment.objects.create(
+            user=self.reader,
+            paid_post=self.other,
+            amount=100,
+            payment_method="stripe",
+            stripe_payment_intent_id="pi_other",
+        )
+        self.assertFalse(EntitlementService.can_read(self.reader, self.other))
+
+        event = {"id": "evt_other", "type": "payment_intent.succeeded", "data": {"object": {"id": "pi_other"}}}
+        with patch("payments.views.stripe.Webhook.construct_event", return_value=event), self.captureOnCommitCallbacks(
+            execute=True
+        ):
+            response = self.client.post(
+                reverse("payments:stripe_webhook"), data=b"{}", content_type="application/json"
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(EntitlementService.can_read(User.objects.get(pk=self.reader.pk), self.other))
+
+    def test_detail_hides_paid_content(self):
+        """
+        Проверяет, что страница платного поста показывает содержание только при наличии доступа.
+        """
+        self.client.login(phone_number="1234567890", password="testpass")
+        response = self.client.get(reverse("post_detail", args=[self.paid.id]))
+        self.assertNotContains(response, "Платный текст")
+
+        self.reader.has_paid_subscription = True
+        self.reader.save()
+        response = self.client.get(reverse("post_detail", args=[self.paid.id]))
+        self.assertContains(response, "Платный текст")
+
+
+class ExpireSubscriptionsTaskTest(TestCase):
+    """
+    Тесты для периодической задачи деактивации истекших подписок.
+    """
+
+    SUBSCRIPTIONS = 100_000
+
+    def setUp(self):
+        """
+        Создает 100 000 пользователей с подписками, каждая четвертая из которых истекла.
+        """
+        cache.clear()
+        User.objects.bulk_create(
+            [User(phone_number=f"7{number:010d}", has_paid_subscription=True) for number in range(self.SUBSCRIPTIONS)],
+            batch_size=5000,
+        )
+        now = timezone.now()
+        Subscription.objects.bulk_create(
+            [
+                Subscription(
+                    user_id=user_id,
+                    plan="basic",
+                    end_date=now + datetime.timedelta(days=-1 if index % 4 == 0 else 1),
+                    is_active=True,
+                )
+                for index, user_id in enumerate(User.objects.order_by("pk").values_list("pk", flat=True))
+            ],
+            batch_size=5000,
+        )
+
+    def test_expires_in_set_based_updates(self):
+        """
+        Проверяет, что истекшие подписки и флаги пользователей сбрасываются фиксированным числом запросов.
+        """
+        expired_user = Subscription.objects.filter(end_date__lte=timezone.now()).values_list("user_id", flat=True)[0]
+        # Доступ ограничен end_date и до запуска задачи, несмотря на флаг has_paid_subscription.
+        self.assertFalse(EntitlementService.has_subscription(User.objects.get(pk=expired_user)))
+
+        with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(5):
+            count = expire_subscriptions()
+
+        self.assertEqual(count, self.SUBSCRIPTIONS // 4)
+        self.assertEqual(Subscription.objects.filter(is_active=True).count(), self.SUBSCRIPTIONS * 3 // 4)
+        self.assertEqual(User.objects.filter(has_paid_subscription=True).count(), self.SUBSCRIPTIONS * 3 // 4)
+        self.assertFalse(EntitlementService.has_subscription(User.objects.get(pk=expired_user)))
+        self.assertEqual(expire_subscriptions(), 0)
+
+
+class PostViewSetTest(TestCase):
+    """
+    Тесты для API чтения постов.
+    """
+
+    def setUp(self):
+        """
+        Создает пользователя, две категории и опубликованные бесплатные и платные посты.
+        """
+        cache.clear()
+        self.user = User.objects.create_user(phone_number="1234567890", password="testpass")
+        author = User.objects.create_user(phone_number="0987654321", password="testpass")
+        self.books = Category.objects.create(name="Книги")
+        music = Category.objects.create(name="Музыка")
+        for number in range(12):
+            Post.objects.create(
+                title=f"Post {number}",
+                content="Текст",
+                category=self.books if number % 2 else music,
+                owner=author,
+                is_published=True,
+                is_paid=number % 3 == 0,
+            )
+        self.paid = Post.objects.filter(is_paid=True).first()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_is_compact_and_without_n_plus_one(self):
+        """
+        Проверяет страницу списка: размер страницы, отсутствие текста и постоянное число запросов.
+        """
+        self.client.get(reverse("post-api-list"))
+        self.client.force_authenticate(User.objects.get(pk=self.user.pk))
+        # Количество и страница; доступ к постам берется из кэша EntitlementService.
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("post-api-list"), {"page_size": 12})
+        data = response.json()
+        self.assertEqual(data["count"], 12)
+        self.assertNotIn("content", data["results"][0])
+        self.assertEqual(
+            {post["id"] for post in data["results"] if not post["can_read"]},
+            set(Post.objects.filter(is_paid=True).values_list("id", flat=True)),
+        )
+
+    def test_filters(self):
+        """
+        Проверяет фильтры по категории и платности.
+        """
+        data = self.client.get(reverse("post-api-list"), {"category": self.books.id, "page_size": 20}).json()
+        self.assertEqual(data["count"], 6)
+        data = self.client.get(reverse("post-api-list"), {"is_paid": "false", "page_size": 20}).json()
+        self.assertEqual(data["count"], 8)
+        self.assertTrue(all(not post["is_paid"] for post in data["results"]))
+
+    def test_detail_gates_paid_content(self):
+        """
+        Проверяет, что платный пост отдается полностью только пользователю с доступом.
+        """
+        free = Post.objects.filter(is_paid=False).first()
+        response = self.client.get(reverse("post-api-detail", args=[free.id]))
+        self.assertEqual(response.json()["content"], "Текст")
+
+        self.assertEqual(self.client.get(reverse("post-api-detail", args=[self.paid.id])).status_code, 403)
+        User.objects.filter(pk=self.user.pk).update(has_paid_subscription=True)
+        EntitlementService.invalidate(self.user.pk)
+        self.client.force_authenticate(User.objects.get(pk=self.user.pk))
+        response = self.client.get(reverse("post-api-detail", args=[self.paid.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["content"], "Текст")
+
+
+class ConditionalGetTest(TestCase):
+    """
+    Тесты условных GET-запросов страниц постов.
+    """
+
+    def setUp(self):
+        """
+        Создает пользователя и опубликованный пост, авторизует клиента.
+        """
+        cache.clear()
+        self.user = User.objects.create_user(phone_number="1234567890", password="testpass")
+        self.category = Category.objects.create(name="Test Category")
+        self.post = Post.objects.create(
+            title="Test Post", content="Content", category=self.category, owner=self.user, is_published=True
+        )
+        self.client.login(phone_number="1234567890", password="testpass")
+
+    def test_detail_not_modified_skips_rendering(self):
+        """
+        Проверяет, что совпадающий ETag дает 304 без тела и без рендеринга шаблона.
+        """
+        url = reverse("post_detail", args=[self.post.id])
+        response = self.client.get(url)
+        self.assertIn("Last-Modified", response)
+        etag = response["ETag"]
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response.templates, [])
+
+        self.post.title = "Changed"
+        self.post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Changed")
+
+    def test_feed_not_modified_until_post_changes(self):
+        """
+        Проверяет, что лента отвечает 304, пока не изменится какой-либо пост.
+        """
+        etag = self.client.get(reverse("home"))["ETag"]
+        response = self.client.get(reverse("home"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.templates, [])
+
+        Post.objects.create(title="New", content="Content", category=self.category, owner=self.user, is_published=True)
+        self.assertEqual(self.client.get(reverse("home"), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_changes_with_csrf_token_and_roles(self):
+        """
+        Проверяет, что после повторного входа (новый CSRF-токен) или смены ролей страницы с формами
+        не отдаются ответом 304 со старыми токеном и кнопками.
+        """
+        for url in (reverse("home"), reverse("post_detail", args=[self.post.id])):
+            etag = self.client.get(url)["ETag"]
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+            self.client.logout()
+            self.client.login(phone_number="1234567890", password="testpass")
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+
+            etag = response["ETag"]
+            group, _ = Group.objects.get_or_create(name="Post moderator group")
+            self.user.groups.add(group)
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+            self.user.groups.remove(group)
+
+
+class PostCardCacheTest(TestCase):
+    """
+    Тесты кэша фрагментов карточек постов.
+    """
+
+    template_name = "posts/cards/home_card.html"
+
+    def setUp(self):
+        """
+        Очищает кэш и создает опубликованные посты.
+        """
+        cache.clear()
+        self.user = User.objects.create_user(phone_number="1234567890", password="testpass")
+        self.category = Category.objects.create(name="Test Category")
+        self.posts = [
+            Post.objects.create(
+                title=f"Post {number}",
+                content=f"Content {number}",
+                category=self.category,
+                owner=self.user,
+                is_published=True,
+                is_paid=number == 0,
+            )
+            for number in range(3)
+        ]
+
+    def test_warm_page_reads_cache_once_without_rendering(self):
+        """
+        Проверяет, что прогретая страница читается одним get_many без рендеринга карточек.
+        """
+        cold = PostCardCache.render(self.posts, self.template_name)
+
+        with patch("posts.services.render_to_string") as render, patch(
+            "posts.services.cache.get_many", wraps=cache.get_many
+        ) as get_many:
+            warm = PostCardCache.render(self.posts, self.template_name)
+
+        render.assert_not_called()
+        get_many.assert_called_once()
+        self.assertEqual(warm, cold)
+        self.assertIn("Post 1", warm[1][1])
+
+    def test_updated_post_is_rendered_again(self):
+        """
+        Проверяет, что изменение поста меняет ключ и фрагмент рендерится заново.
+        """
+        PostCardCache.render(self.posts, self.template_name)
+        self.posts[0].title = "Changed"
+        self.posts[0].save()
+
+        cards = PostCardCache.render(self.posts, self.template_name)
+        self.assertIn("Changed", cards[0][1])
+
+    def test_locked_content_is_cached_separately(self):
+        """
+        Проверяет, что карточка без доступа к содержанию не попадает к читателю с доступом.
+        """
+        paid = self.posts[0]
+        locked = PostCardCache.render([paid], self.template_name, readable_post_ids=set())
+        readable = PostCardCache.render([paid], self.template_name, readable_post_ids={paid.id})
+
+        self.assertIn("Платная запись", locked[0][1])
+        self.assertNotIn("Content 0", locked[0][1])
+        self.assertIn("Content 0", readable[0][1])
+
+    def test_home_renders_cached_cards(self):
+        """
+        Проверяет, что главная страница выводит карточки из кэша фрагментов.
+        """
+        self.client.get(reverse("home"))
+        with patch("posts.services.render_to_string") as render:
+            response = self.client.get(reverse("home"))
+        render.assert_not_called()
+        self.assertContains(response, "Post 2")
+
+
+class PostImageVariantsTest(TestCase):
+    """
+    Тесты построения уменьшенных копий изображений постов.
+    """
+
+    def setUp(self):
+        """
+        Перенаправляет медиафайлы во временный каталог и создает пользователя и категорию.
+        """
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(
+            MEDIA_ROOT=media_root,
+            POST_IMAGE_VARIANT_WIDTHS=[320, 640, 1280],
+            POST_IMAGE_VARIANT_FORMATS=["webp", "jpeg"],
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user(phone_number="1234567890", password="testpass")
+        self.category = Category.objects.create(name="Test Category")
+
+    def make_image(self, name, width=1000, height=500):
+        """
+        Возвращает загружаемый PNG-файл заданного размера.
+        """
+        buffer = io.BytesIO()
+        Image.new("RGB", (width, height), (200, 30, 30)).save(buffer, "PNG")
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+    def create_post(self):
+        """
+        Создает пост с изображением, выполняя задачу построения вариантов после фиксации.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            return Post.objects.create(
+                title="Image Post",
+                content="Content",
+                category=self.category,
+                owner=self.user,
+                is_published=True,
+                image=self.make_image("cover.png"),
+            )
+
+    def test_variants_are_built_without_upscaling(self):
+        """
+        Проверяет ширины, высоты и форматы вариантов; оригинал не увеличивается.
+        """
+        post = self.create_post()
+        variants = list(post.image_variants.values_list("format", "width", "height"))
+        self.assertEqual(
+            variants,
+            [
+                ("jpeg", 320, 160),
+                ("jpeg", 640, 320),
+                ("jpeg", 1000, 500),
+                ("webp", 320, 160),
+                ("webp", 640, 320),
+                ("webp", 1000, 500),
+            ],
+        )
+        variant = post.image_variants.get(format="webp", width=320)
+        self.assertEqual(variant.source, post.image.name)
+        with variant.file.open("rb") as variant_file, Image.open(variant_file) as image:
+            self.assertEqual((image.format, image.size), ("WEBP", (320, 160)))
+
+    def test_templates_fall_back_to_original_until_variants_exist(self):
+        """
+        Проверяет, что без вариантов выводится оригинал, а после их построения - srcset.
+        """
+        post = Post.objects.create(
+            title="Image Post",
+            content="Content",
+            category=self.category,
+            owner=self.user,
+            is_published=True,
+            image=self.make_image("cover.png"),
+        )
+        response = self.client.get(reverse("home"))
+        self.assertContains(response, post.image.url)
+        self.assertNotContains(response, "srcset")
+
+        generate_post_image_variants(post.id)
+        response = self.client.get(reverse("home"))
+        webp = post.image_variants.get(format="webp", width=320)
+        jpeg = post.image_variants.get(format="jpeg", width=640)
+        self.assertContains(response, '<source type="image/webp"')
+        self.assertContains(response, f"{webp.file.url} 320w")
+        self.assertContains(response, f"{jpeg.file.url} 640w")
+
+    def test_variants_invalidate_category_pages(self):
+        """
+        Проверяет, что построение вариантов сбрасывает кэш страниц категории поста:
+        карточка получает новое updated_at, по которому перестраивается фрагмент со srcset.
+        """
+        post = Post.objects.create(
+            title="Image Post",
+            content="Content",
+            category=self.category,
+            owner=self.user,
+            is_published=True,
+            image=self.make_image("cover.png"),
+        )
+        cards = PostService.get_posts_by_category(self.category.id).object_list
+        self.assertEqual(cards[0]["updated_at"], post.updated_at)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            generate_post_image_variants(post.id)
+
+        post.refresh_from_db()
+        cards = PostService.get_posts_by_category(self.category.id).object_list
+        self.assertEqual(cards[0]["updated_at"], post.updated_at)
+
+    def test_new_image_replaces_variants_and_files(self):
+        """
+        Проверяет, что при смене изображения прежние варианты заменяются, а их файлы удаляет очистка.
+        """
+        post = self.create_post()
+        old_variant = post.image_variants.first()
+        storage = old_variant.file.storage
+        self.assertTrue(storage.exists(old_variant.file.name))
+
+        post.image = self.make_image("second.png", width=300, height=300)
+        with self.captureOnCommitCallbacks(execute=True):
+            post.save()
+
+        self.assertEqual(
+            list(post.image_variants.values_list("format", "width", "source")),
+            [("jpeg", 300, post.image.name), ("webp", 300, post.image.name)],
+        )
+        self.assertEqual(StoredFile.objects.get(name=old_variant.file.name).ref_count, 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            delete_unreferenced_files(grace_seconds=0)
+        self.assertFalse(storage.exists(old_variant.file.name))
+
+    def test_unreadable_image_keeps_original(self):
+        """
+        Проверяет, что поврежденное изображение не ломает задачу и варианты не создаются.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(
+                title="Broken",
+                content="Content",
+                category=self.category,
+                owner=self.user,
+                image=SimpleUploadedFile("broken.png", b"not an image", content_type="image/png"),
+            )
+        self.assertFalse(PostImageVariant.objects.filter(post=post).exists())
+
+
+class ContentAddressedStorageTest(TestCase):
+    """
+    Тесты хранения изображений по хэшу содержимого и учета ссылок на файлы.
+    """
+
+    content = b"same image bytes" * 10_000
+
+    def setUp(self):
+        """
+        Перенаправляет медиафайлы во временный каталог и создает пользователя и категорию.
+        """
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user(phone_number="1234567890", password="testpass")
+        self.category = Category.objects.create(name="Test Category")
+
+    def create_post(self, name="cover.png"):
+        """
+        Создает пост с изображением из одинаковых байтов.
+        """
+        return Post.objects.create(
+            title="Post",
+            content="Content",
+            category=self.category,
+            owner=self.user,
+            image=SimpleUploadedFile(name, self.content, content_type="image/png"),
+        )
+
+    def test_same_upload_is_stored_once(self):
+        """
+        Проверяет, что одинаковые загрузки получают один путь по SHA-256 и один счетчик.
+        """
+        first = self.create_post("first.PNG")
+        second = self.create_post("second.png")
+
+        digest = hashlib.sha256(self.content).hexdigest()
+        self.assertEqual(first.image.name, f"cas/{digest[:2]}/{digest[2:4]}/{digest}.png")
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(StoredFile.objects.get(name=first.image.name).ref_count, 2)
+        self.assertEqual(first.image.read(), self.content)
+
+    def test_file_is_deleted_only_without_references(self):
+        """
+        Проверяет, что файл удаляется очисткой только после удаления всех ссылок.
+        """
+        first = self.create_post()
+        second = self.create_post()
+        name = first.image.name
+        storage = first.image.storage
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+            self.assertEqual(delete_unreferenced_files(grace_seconds=0), 0)
+        self.assertTrue(storage.exists(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+            self.assertEqual(delete_unreferenced_files(grace_seconds=3600), 0)
+            self.assertEqual(delete_unreferenced_files(grace_seconds=0), 1)
+        self.assertFalse(storage.exists(name))
+        self.assertFalse(StoredFile.objects.filter(name=name).exists())
+
+    def test_avatar_shares_file_and_releases_on_change(self):
+        """
+        Проверяет, что аватар учитывается вместе с постами, а смена аватара освобождает ссылку.
+        """
+        post = self.create_post()
+        self.user.avatar = SimpleUploadedFile("avatar.png", self.content, content_type="image/png")
+        self.user.save()
+        self.assertEqual(self.user.avatar.name, post.image.name)
+        self.assertEqual(StoredFile.objects.get(name=post.image.name).ref_count, 2)
+
+        self.user.avatar = SimpleUploadedFile("other.png", b"other", content_type="image/png")
+        self.user.save()
+        self.assertEqual(StoredFile.objects.get(name=post.image.name).ref_count, 1)
+        self.assertEqual(StoredFile.objects.get(name=self.user.avatar.name).ref_count, 1)
+
+
+@override_settings(PROTECTED_MEDIA_X_ACCEL=True, PROTECTED_MEDIA_INTERNAL_URL="/protected-media/")
+class ProtectedMediaTest(TestCase):
+    """
+    Тесты защищенной отдачи изображений платных постов.
+    """
+
+    content = b"paid image bytes"
+
+    def setUp(self):
+        """
+        Создает автора, читателя и платный пост с изображением.
+        """
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.author = User.objects.create_user(phone_number="0987654321", password="testpass")
+        self.reader = User.objects.create_user(phone_number="1234567890", password="testpass")
+        self.category = Category.objects.create(name="Test Category")
+        self.post = Post.objects.create(
+            title="Paid",
+            content="Content",
+            category=self.category,
+            owner=self.author,
+            is_published=True,
+            is_paid=True,
+            image=SimpleUploadedFile("paid.png", self.content, content_type="image/png"),
+        )
+        self.url = reverse("post_image", args=[self.post.id])
+
+    def test_debug_media_serves_only_public_prefix(self):
+        """
+        Проверяет, что в режиме DEBUG Django отдает напрямую только каталог cas/, а не файлы платных постов.
+        """
+        free = Post.objects.create(
+            title="Free",
+            content="Content",
+            category=self.category,
+            owner=self.author,
+            is_published=True,
+            image=SimpleUploadedFile("free.png", b"free image bytes", content_type="image/png"),
+        )
+        self.addCleanup(clear_url_caches)
+        self.addCleanup(importlib.reload, config.urls)
+        with override_settings(DEBUG=True):
+            importlib.reload(config.urls)
+        clear_url_caches()
+
+        self.assertEqual(self.client.get(f"/media/{free.image.name}").status_code, 200)
+        self.assertEqual(self.client.get(f"/media/{self.post.image.name}").status_code, 404)
+
+    def test_paid_post_files_are_kept_out_of_public_prefix(self):
+        """
+        Проверяет, что файлы платного поста лежат вне публичного каталога cas/, а при смене
+        платности изображение переносится, ссылки переходят на новый путь и варианты строятся заново.
+        """
+        digest = hashlib.sha256(self.content).hexdigest()
+        private_name = f"private/{digest[:2]}/{digest[2:4]}/{digest}.png"
+        public_name = f"cas/{digest[:2]}/{digest[2:4]}/{digest}.png"
+        self.assertEqual(self.post.image.name, private_name)
+
+        self.post.is_paid = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.save()
+        self.assertEqual(self.post.image.name, public_name)
+        self.assertEqual(StoredFile.objects.get(name=private_name).ref_count, 0)
+        self.assertEqual(StoredFile.objects.get(name=public_name).ref_count, 1)
+
+        self.post.is_paid = True
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.save()
+            self.assertEqual(delete_unreferenced_files(grace_seconds=0), 1)
+        self.assertEqual(self.post.image.name, private_name)
+        self.assertFalse(self.post.image.storage.exists(public_name))
+
+        buffer = io.BytesIO()
+        Image.new("RGB", (800, 400), (10, 120, 30)).save(buffer, "PNG")
+        self.post.image = SimpleUploadedFile("cover.png", buffer.getvalue(), content_type="image/png")
+        with override_settings(POST_IMAGE_VARIANT_WIDTHS=[320], POST_IMAGE_VARIANT_FORMATS=["webp"]):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.post.save()
+        self.assertTrue(self.post.image.name.startswith("private/"))
+        self.assertEqual([variant.file.name.split("/")[0] for variant in self.post.image_variants.all()], ["private"])
+
+    def test_reader_without_access_is_forbidden(self):
+        """
+        Проверяет, что без оплаты файл не отдается.
+        """
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.client.login(phone_number="1234567890", password="testpass")
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+        self.assertNotIn("X-Accel-Redirect", response)
+
+    def test_entitled_reader_gets_x_accel_redirect(self):
+        """
+        Проверяет, что после оплаты ответ без тела передает отдачу файла nginx.
+        """
+        Payment.objects.create(
+            user=self.reader,
+            paid_post=self.post,
+            amount=100,
+            payment_method="stripe",
+            status="succeeded",
+            stripe_payment_intent_id="pi_paid",
+        )
+        view = PostMediaView.as_view()
+        request = RequestFactory().get(self.url)
+        request.user = User.objects.get(pk=self.reader.pk)
+        view(request, pk=self.post.id)
+
+        # Прогретый кэш доступа: только запрос пути файла и флагов поста.
+        request.user = User.objects.get(pk=self.reader.pk)
+        with self.assertNumQueries(1):
+            response = view(request, pk=self.post.id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected-media/{self.post.image.name}")
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertIn("private", response["Cache-Control"])
+        self.assertEqual(response.content, b"")
+
+    @override_settings(PROTECTED_MEDIA_X_ACCEL=False)
+    def test_owner_gets_file_without_nginx(self):
+        """
+        Проверяет отдачу файла самим Django, когда X-Accel-Redirect отключен.
+        """
+        self.client.login(phone_number="0987654321", password="testpass")
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.content)
+
+    def test_paid_file_path_is_not_exposed(self):
+        """
+        Проверяет, что разметка и API ссылаются на защищенную отдачу, а не на путь файла.
+        """
+        self.client.login(phone_number="0987654321", password="testpass")
+        response = self.client.get(reverse("home"))
+        self.assertContains(response, self.url)
+        self.assertNotContains(response, self.post.image.name)
+
+        feed = self.client.get(reverse("post_feed")).json()
+        self.assertEqual(feed["results"][0]["image"], self.url)
+
+    def test_missing_variant_is_not_found(self):
+        """
+        Проверяет, что вариант чужого поста или пост без изображения дают 404.
+        """
+        other = Post.objects.create(title="Other", content="Content", category=self.category, owner=self.author)
+        self.client.login(phone_number="0987654321", password="testpass")
+        self.assertEqual(self.client.get(reverse("post_image", args=[other.id])).status_code, 404)
+        self.assertEqual(self.client.get(reverse("post_image_variant", args=[self.post.id, 999])).status_code, 404)
+
+
+class PostViewCounterTest(TestCase):
+    """
+    Тесты буферизованного счетчика просмотров постов.
+    """
+
+    def setUp(self):
+        """
+        Создает автора с постами и подключает локальный буфер просмотров.
+        """
+        self.user = User.objects.create_user(phone_number="1234567890", password="testpass")
+        self.category = Category.objects.create(name="Test Category")
+        self.posts = [
+            Post.objects.create(title=f"Post {number}", content="Content", category=self.category, owner=self.user)
+            for number in range(3)
+        ]
+        self.buffer = LocalViewBuffer(flush_interval=3600)
+        previous = set_view_buffer(self.buffer)
+        self.addCleanup(set_view_buffer, previous)
+
+    def buffers(self):
+        """
+        Возвращает буферы для проверки: локальный и, если кэш - Redis, буфер в Redis.
+        """
+        buffers = [LocalViewBuffer(flush_interval=3600)]
+        set_view_buffer(None)
+        if isinstance(get_view_buffer(), RedisViewBuffer):
+            buffers.append(get_view_buffer())
+            self.drain(get_view_buffer())
+        set_view_buffer(self.buffer)
+        return buffers
+
+    def drain(self, buffer):
+        """
+        Забирает просмотры из буфера, выполняя отложенные после фиксации действия.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            with buffer.draining() as counts:
+                pass
+        return counts
+
+    def test_detail_view_counts_views_without_writes(self):
+        """
+        Проверяет, что показ страницы (и ответ 304) не пишет в базу, а сброс записывает просмотры,
+        не меняя updated_at, и автор видит новое значение.
+        """
+        post = self.posts[0]
+        url = reverse("post_detail", args=[post.id])
+        self.client.login(phone_number="1234567890", password="testpass")
+
+        with CaptureQueriesContext(connection) as queries:
+            etag = self.client.get(url)["ETag"]
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertFalse([query for query in queries if query["sql"].startswith("UPDATE")])
+
+        self.assertEqual(flush_post_views_task(), 2)
+        updated_at = post.updated_at
+        post.refresh_from_db()
+        self.assertEqual(post.views_count, 2)
+        self.assertEqual(post.updated_at, updated_at)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Просмотров: 2")
+
+    def test_flush_writes_all_posts_with_one_upsert(self):
+        """
+        Проверяет, что просмотры всех постов записываются одним INSERT ... ON CONFLICT DO UPDATE,
+        а просмотры удаленных постов отбрасываются.
+        """
+        for number, post in enumerate(self.posts, start=1):
+            for _ in range(number):
+                self.buffer.hit(post.id)
+        self.buffer.hit(999999)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(flush_post_views(), 7)
+
+        writes = [query["sql"] for query in queries if query["sql"].startswith(("INSERT", "UPDATE"))]
+        self.assertEqual(len(writes), 1)
+        self.assertIn("ON CONFLICT", writes[0])
+        views = PostViewCount.objects.order_by("post_id").values_list("views_count", flat=True)
+        self.assertEqual(list(views), [1, 2, 3])
+        self.assertEqual(flush_post_views(), 0)
+
+        for post in self.posts:
+            self.buffer.hit(post.id)
+        flush_post_views()
+        self.assertEqual(list(views.all()), [2, 3, 4])
+
+    def test_failed_flush_returns_views_to_buffer(self):
+        """
+        Проверяет, что при ошибке записи просмотры возвращаются в буфер и записываются следующим сбросом.
+        """
+        self.buffer.hit(self.posts[0].id)
+
+        with patch("posts.counters._add_views", side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                flush_post_views()
+
+        self.assertEqual(flush_post_views(), 1)
+        self.posts[0].refresh_from_db()
+        self.assertEqual(self.posts[0].views_count, 1)
+
+    def test_saving_post_keeps_flushed_views(self):
+        """
+        Проверяет, что сохранение загруженного ранее поста не затирает записанные просмотры.
+        """
+        post = Post.objects.get(pk=self.posts[0].pk)
+        for _ in range(5):
+            self.buffer.hit(post.id)
+        flush_post_views()
+
+        post.title = "Changed"
+        with CaptureQueriesContext(connection) as queries:
+            post.save()
+        self.assertFalse([query for query in queries if PostViewCount._meta.db_table in query["sql"]])
+
+        post.refresh_from_db()
+        self.assertEqual((post.title, post.views_count), ("Changed", 5))
+
+    def test_redis_buffer_keeps_views_until_commit(self):
+        """
+        Проверяет, что просмотры из Redis удаляются только после фиксации записи,
+        а после неудачного сброса записываются следующим сбросом.
+        """
+        set_view_buffer(None)
+        buffer = get_view_buffer()
+        if not isinstance(buffer, RedisViewBuffer):
+            self.skipTest("Кэш не Redis")
+        self.addCleanup(set_view_buffer, self.buffer)
+        self.drain(buffer)
+        post = self.posts[0]
+        buffer.hit(post.id)
+
+        with patch("posts.counters._add_views", side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                flush_post_views(buffer)
+        buffer.hit(post.id)
+        self.assertEqual(self.drain(buffer), {post.id: 1})
+        self.assertEqual(self.drain(buffer), {post.id: 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(flush_post_views(buffer), 0)
+
+    def test_concurrent_drains_lose_no_views(self):
+        """
+        Проверяет, что при одновременных просмотрах и сбросах каждый просмотр забирается ровно один раз.
+        """
+        post_ids = [post.id for post in self.posts]
+        for buffer in self.buffers():
+            drained = Counter()
+            drained_lock = threading.Lock()
+            stop = threading.Event()
+
+            def view(offset):
+                for number in range(300):
+                    buffer.hit(post_ids[(number + offset) % len(post_ids)])
+
+            def drain():
+                while not stop.is_set():
+                    with buffer.draining() as counts:
+                        with drained_lock:
+                            drained.update(counts)
+
+            viewers = [threading.Thread(target=view, args=(offset,)) for offset in range(6)]
+            drainers = [threading.Thread(target=drain) for _ in range(3)]
+            for thread in drainers + viewers:
+                thread.start()
+            for thread in viewers:
+                thread.join()
+            stop.set()
+            for thread in drainers:
+                thread.join()
+            drained.update(self.drain(buffer))
+
+            self.assertEqual(dict(drained), {post_id: 600 for post_id in post_ids}, type(buffer).__name__)
+
+
+@skipIf(connection.vendor == "sqlite", "SQLite блокирует таблицу целиком и не допускает параллельной записи")
+class ConcurrentPostViewFlushTest(TransactionTestCase):
+    """
+    Проверка одновременных сбросов просмотров в базу.
+    """
+
+    def setUp(self):
+        """
+        Создает посты.
+        """
+        user = User.objects.create_user(phone_number="1234567890", password="testpass")
+        category = Category.objects.create(name="Test Category")
+        self.post_ids = [
+            Post.objects.create(title=f"Post {number}", content="Content", category=category, owner=user).id
+            for number in range(20)
+        ]
+
+    def test_concurrent_flushes_add_up(self):
+        """
+        Проверяет, что одновременные сбросы с пересекающимися постами складываются без потерь.
+        """
+        barrier = threading.Barrier(4)
+        errors = []
+
+        def flush(offset):
+            buffer = LocalViewBuffer(flush_interval=3600)
+            for post_id in self.post_ids[offset:] + self.post_ids[:offset]:
+                buffer.hit(post_id)
+            try:
+                barrier.wait()
+                flush_post_views(buffer, batch_size=7)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                close_old_connections()
+
+        threads = [threading.Thread(target=flush, args=(offset,)) for offset in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(PostViewCount.objects.count(), len(self.post_ids))
+        self.assertEqual(set(PostViewCount.objects.values_list("views_count", flat=True)), {4})
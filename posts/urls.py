@@ -1,4 +1,5 @@
 from django.urls import path
+from rest_framework.routers import SimpleRouter
 
 from .views import (
     AddPostView,
@@ -8,11 +9,16 @@ from .views import (
     HomeView,
     PostDeleteView,
     PostDetailView,
+    PostFeedView,
     PostListView,
+    PostMediaView,
+    PostSearchApiView,
+    PostSearchView,
     PostsFreeListView,
     PostsInCategoryView,
     PostsPaidListView,
     PostUpdateView,
+    PostViewSet,
     PublishPostView,
     SubscriptionView,
     UnpublishPostView,
@@ -30,6 +36,11 @@ urlpatterns = [
     path("posts/free/", PostsFreeListView.as_view(), name="posts_free"),
     path("posts/paid/", PostsPaidListView.as_view(), name="posts_paid"),
     path("post/<int:pk>/", PostDetailView.as_view(), name="post_detail"),
+    path("post/<int:pk>/image/", PostMediaView.as_view(), name="post_image"),
+    path("post/<int:pk>/image/<int:variant_id>/", PostMediaView.as_view(), name="post_image_variant"),
+    path("api/posts/feed/", PostFeedView.as_view(), name="post_feed"),
+    path("search/", PostSearchView.as_view(), name="post_search"),
+    path("api/posts/search/", PostSearchApiView.as_view(), name="post_search_api"),
     path("add_post/", AddPostView.as_view(), name="add_post"),
     path("edit/<int:pk>/", PostUpdateView.as_view(), name="post_edit"),
     path("delete/<int:pk>/", PostDeleteView.as_view(), name="post_delete"),
@@ -45,3 +56,8 @@ urlpatterns = [
     path('subcategory/<int:subcategory_id>/', subcategory_detail_view, name='subcategory_detail'),
     path('post/<int:post_id>/update/', update_post_status, name='update_post_status'),
 ]
+
+router = SimpleRouter()
+router.register("api/posts", PostViewSet, basename="post-api")
+
+urlpatterns += router.urls
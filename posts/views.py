@@ -1,33 +1,205 @@
+import hashlib
+from itertools import islice
+
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin, UserPassesTestMixin
-from django.db import connection
-from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
+from django.middleware.csrf import get_token
 from django.urls import reverse_lazy
+from django.utils.cache import get_conditional_response
 from django.utils.decorators import method_decorator
+from django.utils.http import http_date, quote_etag
+from django.utils.safestring import mark_safe
 from django.views import View
 from django.views.decorators.cache import cache_page
 from django.views.decorators.csrf import csrf_exempt
 from django.views.generic import CreateView, DeleteView, DetailView, ListView, UpdateView
 from drf_yasg.utils import swagger_auto_schema
-from rest_framework import status
+from rest_framework import status, viewsets
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from users.models import CustomUser
+from users.roles import RoleResolver
 
+from .cache import get_version
+from .counters import record_post_view
 from .forms import PostForm, SubscriptionForm
-from .models import Category, Post, Subcategory, Subscription
-from .serializers import SubscriptionSerializer
-from .services import PostService
+from .media import post_image_url, protected_media_response
+from .models import Post, PostImageVariant, Subscription
+from .paginators import CustomPageNumberPagination, InvalidCursor, KeysetPaginator
+from .permissions import CanReadPost
+from .serializers import PostDetailSerializer, PostListSerializer, SubscriptionSerializer
+from .services import EntitlementService, PostSearchService, PostService, TaxonomyService
+
+
+class ConditionalGetMixin:
+    """
+    Примесь для условных GET-запросов (ETag / Last-Modified).
+
+    Валидаторы вычисляются до получения данных и рендеринга шаблона: если клиент
+    прислал совпадающий If-None-Match (или, без него, If-Modified-Since), сразу
+    возвращается ответ 304 без тела. По умолчанию ETag строится из версии лент постов,
+    версии дерева категорий, адреса запроса и прав доступа пользователя, поэтому
+    подходит для страниц со списками постов. В любой ETag входит и отпечаток сессии
+    (см. get_session_fingerprint): страницы выводят CSRF-токен в формах и кнопки
+    в зависимости от ролей пользователя.
+    """
+
+    def get(self, request, *args, **kwargs):
+        """
+        Отвечает 304, если содержимое страницы не изменилось, иначе рендерит ее и добавляет валидаторы.
+
+        Args:
+            request (HttpRequest): Объект запроса.
+
+        Returns:
+            HttpResponse: Ответ 304 или страница с заголовками ETag и Last-Modified.
+        """
+        etag = self.get_etag()
+        etag = quote_etag(etag) if etag else None
+        last_modified = self.get_last_modified()
+        last_modified = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            return response
+
+        response = super().get(request, *args, **kwargs)
+        if etag:
+            response.headers.setdefault("ETag", etag)
+        if last_modified:
+            response.headers.setdefault("Last-Modified", http_date(last_modified))
+        return response
+
+    def get_etag(self):
+        """
+        Возвращает ETag страницы со списком постов.
+
+        Returns:
+            str: Хэш версий данных, адреса запроса и прав доступа пользователя.
+        """
+        parts = [
+            type(self).__name__,
+            self.request.get_full_path(),
+            str(PostService.feed_version()),
+            str(get_version(TaxonomyService.VERSION_NAME)),
+            EntitlementService.fingerprint(self.request.user),
+            self.get_session_fingerprint(),
+        ]
+        return hashlib.md5("|".join(parts).encode()).hexdigest()
+
+    def get_session_fingerprint(self):
+        """
+        Возвращает строку, которая меняется вместе с данными сессии, попадающими в разметку.
+
+        Это секрет CSRF (после повторного входа он меняется, и сохраненная у клиента
+        страница содержала бы недействительный токен) и роли пользователя, от которых
+        зависят кнопки модерации. Берется секрет, а не токен из get_token(): токен
+        маскируется заново при каждом вызове.
+
+        Returns:
+            str: Отпечаток CSRF-секрета и ролей пользователя.
+        """
+        get_token(self.request)
+        user = self.request.user
+        roles = RoleResolver.get(user)
+        return ":".join(
+            [
+                self.request.META["CSRF_COOKIE"],
+                ",".join(sorted(roles.groups)),
+                ",".join(sorted(roles.permissions)),
+                str(int(roles.is_superuser)),
+                str(int(getattr(user, "is_staff", False))),
+            ]
+        )
+
+    def get_last_modified(self):
+        """
+        Возвращает время последнего изменения страницы или None, если оно неизвестно.
+        """
+        return None
+
+
+class KeysetPaginationMixin:
+    """
+    Примесь для ListView, заменяющая постраничную пагинацию (OFFSET) на keyset-пагинацию.
+
+    Страница выбирается по курсору из параметра запроса, поэтому глубокие страницы
+    стоят столько же, сколько первая. В контекст шаблона передается page_obj
+    с атрибутами next_cursor и previous_cursor, а также readable_post_ids -
+    идентификаторы постов страницы, доступных пользователю (см. EntitlementService).
+
+    Атрибуты:
+        paginate_by (int): Количество объектов на странице.
+        keyset_ordering (tuple): Поля сортировки; последнее поле должно быть уникальным.
+        cursor_query_param (str): Имя параметра запроса с курсором.
+    """
+
+    paginate_by = 20
+    keyset_ordering = ("-created_at", "-id")
+    cursor_query_param = "cursor"
+
+    def paginate_queryset(self, queryset, page_size):
+        """
+        Возвращает страницу по курсору из запроса.
+
+        Args:
+            queryset (QuerySet): Запрос, который необходимо разбить на страницы.
+            page_size (int): Количество объектов на странице.
+
+        Returns:
+            tuple: (paginator, page, object_list, is_paginated), как у MultipleObjectMixin.
+
+        Raises:
+            Http404: Если курсор поврежден.
+        """
+        try:
+            paginator, page = self.get_keyset_page(queryset, page_size, self.request.GET.get(self.cursor_query_param))
+        except InvalidCursor:
+            raise Http404("Некорректный курсор страницы.")
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get_keyset_page(self, queryset, page_size, cursor):
+        """
+        Возвращает пагинатор и страницу для курсора; переопределяется для кэшированных лент.
+
+        Args:
+            queryset (QuerySet): Запрос, который необходимо разбить на страницы.
+            page_size (int): Количество объектов на странице.
+            cursor (str | None): Курсор из запроса.
+
+        Returns:
+            tuple: (paginator, page).
+        """
+        paginator = KeysetPaginator(queryset, page_size, ordering=self.keyset_ordering)
+        return paginator, paginator.get_page(cursor)
+
+    def get_context_data(self, **kwargs):
+        """
+        Добавляет в контекст идентификаторы постов страницы, доступных пользователю.
+
+        Args:
+            **kwargs: Дополнительные параметры, переданные в метод.
+
+        Returns:
+            dict: Обновленный контекст.
+        """
+        context = super().get_context_data(**kwargs)
+        context["readable_post_ids"] = EntitlementService.readable_post_ids(self.request.user, context["object_list"])
+        return context
 
 
-class HomeView(ListView):
+class HomeView(ConditionalGetMixin, KeysetPaginationMixin, ListView):
     """
     View для отображения главной страницы с публикациями.
 
     Этот класс отображает список всех опубликованных постов,
-    поддерживает пагинацию и предоставляет список категорий для фильтрации.
+    поддерживает keyset-пагинацию и предоставляет список категорий для фильтрации.
 
     Атрибуты:
         model (Model): Модель, с которой работает данный view (Post).
@@ -54,6 +226,9 @@ class HomeView(ListView):
         """
         Добавляет дополнительные данные в контекст, передаваемый в шаблон.
 
+        Дерево категорий читается из TaxonomyService и при прогретом кэше
+        не требует запросов к базе данных.
+
         Args:
             **kwargs: Дополнительные параметры, переданные в метод.
 
@@ -61,19 +236,7 @@ class HomeView(ListView):
             dict: Обновленный контекст с добавленными категориями.
         """
         context = super().get_context_data(**kwargs)
-
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT category, subcategory FROM categories")
-            categories = cursor.fetchall()
-
-        category_dict = {}
-        for category, subcategory in categories:
-            if category not in category_dict:
-                category_dict[category] = []
-            category_dict[category].append(subcategory)
-
-        context["categories"] = category_dict
-
+        context["categories"] = TaxonomyService.get_tree()
         return context
 
 
@@ -121,12 +284,15 @@ class ContactView(View):
             return HttpResponse("Пожалуйста, заполните все поля!", status=400)
 
 
-class PostDetailView(LoginRequiredMixin, DetailView):
+class PostDetailView(LoginRequiredMixin, ConditionalGetMixin, DetailView):
     """
     View для отображения деталей поста.
 
     Этот класс отображает информацию о конкретном посте и требует,
-    чтобы пользователь был авторизован.
+    чтобы пользователь был авторизован. Поддерживает условные GET-запросы
+    по времени изменения поста (см. ConditionalGetMixin). Каждый показ
+    (и ответ 304) учитывается в буфере просмотров без записи в базу
+    (см. posts.counters), автор поста видит счетчик просмотров.
 
     Атрибуты:
         model (Model): Модель, с которой работает данный view (Post).
@@ -142,7 +308,108 @@ class PostDetailView(LoginRequiredMixin, DetailView):
 
     def get_queryset(self):
         post_pk = self.kwargs["pk"]
-        return Post.objects.filter(id=post_pk)
+        return Post.objects.filter(id=post_pk).select_related("view_count")
+
+    def get(self, request, *args, **kwargs):
+        """
+        Отдает страницу поста и учитывает просмотр.
+        """
+        response = super().get(request, *args, **kwargs)
+        record_post_view(self.get_object().pk)
+        return response
+
+    def get_object(self, queryset=None):
+        """
+        Возвращает пост, загружая его один раз за запрос (он нужен и для ETag, и для страницы).
+        """
+        if getattr(self, "post_object", None) is None:
+            self.post_object = super().get_object(queryset)
+        return self.post_object
+
+    def get_etag(self):
+        """
+        Возвращает ETag страницы поста.
+
+        Returns:
+            str: Хэш идентификатора и времени изменения поста, прав доступа пользователя
+                и отпечатка сессии; для автора - и счетчика просмотров, который меняется без updated_at.
+        """
+        post = self.get_object()
+        parts = [
+            str(post.pk),
+            post.updated_at.isoformat(),
+            EntitlementService.fingerprint(self.request.user),
+            self.get_session_fingerprint(),
+        ]
+        if post.owner_id == self.request.user.pk:
+            parts.append(str(post.views_count))
+        return hashlib.md5("|".join(parts).encode()).hexdigest()
+
+    def get_last_modified(self):
+        """
+        Возвращает время последнего изменения поста.
+
+        Клиенты, приславшие If-None-Match, проверяются по ETag, который учитывает и права доступа.
+        """
+        return self.get_object().updated_at
+
+    def get_context_data(self, **kwargs):
+        """
+        Добавляет в контекст признак доступа пользователя к содержанию поста.
+
+        Args:
+            **kwargs: Дополнительные параметры, переданные в метод.
+
+        Returns:
+            dict: Обновленный контекст с флагом can_read.
+        """
+        context = super().get_context_data(**kwargs)
+        context["can_read"] = EntitlementService.can_read(self.request.user, self.object)
+        return context
+
+
+class PostMediaView(View):
+    """
+    Отдача изображения поста (или его варианта) после проверки доступа.
+
+    Django выполняет только проверку: один запрос за путем файла и флагами поста
+    и проверку доступа через EntitlementService (с кэшем). Сам файл передает
+    nginx по заголовку X-Accel-Redirect (см. posts.media.protected_media_response
+    и location /protected-media/ в nginx/default.conf), поэтому прямые ссылки на
+    файлы платных постов в разметке не появляются.
+    """
+
+    def get(self, request, pk, variant_id=None):
+        """
+        Проверяет доступ к посту и возвращает ответ с X-Accel-Redirect.
+
+        Args:
+            request (HttpRequest): Объект запроса.
+            pk (int): Идентификатор поста.
+            variant_id (int | None): Идентификатор варианта изображения; None - оригинал.
+
+        Returns:
+            HttpResponse: Ответ, передающий отдачу файла nginx.
+
+        Raises:
+            Http404: Если поста, варианта или изображения нет.
+            PermissionDenied: Если пользователь не может читать пост.
+        """
+        if variant_id is None:
+            row = Post.objects.filter(pk=pk).values_list("id", "is_paid", "owner_id", "image").first()
+        else:
+            row = (
+                PostImageVariant.objects.filter(pk=variant_id, post_id=pk)
+                .values_list("post_id", "post__is_paid", "post__owner_id", "file")
+                .first()
+            )
+        if row is None or not row[3]:
+            raise Http404("Изображение не найдено.")
+
+        post_id, is_paid, owner_id, name = row
+        if not EntitlementService.can_read(request.user, {"id": post_id, "is_paid": is_paid, "owner_id": owner_id}):
+            raise PermissionDenied("Изображение доступно после оплаты записи или оформления подписки.")
+        return protected_media_response(name)
 
 
 class AddPostView(CreateView):
@@ -185,7 +452,7 @@ class AddPostView(CreateView):
         return super().form_valid(form)
 
 
-class PostListView(ListView):
+class PostListView(ConditionalGetMixin, KeysetPaginationMixin, ListView):
     """
     View для отображения списка всех постов.
 
@@ -193,25 +460,71 @@ class PostListView(ListView):
     Позволяет пользователям просматривать все посты, которые могут быть
     опубликованы или неопубликованы.
 
+    Из базы выбираются только поля карточки (см. PostService.get_cards),
+    список разбит на страницы фиксированного размера по курсору.
+    Сотрудники могут запросить весь список параметром ?all=1: он отдается
+    потоково, пачками из итератора, поэтому расход памяти не зависит от размера таблицы.
+
     Атрибуты:
         model (Model): Модель, с которой работает данный view (Post).
         template_name (str): Шаблон, используемый для отображения списка постов.
         context_object_name (str): Имя контекста, под которым будут доступны посты в шаблоне.
+        paginate_by (int): Количество постов на странице.
+        stream_chunk_size (int): Количество постов в одной пачке потокового ответа.
+        stream_marker (str): Маркер места вставки строк в странице-обертке потокового ответа.
     """
 
     model = Post
     form_class = PostForm
     template_name = "posts/post_list.html"
     context_object_name = "posts"
+    paginate_by = 50
+    stream_chunk_size = 500
+    stream_marker = "<!-- posts -->"
+
+    def get(self, request, *args, **kwargs):
+        """
+        Обрабатывает GET-запрос, переключаясь на потоковый ответ для полного списка.
+
+        Args:
+            request (HttpRequest): Объект запроса.
+
+        Returns:
+            HttpResponse | StreamingHttpResponse: Страница списка или потоковый полный список.
+        """
+        if request.GET.get("all") == "1" and request.user.is_staff:
+            return StreamingHttpResponse(self.stream_all(), content_type="text/html; charset=utf-8")
+        return super().get(request, *args, **kwargs)
 
     def get_queryset(self):
         """
-        Возвращает список всех постов.
+        Возвращает проекцию всех постов с полями карточки.
 
         Returns:
-            QuerySet: Список всех объектов модели Post.
+            QuerySet: Словари с полями карточек всех постов.
         """
-        return Post.objects.all()
+        return PostService.get_cards(Post.objects.all())
+
+    def stream_all(self):
+        """
+        Генерирует HTML полного списка постов по частям.
+
+        Страница-обертка рендерится один раз и разрезается по маркеру; строки списка
+        рендерятся пачками по мере чтения серверного курсора.
+
+        Yields:
+            str: Фрагменты HTML-страницы.
+        """
+        page = render_to_string(
+            "posts/post_list_all.html", {"stream_marker": mark_safe(self.stream_marker)}, request=self.request
+        )
+        head, tail = page.split(self.stream_marker, 1)
+        yield head
+
+        rows = self.get_queryset().order_by(*self.keyset_ordering).iterator(chunk_size=self.stream_chunk_size)
+        while chunk := list(islice(rows, self.stream_chunk_size)):
+            yield render_to_string("posts/post_list_rows.html", {"posts": chunk})
+        yield tail
 
 
 class PostUpdateView(LoginRequiredMixin, UpdateView):
@@ -241,10 +554,7 @@ class PostUpdateView(LoginRequiredMixin, UpdateView):
                          или состоит в группе модераторов постов; иначе False.
         """
         post = self.get_object()
-        return (
-            self.request.user == post.owner
-            or self.request.user.groups.filter(name="Post moderator group").exists()
-        )
+        return self.request.user == post.owner or RoleResolver.is_post_moderator(self.request.user)
 
 
 class PostDeleteView(LoginRequiredMixin, PermissionRequiredMixin, DeleteView):
@@ -288,9 +598,7 @@ class PostDeleteView(LoginRequiredMixin, PermissionRequiredMixin, DeleteView):
                     или состоит в группе модераторов постов; иначе False.
         """
         product = self.get_object()
-        return (
-            self.request.user == product.owner or self.request.user.groups.filter(name="Post moderator group").exists()
-        )
+        return self.request.user == product.owner or RoleResolver.is_post_moderator(self.request.user)
 
 
 class PublishPostView(View):
@@ -326,6 +634,7 @@ class UnpublishPostView(LoginRequiredMixin, UserPassesTestMixin, View):
     """
 
     permission_required = "posts.can_unpublish_post"
+    permission_denied_message = "У вас нет прав для отмены публикации этой записи."
 
     def post(self, request, pk):
         """
@@ -338,63 +647,72 @@ class UnpublishPostView(LoginRequiredMixin, UserPassesTestMixin, View):
         Returns:
             HttpResponse: Ответ с перенаправлением на список постов после успешной отмены публикации.
         """
-        post = get_object_or_404(Post, pk=pk)
-
-        if request.user == post.owner or request.user.groups.filter(name="Post moderator group").exists():
-            post.is_published = False
-            post.save()
-            return redirect("post_list")
-        else:
-            return HttpResponseForbidden("У вас нет прав для отмены публикации этой записи.")
+        post = self.post_object
+        post.is_published = False
+        post.save()
+        return redirect("post_list")
 
     def test_func(self):
         """
         Проверяет, имеет ли пользователь право отменить публикацию поста.
 
+        Пост сохраняется в self.post_object, чтобы метод post не загружал его повторно.
+
         Returns:
             bool: True, если пользователь является владельцем поста
                     или состоит в группе модераторов постов; иначе False.
         """
-        post = get_object_or_404(Post, pk=self.kwargs["pk"])
-        return (
-            self.request.user == post.owner
-            or self.request.user.groups.filter(name="Post moderator group").exists()
-        )
+        self.post_object = get_object_or_404(Post, pk=self.kwargs["pk"])
+        return self.request.user == self.post_object.owner or RoleResolver.is_post_moderator(self.request.user)
 
 
-class PostsInCategoryView(ListView):
+class PostsInCategoryView(ConditionalGetMixin, KeysetPaginationMixin, ListView):
     """
     View для отображения постов в указанной категории.
 
     Этот класс предоставляет API для получения списка всех публикаций,
     относящихся к заданной категории.
+    Список разбит на страницы по курсору (см. KeysetPaginationMixin),
+    страницы берутся из кэша PostService.
 
     Атрибуты:
         model (Model): Модель, с которой работает данный view (Post).
         template_name (str): Шаблон, используемый для отображения постов.
         context_object_name (str): Имя контекста, под которым будут доступны посты в шаблоне.
+        paginate_by (int): Количество постов на странице.
     """
 
     model = Post
-    template_name = "posts/poss_in_category.html"
+    template_name = "posts/posts_in_category.html"
     context_object_name = "posts"
+    paginate_by = PostService.CATEGORY_PAGE_SIZE
 
     def get_queryset(self):
         """
-        Возвращает список всех записей в указанной категории.
+        Возвращает список опубликованных записей в указанной категории.
 
-        Использует PostService для получения постов из кэшированной категории.
+        Returns:
+            QuerySet: Словари карточек постов, относящихся к указанной категории.
+        """
+        return PostService.category_queryset(self.kwargs["pk"])
+
+    def get_keyset_page(self, queryset, page_size, cursor):
+        """
+        Возвращает страницу из кэша постов категории (PostService.get_posts_by_category).
+
+        Args:
+            queryset (QuerySet): Запрос постов категории (используется только при пересчете кэша).
+            page_size (int): Количество объектов на странице.
+            cursor (str | None): Курсор из запроса.
 
         Returns:
-            QuerySet: Список объектов модели Post, относящихся к указанной категории.
+            tuple: (paginator, page); пагинатор не создается.
         """
-        """Возвращает список всех записей в указанной категории."""
-        category_pk = self.kwargs["pk"]
-        return PostService.get_posts_by_category(category_pk)
+        return None, PostService.get_posts_by_category(self.kwargs["pk"], cursor)
 
     def get_context_data(self, **kwargs):
         """
-         Добавляет объект категории в контекст.
+        Добавляет категорию в контекст.
 
         Args:
             **kwargs: Дополнительные параметры, переданные в метод.
@@ -402,19 +720,33 @@ class PostsInCategoryView(ListView):
         Returns:
             dict: Обновленный контекст с добавленной категорией.
         """
-        """Добавляет объект категории в контекст."""
         context = super().get_context_data(**kwargs)
-        category_pk = self.kwargs["pk"]
-        context["category"] = get_object_or_404(Category, pk=category_pk)
+        context["category"] = self.get_category()
         return context
 
+    def get_category(self):
+        """
+        Возвращает категорию из кэша дерева категорий.
 
-class PostsFreeListView(ListView):
+        Returns:
+            dict: Словарь категории.
+
+        Raises:
+            Http404: Если категории не существует.
+        """
+        category = TaxonomyService.get_category(self.kwargs["pk"])
+        if category is None:
+            raise Http404("Категория не найдена.")
+        return category
+
+
+class PostsFreeListView(ConditionalGetMixin, KeysetPaginationMixin, ListView):
     """
     View для отображения бесплатных постов.
 
     Этот класс предоставляет API для получения списка всех бесплатных постов
     (постов, которые не требуют оплаты для доступа).
+    Список разбит на страницы по курсору (см. KeysetPaginationMixin).
 
     Атрибуты:
         model (Model): Модель, с которой работает данный view (Post).
@@ -436,12 +768,13 @@ class PostsFreeListView(ListView):
         return Post.objects.filter(is_paid=False)
 
 
-class PostsPaidListView(LoginRequiredMixin, ListView):
+class PostsPaidListView(LoginRequiredMixin, ConditionalGetMixin, KeysetPaginationMixin, ListView):
     """
     View для отображения платных постов.
 
     Этот класс предоставляет API для получения списка всех платных постов
     (постов, которые требуют оплаты для доступа).
+    Список разбит на страницы по курсору (см. KeysetPaginationMixin).
 
     Атрибуты:
         model (Model): Модель, с которой работает данный view (Post).
@@ -463,31 +796,242 @@ class PostsPaidListView(LoginRequiredMixin, ListView):
         return Post.objects.filter(is_paid=True)
 
 
+class PostFeedView(View):
+    """
+    JSON-лента опубликованных постов с keyset-пагинацией.
+
+    Использует тот же пагинатор, что и HTML-ленты: клиент получает страницу постов
+    и непрозрачные курсоры next/previous для перехода к соседним страницам.
+    Поддерживает фильтры category и is_paid. Каждая карточка содержит флаг can_read
+    (доступ текущего пользователя к посту, см. EntitlementService).
+
+    Атрибуты:
+        page_size (int): Количество постов на странице.
+    """
+
+    page_size = 20
+
+    def get(self, request):
+        """
+        Обрабатывает GET-запрос ленты.
+
+        Args:
+            request (HttpRequest): Объект запроса с необязательными параметрами cursor, category, is_paid.
+
+        Returns:
+            JsonResponse: Страница постов и курсоры соседних страниц.
+        """
+        queryset = Post.objects.filter(is_published=True)
+        category_id = request.GET.get("category")
+        if category_id and category_id.isdigit():
+            queryset = queryset.filter(category_id=category_id)
+        is_paid = request.GET.get("is_paid")
+        if is_paid in ("true", "false"):
+            queryset = queryset.filter(is_paid=is_paid == "true")
+
+        paginator = KeysetPaginator(PostService.get_cards(queryset), self.page_size)
+        try:
+            page = paginator.get_page(request.GET.get("cursor"))
+        except InvalidCursor:
+            return JsonResponse({"error": "Некорректный курсор страницы."}, status=400)
+
+        readable = EntitlementService.readable_post_ids(request.user, page.object_list)
+        for card in page.object_list:
+            card["can_read"] = card["id"] in readable
+            card["image"] = post_image_url(card)
+        return JsonResponse(
+            {
+                "results": page.object_list,
+                "next": page.next_cursor,
+                "previous": page.previous_cursor,
+            }
+        )
+
+
+class PostSearchView(ConditionalGetMixin, KeysetPaginationMixin, ListView):
+    """
+    View для страницы полнотекстового поиска по опубликованным постам.
+
+    Результаты ранжируются по релевантности и разбиты на страницы по курсору
+    (см. PostSearchService).
+
+    Атрибуты:
+        template_name (str): Шаблон страницы поиска.
+        context_object_name (str): Имя контекста, под которым будут доступны результаты в шаблоне.
+        paginate_by (int): Количество результатов на странице.
+    """
+
+    template_name = "posts/search.html"
+    context_object_name = "posts"
+    paginate_by = PostSearchService.PAGE_SIZE
+
+    def get_queryset(self):
+        """
+        Возвращает пустой список: результаты формирует PostSearchService в get_keyset_page.
+        """
+        return []
+
+    def get_keyset_page(self, queryset, page_size, cursor):
+        """
+        Возвращает страницу результатов поиска по параметру q.
+
+        Returns:
+            tuple: (paginator, page); пагинатор не создается.
+        """
+        return None, PostSearchService.search(self.request.GET.get("q", ""), cursor)
+
+    def get_context_data(self, **kwargs):
+        """
+        Добавляет поисковый запрос в контекст.
+
+        Args:
+            **kwargs: Дополнительные параметры, переданные в метод.
+
+        Returns:
+            dict: Обновленный контекст с поисковым запросом.
+        """
+        context = super().get_context_data(**kwargs)
+        context["query"] = self.request.GET.get("q", "")
+        return context
+
+
+class PostSearchApiView(View):
+    """
+    JSON API полнотекстового поиска по опубликованным постам.
+
+    Возвращает страницу результатов, отсортированных по релевантности,
+    и непрозрачные курсоры соседних страниц.
+    """
+
+    def get(self, request):
+        """
+        Обрабатывает GET-запрос поиска.
+
+        Args:
+            request (HttpRequest): Объект запроса с параметрами q и cursor.
+
+        Returns:
+            JsonResponse: Страница результатов и курсоры соседних страниц.
+        """
+        try:
+            page = PostSearchService.search(request.GET.get("q", ""), request.GET.get("cursor"))
+        except InvalidCursor:
+            return JsonResponse({"error": "Некорректный курсор страницы."}, status=400)
+
+        readable = EntitlementService.readable_post_ids(request.user, page.object_list)
+        for card in page.object_list:
+            card["can_read"] = card["id"] in readable
+            card["image"] = post_image_url(card)
+        return JsonResponse(
+            {
+                "results": page.object_list,
+                "next": page.next_cursor,
+                "previous": page.previous_cursor,
+            }
+        )
+
+
+class PostViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    API для чтения опубликованных постов.
+
+    Список отдается страницами (CustomPageNumberPagination) в облегченном виде
+    без текста поста, детальный просмотр - полностью. Платный пост доступен
+    для детального просмотра только пользователям с доступом (CanReadPost),
+    в списке доступность показывает поле can_read.
+
+    Параметры запроса списка:
+        category (int): Идентификатор категории.
+        subcategory (int): Идентификатор подкатегории.
+        is_paid (str): "true" - только платные посты, "false" - только бесплатные.
+
+    Атрибуты:
+        pagination_class (class): Класс пагинации списка.
+        permission_classes (list): Список разрешений, определяющих доступ к представлению.
+    """
+
+    pagination_class = CustomPageNumberPagination
+    permission_classes = [IsAuthenticated, CanReadPost]
+
+    def get_queryset(self):
+        """
+        Возвращает опубликованные посты с фильтрами из параметров запроса.
+
+        Связанные объекты загружаются тем же запросом (select_related): для списка -
+        только категория и без текста поста, для детального просмотра - владелец,
+        категория и подкатегория.
+
+        Returns:
+            QuerySet: Отфильтрованные посты.
+        """
+        queryset = Post.objects.filter(is_published=True)
+        if self.action == "list":
+            queryset = queryset.select_related("category").defer("content", "search_vector")
+        else:
+            queryset = queryset.select_related("owner", "category", "subcategory")
+
+        params = self.request.query_params
+        category_id = params.get("category", "")
+        if category_id.isdigit():
+            queryset = queryset.filter(category_id=category_id)
+        subcategory_id = params.get("subcategory", "")
+        if subcategory_id.isdigit():
+            queryset = queryset.filter(subcategory_id=subcategory_id)
+        is_paid = params.get("is_paid")
+        if is_paid in ("true", "false"):
+            queryset = queryset.filter(is_paid=is_paid == "true")
+        return queryset.order_by("-created_at", "-id")
+
+    def get_serializer_class(self):
+        """
+        Возвращает облегченный сериализатор для списка и полный для детального просмотра.
+        """
+        if self.action == "list":
+            return PostListSerializer
+        return PostDetailSerializer
+
+    def paginate_queryset(self, queryset):
+        """
+        Возвращает страницу постов и вычисляет, какие из них доступны пользователю.
+
+        Доступ проверяется одним вызовом EntitlementService для всей страницы.
+        """
+        page = super().paginate_queryset(queryset)
+        self.readable_post_ids = EntitlementService.readable_post_ids(self.request.user, page or [])
+        return page
+
+    def get_serializer_context(self):
+        """
+        Добавляет в контекст сериализатора множество доступных постов страницы.
+        """
+        context = super().get_serializer_context()
+        context["readable_post_ids"] = getattr(self, "readable_post_ids", None)
+        return context
+
+
 class CategoryListView(LoginRequiredMixin, ListView):
     """
     View для отображения списка категорий.
 
-    Этот класс предоставляет API для получения списка всех корневых категорий,
-    доступных только для авторизованных пользователей.
+    Этот класс предоставляет API для получения списка всех категорий с подкатегориями,
+    доступных только для авторизованных пользователей. Дерево категорий читается из кэша.
 
     Атрибуты:
-        model (Model): Модель, с которой работает данный view (Category).
         template_name (str): Шаблон, используемый для отображения списка категорий.
         context_object_name (str): Имя контекста, под которым будут доступны категории в шаблоне.
     """
 
-    model = Category
-    template_name = "categories/category_list.html"
+    template_name = "posts/category_list.html"
     context_object_name = "categories"
 
     def get_queryset(self):
         """
-        Возвращает только корневые категории.
+        Возвращает дерево категорий из кэша.
 
         Returns:
-            QuerySet: Список корневых объектов модели Category, которые не имеют родителя.
+            list: Список словарей категорий с вложенными подкатегориями.
         """
-        return Category.objects.filter(parent=None)
+        return TaxonomyService.get_tree()
 
     def get_context_data(self, **kwargs):
         """
@@ -504,7 +1048,7 @@ class CategoryListView(LoginRequiredMixin, ListView):
 
         if isinstance(user, CustomUser):
             context["user"] = user
-            context["has_paid_subscription"] = user.has_paid_subscription
+            context["has_paid_subscription"] = EntitlementService.has_subscription(user)
 
         return context
 
@@ -530,9 +1074,11 @@ class GetSubcategoriesView(View):
         Returns:
             JsonResponse: Ответ с информацией о подкатегориях в формате JSON.
         """
-        category_id = request.GET.get("category")
-        subcategories = Subcategory.objects.filter(category_id=category_id).values("id", "name")
-        return JsonResponse(list(subcategories), safe=False)
+        category_id = request.GET.get("category", "")
+        if not category_id.isdigit():
+            return JsonResponse([], safe=False)
+        subcategories = TaxonomyService.get_subcategories(int(category_id))
+        return JsonResponse([{"id": item["id"], "name": item["name"]} for item in subcategories], safe=False)
 
 
 class SubscriptionView(APIView):
@@ -659,8 +1205,8 @@ def category_detail_view(request, category_id):
     Представление для отображения деталей категории.
 
     Это представление обрабатывает GET-запросы для получения информации о категории
-    и ее подкатегориях. Если идентификатор категории не существует, будет возвращена
-    страница 404.
+    и ее подкатегориях из кэша дерева категорий. Если идентификатор категории
+    не существует, будет возвращена страница 404.
 
     Args:
         request (HttpRequest): Объект запроса, содержащий информацию о текущем запросе.
@@ -670,27 +1216,25 @@ def category_detail_view(request, category_id):
         HttpResponse:
             Если категория найдена, возвращает страницу с деталями категории и подкатегорий.
             Если категория не найдена, возвращает страницу 404 (Not Found).
-
-    Примечания:
-        - В случае успешного получения категории, также будет доступна информация о родительской категории.
-        - В шаблоне отображаются название категории, ее описание и список подкатегорий.
     """
-    category = get_object_or_404(Category, id=category_id)
-
-    parent_category = category.parent
+    category = TaxonomyService.get_category(category_id)
+    if category is None:
+        raise Http404("Категория не найдена.")
 
     context = {
         'category': category,
-        'parent_category': parent_category,
     }
 
-    return render(request, 'category_detail.html', context)
+    return render(request, 'posts/category_detail.html', context)
 
 
 def subcategory_detail_view(request, subcategory_id):
     """
     Представление для отображения деталей подкатегории.
 
+    Подкатегория и ее категория берутся из кэша дерева категорий,
+    из базы данных читаются только посты подкатегории.
+
     Args:
         request (HttpRequest): Объект запроса.
         subcategory_id (int): Идентификатор подкатегории.
@@ -698,13 +1242,16 @@ def subcategory_detail_view(request, subcategory_id):
     Returns:
         HttpResponse: Страница с деталями подкатегории.
     """
-    subcategory = get_object_or_404(Subcategory, id=subcategory_id)
+    subcategory = TaxonomyService.get_subcategory(subcategory_id)
+    if subcategory is None:
+        raise Http404("Подкатегория не найдена.")
 
     context = {
         'subcategory': subcategory,
+        'posts': Post.objects.filter(subcategory_id=subcategory_id, is_published=True).values("id", "title"),
     }
 
-    return render(request, 'subcategory_detail.html', context)
+    return render(request, 'posts/subcategory_detail.html', context)
 
 
 @login_required
@@ -17,3 +17,9 @@ class UsersConfig(AppConfig):
 
     default_auto_field = "django.db.models.BigAutoField"
     name = "users"
+
+    def ready(self):
+        """
+        Подключает обработчики сигналов приложения.
+        """
+        from . import signals  # noqa: F401
@@ -0,0 +1,30 @@
+from django.contrib.auth.backends import ModelBackend
+
+from .roles import RoleResolver
+
+
+class RoleBackend(ModelBackend):
+    """
+    Бэкенд аутентификации, который берет разрешения пользователя из RoleResolver.
+
+    Аутентификация выполняется как в ModelBackend, а проверки user.has_perm
+    (в том числе в PermissionRequiredMixin) используют роли, загруженные один раз
+    за запрос, вместо отдельных запросов к таблицам разрешений.
+    """
+
+    def get_all_permissions(self, user_obj, obj=None):
+        """
+        Возвращает все разрешения пользователя в виде множества строк "app_label.codename".
+
+        Args:
+            user_obj (User): Пользователь.
+            obj (Model | None): Объект для объектных разрешений (не поддерживаются).
+
+        Returns:
+            set: Разрешения пользователя.
+        """
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        if user_obj.is_superuser:
+            return super().get_all_permissions(user_obj, obj)
+        return set(RoleResolver.get(user_obj).permissions)
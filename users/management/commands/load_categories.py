@@ -1,79 +1,124 @@
-from django.core.management.base import BaseCommand
-from django.db import connection
+import json
+from pathlib import Path
+
+import yaml
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts.models import Category, Subcategory
+from posts.services import TaxonomyService
+
+DEFAULT_PATH = Path(__file__).resolve().parents[2] / "fixtures" / "taxonomy.json"
 
 
 class Command(BaseCommand):
-    help = 'Загружает категории и подкатегории в базу данных'
+    """
+    Команда для загрузки дерева категорий и подкатегорий из файла JSON или YAML.
+
+    Файл содержит словарь «название категории -> список подкатегорий» либо
+    «название категории -> {"description": ..., "subcategories": [...]}».
+    Загрузка выполняется в одной транзакции одним массовым upsert на уровень
+    (bulk_create с update_conflicts/ignore_conflicts), поэтому повторный запуск
+    не создает дубликатов, а только добавляет новые записи и обновляет описания.
+
+    Атрибуты:
+        help (str): Описание команды, которое будет отображаться в справке.
+    """
+
+    help = "Загружает категории и подкатегории в базу данных"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", default=str(DEFAULT_PATH), help="Путь к файлу JSON или YAML")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Размер пачки вставки")
 
-    def handle(self, *args, **kwargs):
-        with connection.cursor() as cursor:
+    def handle(self, *args, **options):
+        """
+        Загружает дерево категорий из файла.
 
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS categories (
-                id SERIAL PRIMARY KEY,
-                category TEXT NOT NULL,
-                subcategory TEXT NOT NULL
+        Args:
+            *args: Позиционные аргументы, переданные в команду.
+            **options: Именованные аргументы, переданные в команду.
+
+        Returns:
+            None: Метод выводит количество загруженных записей.
+        """
+        tree = self.read_tree(Path(options["path"]))
+        batch_size = options["batch_size"]
+
+        described = []
+        undescribed = []
+        subcategory_names = {}
+        for name, node in tree.items():
+            if isinstance(node, dict):
+                subcategories = node.get("subcategories", [])
+                if "description" in node:
+                    described.append(Category(name=name, description=node["description"]))
+                else:
+                    undescribed.append(Category(name=name))
+            else:
+                subcategories = node
+                undescribed.append(Category(name=name))
+            subcategory_names[name] = subcategories
+
+        with transaction.atomic():
+            categories_before = Category.objects.count()
+            subcategories_before = Subcategory.objects.count()
+
+            Category.objects.bulk_create(
+                described,
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=["name"],
+                update_fields=["description"],
             )
-            ''')
+            Category.objects.bulk_create(undescribed, batch_size=batch_size, ignore_conflicts=True)
 
-            categories = {
-                "Образование и курсы": [
-                    "Видеоуроки и лекции",
-                    "Электронные книги",
-                    "Вебинары и мастер-классы"
-                ],
-                "Здоровье и фитнес": [
-                    "Программы тренировок",
-                    "Рецепты и диеты",
-                    "Психологические советы и медитация"
-                ],
-                "Финансы и инвестиции": [
-                    "Финансовые стратегии",
-                    "Инвестиционные гайды",
-                    "Анализ рынка"
-                ],
-                "Технологии и программирование": [
-                    "Туториалы по программированию",
-                    "Обзоры технологий",
-                    "Технические решения"
+            category_ids = dict(Category.objects.filter(name__in=list(tree)).values_list("name", "id"))
+            Subcategory.objects.bulk_create(
+                [
+                    Subcategory(name=subcategory, category_id=category_ids[category])
+                    for category, subcategories in subcategory_names.items()
+                    for subcategory in dict.fromkeys(subcategories)
                 ],
-                "Личный рост и развитие": [
-                    "Книги по саморазвитию",
-                    "Подкасты и интервью с экспертами",
-                    "Курсы по навыкам общения и лидерства"
-                ],
-                "Искусство и креатив": [
-                    "Уроки рисования и дизайна",
-                    "Музыкальные курсы",
-                    "Фотография и видеосъемка"
-                ],
-                "Путешествия и культура": [
-                    "Гиды по странам и городам",
-                    "Кулинарные рецепты со всего мира",
-                    "Описание культурных особенностей"
-                ],
-                "Маркетинг и бизнес": [
-                    "Стратегии цифрового маркетинга",
-                    "Кейс-стадии успешных компаний",
-                    "Консультации по ведению бизнеса"
-                ],
-                "Развлечения и увлечения": [
-                    "Обзоры книг, фильмов и игр",
-                    "Хобби и рукоделие",
-                    "Обсуждения актуальных тем развлечений"
-                ],
-                "Наука и природа": [
-                    "Популярные научные статьи",
-                    "Исследования и открытия",
-                    "Экологические инициативы"
-                ]
-            }
-
-            for category, subcategories in categories.items():
-                for subcategory in subcategories:
-                    cursor.execute('''
-                    INSERT INTO categories (category, subcategory)
-                    VALUES (%s, %s)
-                    ''', (category, subcategory))
-
-        self.stdout.write(self.style.SUCCESS('Категории успешно загружены в базу данных.'))
+                batch_size=batch_size,
+                ignore_conflicts=True,
+            )
+
+            created_categories = Category.objects.count() - categories_before
+            created_subcategories = Subcategory.objects.count() - subcategories_before
+            transaction.on_commit(TaxonomyService.invalidate)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Категории успешно загружены в базу данных: новых категорий {created_categories}, "
+                f"новых подкатегорий {created_subcategories}."
+            )
+        )
+
+    def read_tree(self, path):
+        """
+        Читает дерево категорий из файла JSON или YAML (по расширению).
+
+        Args:
+            path (Path): Путь к файлу.
+
+        Returns:
+            dict: Словарь категорий.
+
+        Raises:
+            CommandError: Если файл не найден или имеет неверный формат.
+        """
+        try:
+            with open(path, encoding="utf-8") as file:
+                if path.suffix in (".yaml", ".yml"):
+                    tree = yaml.safe_load(file)
+                else:
+                    tree = json.load(file)
+        except OSError as error:
+            raise CommandError(f"Не удалось прочитать файл {path}: {error}")
+        except (ValueError, yaml.YAMLError) as error:
+            raise CommandError(f"Неверный формат файла {path}: {error}")
+
+        if not isinstance(tree, dict):
+            raise CommandError("Файл должен содержать словарь категорий.")
+        return tree
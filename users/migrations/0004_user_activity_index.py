@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-16 23:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0003_remove_customuser_country_alter_customuser_email"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="customuser",
+            index=models.Index(fields=["is_active", "last_login"], name="user_activity_idx"),
+        ),
+    ]
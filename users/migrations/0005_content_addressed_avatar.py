@@ -0,0 +1,25 @@
+# Generated by Django 5.2 on 2026-10-16 23:27
+
+import posts.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0004_user_activity_index"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="customuser",
+            name="avatar",
+            field=models.ImageField(
+                blank=True,
+                max_length=255,
+                null=True,
+                storage=posts.storage.content_addressed_storage,
+                upload_to="avatars/",
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Удаляет таблицу categories, которую создавала прежняя команда load_categories.
+
+    Таблица не была описана моделью и не создавалась миграциями; команда теперь
+    загружает дерево в Category и Subcategory, и данные таблицы нигде не читаются.
+    """
+
+    dependencies = [
+        ("users", "0005_content_addressed_avatar"),
+    ]
+
+    operations = [
+        migrations.RunSQL("DROP TABLE IF EXISTS categories", reverse_sql=migrations.RunSQL.noop),
+    ]
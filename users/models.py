@@ -1,6 +1,8 @@
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.db import models
 
+from posts.storage import content_addressed_storage
+
 
 class CustomUserManager(BaseUserManager):
     """
@@ -83,17 +85,21 @@ class CustomUser(AbstractUser):
 
     Атрибуты:
         phone_number (str): Уникальный номер телефона пользователя.
-        avatar (ImageField): Аватар пользователя, загружаемый в директорию "avatars/".
+        avatar (ImageField): Аватар пользователя; хранится по хэшу содержимого
+            (см. posts.storage.ContentAddressedStorage).
         is_blocked (bool): Флаг, указывающий, заблокирован ли пользователь.
         has_paid_subscription (bool): Флаг, указывающий, есть ли у пользователя платная подписка.
 
     Метаданные:
         permissions: Дополнительные разрешения для управления пользователями.
+        indexes: Индекс (is_active, last_login) для поиска давно не заходивших активных пользователей.
     """
 
     username = None
     phone_number = models.CharField(max_length=15, unique=True, null=False, blank=False)
-    avatar = models.ImageField(upload_to="avatars/", null=True, blank=True)
+    avatar = models.ImageField(
+        upload_to="avatars/", storage=content_addressed_storage, max_length=255, null=True, blank=True
+    )
     is_blocked = models.BooleanField(default=False)
     has_paid_subscription = models.BooleanField(default=False)
 
@@ -102,6 +108,9 @@ class CustomUser(AbstractUser):
             ("can_view_users", "Can view users"),
             ("can_block_user", "Can block users"),
         ]
+        indexes = [
+            models.Index(fields=["is_active", "last_login"], name="user_activity_idx"),
+        ]
 
     USERNAME_FIELD = "phone_number"
     REQUIRED_FIELDS = []
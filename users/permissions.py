@@ -1,5 +1,7 @@
 from rest_framework import permissions
 
+from .roles import MODERATOR_GROUP, RoleResolver
+
 
 class IsModerator(permissions.BasePermission):
     """
@@ -22,4 +24,4 @@ class IsModerator(permissions.BasePermission):
             bool: True, если пользователь принадлежит группе 'Moderators',
             иначе False.
         """
-        return request.user.groups.filter(name="Moderators").exists()
+        return RoleResolver.has_group(request.user, MODERATOR_GROUP)
@@ -0,0 +1,138 @@
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.db.models import Q
+
+from posts.cache import bump_version, get_version
+
+POST_MODERATOR_GROUP = "Post moderator group"
+MODERATOR_GROUP = "Moderators"
+
+Roles = namedtuple("Roles", ["groups", "permissions", "is_superuser"])
+
+NO_ROLES = Roles(frozenset(), frozenset(), False)
+
+
+class RoleResolver:
+    """
+    Сервис для проверки групп и разрешений пользователя.
+
+    Имена групп и разрешения пользователя (собственные и полученные через группы)
+    загружаются двумя запросами один раз за запрос: результат сохраняется в объекте
+    пользователя, который живет ровно один HTTP-запрос. Дополнительно результат может
+    храниться в общем кэше ROLES_CACHE_TIMEOUT секунд (0 отключает кэш); кэш
+    сбрасывается сигналами при изменении групп, разрешений и флагов пользователя.
+
+    Атрибуты:
+        VERSION_NAME (str): Имя версии кэша ролей.
+        ATTRIBUTE (str): Атрибут пользователя, в котором хранятся роли в пределах запроса.
+
+    Методы:
+        get(user): Возвращает группы и разрешения пользователя.
+        has_group(user, group_name): Проверяет членство в группе.
+        has_perm(user, perm): Проверяет разрешение вида "app_label.codename".
+        is_post_moderator(user): Проверяет членство в группе модераторов постов.
+        invalidate(): Сбрасывает кэш ролей всех пользователей.
+    """
+
+    VERSION_NAME = "roles"
+    ATTRIBUTE = "_roles_cache"
+
+    @classmethod
+    def get(cls, user):
+        """
+        Возвращает роли пользователя, загружая их не более одного раза за запрос.
+
+        Args:
+            user (User | AnonymousUser): Пользователь.
+
+        Returns:
+            Roles: Имена групп, разрешения и флаг суперпользователя.
+        """
+        if user is None or not user.is_authenticated or not user.is_active:
+            return NO_ROLES
+
+        roles = getattr(user, cls.ATTRIBUTE, None)
+        if roles is None:
+            roles = cls._get_cached(user)
+            setattr(user, cls.ATTRIBUTE, roles)
+        return roles
+
+    @classmethod
+    def _get_cached(cls, user):
+        """
+        Читает роли из общего кэша или загружает их из базы.
+        """
+        timeout = getattr(settings, "ROLES_CACHE_TIMEOUT", 0)
+        if not timeout:
+            return cls._load(user)
+
+        key = f"users:roles:{user.pk}:v{get_version(cls.VERSION_NAME)}"
+        roles = cache.get(key)
+        if roles is None:
+            roles = cls._load(user)
+            cache.set(key, tuple(roles), timeout)
+            return roles
+        return Roles(*roles)
+
+    @classmethod
+    def _load(cls, user):
+        """
+        Загружает имена групп и разрешения пользователя из базы.
+        """
+        groups = frozenset(user.groups.values_list("name", flat=True))
+        permissions = Permission.objects.filter(Q(user=user) | Q(group__user=user)).values_list(
+            "content_type__app_label", "codename"
+        )
+        return Roles(
+            groups,
+            frozenset(f"{app_label}.{codename}" for app_label, codename in permissions.distinct()),
+            user.is_superuser,
+        )
+
+    @classmethod
+    def has_group(cls, user, group_name):
+        """
+        Проверяет, состоит ли пользователь в группе.
+
+        Args:
+            user (User | AnonymousUser): Пользователь.
+            group_name (str): Название группы.
+
+        Returns:
+            bool: True, если пользователь состоит в группе.
+        """
+        return group_name in cls.get(user).groups
+
+    @classmethod
+    def has_perm(cls, user, perm):
+        """
+        Проверяет, есть ли у пользователя разрешение (суперпользователю разрешено все).
+
+        Args:
+            user (User | AnonymousUser): Пользователь.
+            perm (str): Разрешение вида "app_label.codename".
+
+        Returns:
+            bool: True, если разрешение есть.
+        """
+        roles = cls.get(user)
+        return roles.is_superuser or perm in roles.permissions
+
+    @classmethod
+    def is_post_moderator(cls, user):
+        """
+        Проверяет, состоит ли пользователь в группе модераторов постов.
+        """
+        return cls.has_group(user, POST_MODERATOR_GROUP)
+
+    @classmethod
+    def invalidate(cls):
+        """
+        Сбрасывает общий кэш ролей всех пользователей.
+
+        Роли, уже загруженные в текущем запросе, не меняются.
+        """
+        bump_version(cls.VERSION_NAME)
@@ -0,0 +1,75 @@
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from posts.services import StoredFileService
+
+from .models import CustomUser
+from .roles import RoleResolver
+
+
+@receiver(m2m_changed, sender=CustomUser.groups.through)
+@receiver(m2m_changed, sender=CustomUser.user_permissions.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_roles_on_membership_change(sender, action, **kwargs):
+    """
+    Сбрасывает кэш ролей при изменении групп пользователя или разрешений групп и пользователей.
+    """
+    if action in ("post_add", "post_remove", "post_clear"):
+        RoleResolver.invalidate()
+
+
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Group)
+def invalidate_roles_on_group_change(sender, **kwargs):
+    """
+    Сбрасывает кэш ролей при переименовании или удалении группы.
+    """
+    RoleResolver.invalidate()
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_roles_on_user_change(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Сбрасывает кэш ролей при изменении флагов is_active и is_superuser.
+
+    Сохранения отдельных полей (например, last_login при входе) кэш не сбрасывают.
+    """
+    if created:
+        return
+    if update_fields is None or {"is_active", "is_superuser"} & set(update_fields):
+        RoleResolver.invalidate()
+
+
+@receiver(pre_save, sender=CustomUser)
+def remember_avatar(sender, instance, update_fields=None, **kwargs):
+    """
+    Запоминает прежний аватар пользователя, если сохранение может его изменить.
+
+    Сохранения отдельных полей без avatar (например, last_login) запроса не делают.
+    """
+    if update_fields is not None and "avatar" not in update_fields:
+        return
+    instance._previous_avatar = (
+        CustomUser.objects.filter(pk=instance.pk).values_list("avatar", flat=True).first()
+        if not instance._state.adding
+        else ""
+    )
+
+
+@receiver(post_save, sender=CustomUser)
+def count_avatar_references(sender, instance, **kwargs):
+    """
+    Переносит ссылку пользователя с прежнего файла аватара на новый (см. StoredFileService).
+    """
+    if hasattr(instance, "_previous_avatar"):
+        StoredFileService.replace(instance._previous_avatar, instance.avatar.name)
+        del instance._previous_avatar
+
+
+@receiver(post_delete, sender=CustomUser)
+def release_avatar(sender, instance, **kwargs):
+    """
+    Освобождает ссылку удаленного пользователя на файл аватара.
+    """
+    StoredFileService.release(instance.avatar.name)
@@ -1,43 +1,61 @@
+import logging
+
 from celery import shared_task
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 
+from .roles import RoleResolver
+
+logger = logging.getLogger(__name__)
+
 User = get_user_model()
 
+INACTIVITY_DAYS = 30
+
 
 @shared_task
-def deactivate_inactive_users():
+def deactivate_inactive_users(dry_run=False, batch_size=1000):
     """
     Периодическая задача, которая деактивирует учетные записи пользователей,
     не заходивших в систему более месяца.
 
-    Эта функция выполняется в фоновом режиме с использованием Celery и
-    предназначена для автоматического управления состоянием учетных записей
-    пользователей в системе.
+    Пользователи обрабатываются пачками по первичному ключу: для каждой пачки
+    выбираются идентификаторы по индексу (is_active, last_login) и выполняется
+    один UPDATE по диапазону ключей. Каждая пачка фиксируется отдельно, поэтому
+    блокировки строк держатся недолго, а прерванный запуск можно просто повторить.
 
-    Процесс работы функции:
-    1. Вычисляет дату, которая соответствует моменту, когда пользователь
-       последний раз входил в систему. В данном случае это - 30 дней назад
-       от текущей даты.
-    2. Получает всех пользователей, которые не заходили в систему
-       после вычисленной даты и имеют активный статус.
-    3. Деактивирует учетные записи этих пользователей, изменяя атрибут
-       is_active на False, и сохраняет изменения в базе данных.
-    4. Выводит в консоль информацию о каждом деактивированном пользователе.
+    Args:
+        dry_run (bool): Только подсчитать пользователей, которые будут деактивированы.
+        batch_size (int): Количество пользователей в одной пачке.
 
     Returns:
-        None: Функция не возвращает значений, но выполняет изменения в базе данных.
+        int: Количество деактивированных (или, при dry_run, подлежащих деактивации) пользователей.
 
     Примечания:
-        - Убедитесь, что задача запланирована на выполнение с нужной периодичностью
-          в конфигурации Celery.
+        - Пользователи, ни разу не входившие в систему (last_login пуст), не деактивируются.
         - Данная задача может быть дополнительно настроена для отправки уведомлений
           пользователям перед их деактивацией.
     """
-    one_month_ago = timezone.now() - timezone.timedelta(days=30)
-    inactive_users = User.objects.filter(last_login__lt=one_month_ago, is_active=True)
-
-    for user in inactive_users:
-        user.is_active = False
-        user.save()
-        print(f"Пользователь {user.email} был заблокирован.")
+    cutoff = timezone.now() - timezone.timedelta(days=INACTIVITY_DAYS)
+    inactive_users = User.objects.filter(is_active=True, last_login__lt=cutoff)
+
+    if dry_run:
+        count = inactive_users.count()
+        logger.info("Пробный запуск: будет деактивировано пользователей: %s", count)
+        return count
+
+    total = 0
+    last_pk = 0
+    while True:
+        pks = list(inactive_users.filter(pk__gt=last_pk).order_by("pk").values_list("pk", flat=True)[:batch_size])
+        if not pks:
+            break
+        updated = inactive_users.filter(pk__gt=last_pk, pk__lte=pks[-1]).update(is_active=False)
+        total += updated
+        last_pk = pks[-1]
+        logger.debug("Деактивировано пользователей в пачке до id=%s: %s", last_pk, updated)
+
+    if total:
+        RoleResolver.invalidate()
+    logger.info("Деактивировано неактивных пользователей: %s", total)
+    return total
@@ -1,14 +1,22 @@
+import datetime
 import json
+import tempfile
+from pathlib import Path
 
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from posts.models import Post
+from posts.models import Category, Post, Subcategory
 
 from .models import CustomUser
+from .tasks import deactivate_inactive_users
 from payments.models import Payment
 
 User = get_user_model()
@@ -266,3 +274,92 @@ class UserViewsTest(TestCase):
         self.assertEqual(response.status_code, 302)
         user_to_block.refresh_from_db()
         self.assertTrue(user_to_block.is_blocked)
+
+
+class DeactivateInactiveUsersTaskTest(TestCase):
+    """
+    Тесты для периодической задачи деактивации неактивных пользователей.
+    """
+
+    def setUp(self):
+        """
+        Создает давно не заходивших, недавно заходивших и ни разу не заходивших пользователей.
+        """
+        now = timezone.now()
+        users = [
+            User(phone_number=f"7{number:010d}", last_login=now - datetime.timedelta(days=60))
+            for number in range(2500)
+        ]
+        users += [User(phone_number=f"8{number:010d}", last_login=now) for number in range(10)]
+        users += [User(phone_number=f"9{number:010d}") for number in range(10)]
+        User.objects.bulk_create(users)
+
+    def test_dry_run_changes_nothing(self):
+        """
+        Проверяет, что пробный запуск только подсчитывает пользователей.
+        """
+        self.assertEqual(deactivate_inactive_users(dry_run=True), 2500)
+        self.assertEqual(User.objects.filter(is_active=False).count(), 0)
+
+    def test_deactivates_in_batches(self):
+        """
+        Проверяет, что пользователи деактивируются пачками: выборка и один UPDATE на пачку.
+        """
+        with self.assertNumQueries(7):
+            self.assertEqual(deactivate_inactive_users(batch_size=1000), 2500)
+        self.assertEqual(User.objects.filter(is_active=False).count(), 2500)
+        self.assertEqual(deactivate_inactive_users(), 0)
+
+
+class LoadCategoriesCommandTest(TestCase):
+    """
+    Тесты для команды load_categories.
+    """
+
+    def write(self, name, content):
+        """
+        Записывает файл во временный каталог теста и возвращает путь к нему.
+        """
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = Path(directory.name) / name
+        path.write_text(content, encoding="utf-8")
+        return str(path)
+
+    def test_default_file_is_idempotent(self):
+        """
+        Проверяет, что повторный запуск не создает дубликатов.
+        """
+        call_command("load_categories")
+        categories, subcategories = Category.objects.count(), Subcategory.objects.count()
+        self.assertEqual(categories, 10)
+
+        call_command("load_categories")
+        self.assertEqual(Category.objects.count(), categories)
+        self.assertEqual(Subcategory.objects.count(), subcategories)
+
+    def test_yaml_updates_descriptions(self):
+        """
+        Проверяет загрузку YAML, добавление подкатегорий и обновление описаний.
+        """
+        Category.objects.create(name="Книги", description="Старое описание")
+        path = self.write(
+            "taxonomy.yaml", "Книги:\n  description: Новое описание\n  subcategories: [Романы, Поэзия]\n"
+        )
+        call_command("load_categories", path)
+        call_command("load_categories", path)
+
+        books = Category.objects.get(name="Книги")
+        self.assertEqual(books.description, "Новое описание")
+        self.assertEqual(sorted(books.subcategories.values_list("name", flat=True)), ["Поэзия", "Романы"])
+
+    def test_large_tree_in_bulk(self):
+        """
+        Проверяет, что 20 000 подкатегорий загружаются пачками, а не запросом на каждую запись.
+        """
+        tree = {f"Категория {index}": [f"Подкатегория {number}" for number in range(200)] for index in range(100)}
+        path = self.write("taxonomy.json", json.dumps(tree))
+        with CaptureQueriesContext(connection) as queries:
+            call_command("load_categories", path, "--batch-size", "1000")
+        self.assertEqual(Subcategory.objects.count(), 20_000)
+        self.assertLess(len(queries), 100)
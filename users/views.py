@@ -16,6 +16,7 @@ from django.shortcuts import render, redirect
 
 from .forms import UserProfileForm, UserRegistrationForm
 from .models import CustomUser
+from .roles import POST_MODERATOR_GROUP, RoleResolver
 from .serializers import UserProfileSerializer, UserRegistrationSerializer
 
 User = get_user_model()
@@ -251,7 +252,7 @@ class UserListView(APIView):
                         Статус ответа 200 (OK).
         """
         users = CustomUser.objects.exclude(is_superuser=True)
-        users = users.exclude(groups__name__in=["Post moderator group"])
+        users = users.exclude(groups__name__in=[POST_MODERATOR_GROUP])
         return Response({"users": users.values()})
 
 
@@ -268,7 +269,7 @@ def is_post_manager(user):
     Возвращает:
         bool: True, если пользователь является менеджером постов, иначе False.
     """
-    return user.groups.filter(name="Post moderator group").exists()
+    return RoleResolver.is_post_moderator(user)
 
 
 @login_required